@@ -0,0 +1,36 @@
+"""Change version for available copies
+
+Revision ID: a7d1c3e9f2b6
+Revises: f5c2d8a9b4e1
+Create Date: 2026-10-17 18:12:44.301857
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d1c3e9f2b6'
+down_revision: Union[str, Sequence[str], None] = 'f5c2d8a9b4e1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    change_versions = sa.table('change_versions',
+    sa.column('table_name', sa.String(length=50)),
+    sa.column('version', sa.BigInteger()),
+    sa.column('updated_at', sa.DateTime()),
+    )
+    op.bulk_insert(change_versions, [
+        {'table_name': 'copies', 'version': 0, 'updated_at': datetime.utcnow()},
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DELETE FROM change_versions WHERE table_name = 'copies'")
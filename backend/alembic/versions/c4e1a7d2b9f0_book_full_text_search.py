@@ -0,0 +1,88 @@
+"""Book full-text search index
+
+Revision ID: c4e1a7d2b9f0
+Revises: 3f34acbc0163
+Create Date: 2026-10-17 09:12:40.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e1a7d2b9f0'
+down_revision: Union[str, Sequence[str], None] = '3f34acbc0163'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS book_search "
+            "USING fts5(title, author, description, isbn, tokenize='unicode61')"
+        )
+        op.execute(
+            "INSERT INTO book_search (rowid, title, author, description, isbn) "
+            "SELECT b.book_id, b.title, coalesce(a.name, ''), coalesce(b.description, ''), coalesce(b.isbn, '') "
+            "FROM books b LEFT JOIN authors a ON a.author_id = b.author_id"
+        )
+
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS book_search ("
+            "book_id INTEGER PRIMARY KEY REFERENCES books (book_id) ON DELETE CASCADE, "
+            "document tsvector NOT NULL)"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_book_search_document ON book_search USING gin (document)")
+        op.execute(
+            "INSERT INTO book_search (book_id, document) "
+            "SELECT b.book_id, "
+            "setweight(to_tsvector('simple', coalesce(b.title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(b.isbn, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(a.name, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(b.description, '')), 'C') "
+            "FROM books b LEFT JOIN authors a ON a.author_id = b.author_id "
+            "ON CONFLICT (book_id) DO NOTHING"
+        )
+
+    elif dialect == 'mssql':
+        op.create_table('book_search',
+        sa.Column('book_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('document', sa.UnicodeText(), nullable=False),
+        sa.ForeignKeyConstraint(['book_id'], ['books.book_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('book_id', name='pk_book_search')
+        )
+        op.execute(
+            "INSERT INTO book_search (book_id, document) "
+            "SELECT b.book_id, CONCAT(b.title, N' ', a.name, N' ', b.isbn, N' ', b.description) "
+            "FROM books b LEFT JOIN authors a ON a.author_id = b.author_id"
+        )
+        # Full-text DDL is not allowed inside a user transaction
+        with op.get_context().autocommit_block():
+            op.execute("CREATE FULLTEXT CATALOG folio_catalog")
+            op.execute(
+                "CREATE FULLTEXT INDEX ON book_search (document) "
+                "KEY INDEX pk_book_search ON folio_catalog WITH CHANGE_TRACKING AUTO"
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+
+    if dialect == 'mssql':
+        with op.get_context().autocommit_block():
+            op.execute("DROP FULLTEXT INDEX ON book_search")
+            op.execute("DROP FULLTEXT CATALOG folio_catalog")
+        op.drop_table('book_search')
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_book_search_document")
+        op.execute("DROP TABLE IF EXISTS book_search")
+    elif dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS book_search")
@@ -0,0 +1,41 @@
+"""Loan and book query indexes
+
+Revision ID: d8b3f6a1c2e5
+Revises: c4e1a7d2b9f0
+Create Date: 2026-10-17 14:05:22.514377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b3f6a1c2e5'
+down_revision: Union[str, Sequence[str], None] = 'c4e1a7d2b9f0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OPEN_LOANS = sa.text("status IN ('active', 'overdue')")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_books_author_id', 'books', ['author_id'], unique=False)
+    op.create_index('ix_books_category_id', 'books', ['category_id'], unique=False)
+    op.create_index('ix_loans_user_id_loan_id', 'loans', ['user_id', 'loan_id'], unique=False)
+    op.create_index('ix_loans_status_loan_id', 'loans', ['status', 'loan_id'], unique=False)
+    op.create_index(
+        'ix_loans_open_due_date', 'loans', ['status', 'due_date'], unique=False,
+        postgresql_where=OPEN_LOANS, sqlite_where=OPEN_LOANS, mssql_where=OPEN_LOANS,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_loans_open_due_date', table_name='loans')
+    op.drop_index('ix_loans_status_loan_id', table_name='loans')
+    op.drop_index('ix_loans_user_id_loan_id', table_name='loans')
+    op.drop_index('ix_books_category_id', table_name='books')
+    op.drop_index('ix_books_author_id', table_name='books')
@@ -0,0 +1,38 @@
+"""Table change versions for conditional GETs
+
+Revision ID: e2a9c4b7d1f3
+Revises: d8b3f6a1c2e5
+Create Date: 2026-10-17 15:41:08.927153
+
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2a9c4b7d1f3'
+down_revision: Union[str, Sequence[str], None] = 'd8b3f6a1c2e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    change_versions = op.create_table('change_versions',
+    sa.Column('table_name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.BigInteger(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('table_name')
+    )
+    op.bulk_insert(change_versions, [
+        {'table_name': name, 'version': 0, 'updated_at': datetime.utcnow()}
+        for name in ('authors', 'categories', 'books')
+    ])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('change_versions')
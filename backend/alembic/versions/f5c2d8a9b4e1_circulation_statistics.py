@@ -0,0 +1,60 @@
+"""Running totals for circulation statistics
+
+Revision ID: f5c2d8a9b4e1
+Revises: e2a9c4b7d1f3
+Create Date: 2026-10-17 18:02:51.604417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c2d8a9b4e1'
+down_revision: Union[str, Sequence[str], None] = 'e2a9c4b7d1f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('circulation_counters',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.add_column('books', sa.Column('times_borrowed', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('categories', sa.Column('copies_total', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('categories', sa.Column('copies_available', sa.Integer(), server_default='0', nullable=False))
+    op.create_index('ix_books_times_borrowed_book_id', 'books', ['times_borrowed', 'book_id'], unique=False)
+
+    # Start the totals from the existing loans and books
+    for status in ('active', 'overdue', 'returned'):
+        op.execute(
+            "INSERT INTO circulation_counters (name, value) "
+            f"SELECT 'loans_{status}', COUNT(*) FROM loans WHERE status = '{status}'"
+        )
+    op.execute(
+        "INSERT INTO circulation_counters (name, value) "
+        "SELECT 'fines_cents', COALESCE(CAST(ROUND(SUM(fine_amount) * 100, 0) AS BIGINT), 0) FROM loans"
+    )
+    op.execute(
+        "UPDATE books SET times_borrowed = "
+        "(SELECT COUNT(*) FROM loans WHERE loans.book_id = books.book_id)"
+    )
+    op.execute(
+        "UPDATE categories SET "
+        "copies_total = COALESCE((SELECT SUM(quantity_total) FROM books WHERE books.category_id = categories.category_id), 0), "
+        "copies_available = COALESCE((SELECT SUM(quantity_available) FROM books WHERE books.category_id = categories.category_id), 0)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_books_times_borrowed_book_id', table_name='books')
+    op.drop_column('categories', 'copies_available', mssql_drop_default=True)
+    op.drop_column('categories', 'copies_total', mssql_drop_default=True)
+    op.drop_column('books', 'times_borrowed', mssql_drop_default=True)
+    op.drop_table('circulation_counters')
@@ -1,5 +1,5 @@
 # Import key modules to make them accessible when importing `app`
-from .database import Base, engine, get_db
+from .database import Base, engine, get_db, async_engine, get_async_db
 from .models import User, Book, Author, Category, Loan
 from .schemas import UserCreate, UserResponse, AuthorCreate, AuthorResponse, CategoryCreate, CategoryResponse, BookCreate, BookResponse, LoanCreate, LoanResponse
 from .crud import create_user, get_user_by_username, get_user_by_email, create_author, get_authors, create_category, get_categories, create_book, get_books, create_loan, return_book
@@ -0,0 +1,202 @@
+import asyncio
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from app import metrics
+
+# Admission control. Every request is sorted into a route class before it reaches the
+# router, and each class has its own concurrency limit, bounded wait queue and queue
+# timeout, so a burst of heavy searches or exports can only use up its own class:
+# checkouts at the desk keep their slots. A request that finds its queue full, or waits
+# longer than the queue timeout, is answered 503 with Retry-After straight away rather
+# than piling up behind the work that is already too slow.
+#
+# Each class also carries a statement timeout, applied to every statement in the database
+# transactions a request of that class begins (get_db/get_async_db sessions included):
+# SET LOCAL statement_timeout on PostgreSQL, the pyodbc query timeout on SQL Server and
+# a progress-handler deadline on SQLite, restarted as each statement is sent.
+#
+# Exports and imports are their own bulk class with a couple of slots, so they neither
+# take the admin slots nor get timed out: a streamed export is a single statement read
+# for as long as the body takes, and its 200 has gone out before any timeout could fire.
+#
+# Settings per class, e.g. for catalog: ADMISSION_CATALOG_LIMIT, ADMISSION_CATALOG_QUEUE,
+# ADMISSION_CATALOG_QUEUE_TIMEOUT, ADMISSION_CATALOG_RETRY_AFTER and
+# ADMISSION_CATALOG_STATEMENT_TIMEOUT (seconds, 0 for none). Limits are per process.
+
+ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+
+# class: (limit, queue, queue timeout s, Retry-After s, statement timeout s)
+DEFAULTS = {
+    "auth": (32, 64, 2.0, 1, 5.0),
+    "catalog": (32, 64, 1.0, 1, 5.0),
+    "circulation": (16, 64, 5.0, 2, 10.0),
+    "admin": (4, 8, 0.5, 5, 120.0),
+    "bulk": (2, 4, 0.5, 30, 0.0),
+}
+
+# Never limited: monitoring must keep working when everything else is shed
+EXEMPT_PATHS = (
+    "/metrics", "/docs", "/redoc", "/openapi.json", "/admin/pool-stats", "/admin/cache-stats", "/admin/startup",
+)
+
+current_class: ContextVar[Optional[str]] = ContextVar("current_class", default=None)
+
+rejected = metrics.Counter(
+    "folio_admission_rejected_total", "Requests shed by admission control", ("route_class", "reason")
+)
+queue_wait = metrics.Histogram(
+    "folio_admission_queue_seconds", "Time admitted requests waited for a slot",
+    (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0), ("route_class",),
+)
+
+def route_class(method: str, path: str) -> Optional[str]:
+    """Route class of a request, None for requests that are never limited"""
+    if path.startswith(EXEMPT_PATHS) or path == "/":
+        return None
+    if path in ("/token", "/login", "/register", "/me"):
+        return "auth"
+    if path.startswith("/loans"):
+        return "circulation"
+    if path.startswith("/export") or path == "/books/import":
+        return "bulk"
+    if method in ("GET", "HEAD") and path.startswith(("/books", "/authors", "/categories")):
+        return "catalog"
+    # Catalog maintenance, user management and admin reports
+    return "admin"
+
+class RouteClassPool:
+    """Concurrency limit with a bounded, timed wait queue"""
+
+    def __init__(self, name: str):
+        limit, queue, queue_timeout, retry_after, statement_timeout = DEFAULTS[name]
+        prefix = f"ADMISSION_{name.upper()}_"
+        self.name = name
+        self.limit = int(os.getenv(prefix + "LIMIT", str(limit)))
+        self.queue_size = int(os.getenv(prefix + "QUEUE", str(queue)))
+        self.queue_timeout = float(os.getenv(prefix + "QUEUE_TIMEOUT", str(queue_timeout)))
+        self.retry_after = int(os.getenv(prefix + "RETRY_AFTER", str(retry_after)))
+        self.statement_timeout = float(os.getenv(prefix + "STATEMENT_TIMEOUT", str(statement_timeout)))
+        self._semaphore = asyncio.Semaphore(self.limit)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed_full = 0
+        self.shed_timeout = 0
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting up to queue_timeout; False when the request should be shed"""
+        if self._semaphore.locked():
+            if self.waiting >= self.queue_size:
+                self.shed_full += 1
+                rejected.inc(self.name, "queue_full")
+                return False
+            self.waiting += 1
+            start = time.perf_counter()
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.shed_timeout += 1
+                rejected.inc(self.name, "queue_timeout")
+                return False
+            finally:
+                self.waiting -= 1
+            queue_wait.observe(time.perf_counter() - start, self.name)
+        else:
+            await self._semaphore.acquire()
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit, "queue": self.queue_size, "queue_timeout": self.queue_timeout,
+            "statement_timeout": self.statement_timeout, "active": self.active, "waiting": self.waiting,
+            "admitted": self.admitted, "shed_queue_full": self.shed_full, "shed_queue_timeout": self.shed_timeout,
+        }
+
+pools = {name: RouteClassPool(name) for name in DEFAULTS}
+
+class AdmissionMiddleware:
+    """ASGI middleware admitting each request through its route class pool"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        name = route_class(scope["method"], scope["path"]) if scope["type"] == "http" and ADMISSION_ENABLED else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        pool = pools[name]
+        if not await pool.acquire():
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server busy, please retry"},
+                headers={"Retry-After": str(pool.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+        token = current_class.set(name)
+        try:
+            # The slot is held until the response body is sent, streamed exports included
+            await self.app(scope, receive, send)
+        finally:
+            current_class.reset(token)
+            pool.release()
+
+def statement_timeout() -> float:
+    """Statement timeout in seconds for the current request, 0 outside requests"""
+    name = current_class.get()
+    return pools[name].statement_timeout if name is not None else 0.0
+
+def _apply_statement_timeout(connection, seconds: float):
+    dialect = connection.dialect.name
+    dbapi_connection = connection.connection.dbapi_connection
+    if dialect == "postgresql":
+        # Ends with the transaction, nothing to reset
+        if seconds:
+            connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(seconds * 1000)}")
+        return
+    # The other settings stay on the pooled connection: reset them when they were set before
+    info = connection.connection.info
+    if not seconds and not info.get("statement_timeout"):
+        return
+    info["statement_timeout"] = seconds
+    raw = getattr(dbapi_connection, "driver_connection", dbapi_connection)
+    raw = getattr(raw, "_conn", raw)
+    if dialect == "mssql":
+        # pyodbc query timeout, whole seconds, for every cursor opened from now on
+        raw.timeout = int(seconds + 0.999) if seconds else 0
+    elif dialect == "sqlite":
+        if seconds:
+            # Restarted for every statement by _restart_statement_clock
+            info["statement_deadline"] = time.monotonic() + seconds
+            raw.set_progress_handler(lambda: time.monotonic() > info["statement_deadline"], 10000)
+        else:
+            raw.set_progress_handler(None, 0)
+
+@event.listens_for(Session, "after_begin")
+def _set_statement_timeout(session, transaction, connection):
+    _apply_statement_timeout(connection, statement_timeout())
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _restart_statement_clock(connection, cursor, statement, parameters, context, executemany):
+    # SQLite has no statement timeout of its own: move the progress-handler deadline
+    seconds = connection.info.get("statement_timeout")
+    if seconds and connection.dialect.name == "sqlite":
+        connection.info["statement_deadline"] = time.monotonic() + seconds
+
+def stats() -> dict:
+    """Admission state of every route class in this process"""
+    return {"enabled": ADMISSION_ENABLED, "classes": {name: pool.stats() for name, pool in pools.items()}}
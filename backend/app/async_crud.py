@@ -0,0 +1,394 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, func, or_, select, update
+from app import models, schemas, auth, hashing, loading, fulltext, pagination, versions, circulation, recommendations, facets
+from app.crud import FINE_PER_DAY, OPEN_LOAN_STATUSES
+from datetime import datetime, timedelta
+from typing import Optional, Sequence
+
+# Async counterparts of app.crud for use with get_async_db.
+# Relationships are never lazy loaded under asyncio, so anything a response
+# schema nests must be eager loaded through the strategies in app.loading.
+
+async def count_rows(db: AsyncSession, key: tuple, query) -> int:
+    """Approximate row count for a list query, cached for pagination.COUNT_CACHE_TTL seconds"""
+    total = pagination.count_cache.get(key)
+    if total is None:
+        total = await db.scalar(select(func.count()).select_from(query.order_by(None).subquery()))
+        pagination.count_cache.set(key, total)
+    return total
+
+async def get_page(db: AsyncSession, query, keys, cursor: Optional[str], limit: int, count_key: tuple = None, options: Sequence = ()):
+    """Fetch one keyset page of a single-entity query"""
+    total = await count_rows(db, count_key, query) if count_key else None
+    result = await db.execute(pagination.paginate(query.options(*options), keys, cursor, limit))
+    items, next_cursor = pagination.split_page(
+        result.scalars().all(), limit, lambda row: [getattr(row, column.key) for column, _ in keys]
+    )
+    return pagination.PageResult(items=items, next_cursor=next_cursor, total=total)
+
+# User CRUD operations
+async def get_user_by_username(db: AsyncSession, username: str):
+    """Get a user by username"""
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    return result.scalars().first()
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    """Get a user by email"""
+    result = await db.execute(select(models.User).where(models.User.email == email))
+    return result.scalars().first()
+
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    """Get a user by ID"""
+    result = await db.execute(select(models.User).where(models.User.user_id == user_id))
+    return result.scalars().first()
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    """Create a new user"""
+    # bcrypt is CPU bound, keep it off the event loop
+    hashed_password = await hashing.hash_password_async(user.password)
+    db_user = models.User(
+        username=user.username,
+        email=user.email,
+        password_hash=hashed_password,
+        full_name=user.full_name,
+        role="member"  # Default role
+    )
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def get_users(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100, include_total: bool = False):
+    """Get a page of users ordered by ID"""
+    query = select(models.User)
+    keys = [(models.User.user_id, False)]
+    return await get_page(db, query, keys, cursor, limit, ("users",) if include_total else None)
+
+async def get_users_by_ids(db: AsyncSession, ids: Sequence[int]):
+    """Get the users with the given IDs in one query, in request order"""
+    result = await db.execute(select(models.User).where(models.User.user_id.in_(ids)))
+    return pagination.PageResult(items=pagination.in_order(result.scalars().all(), ids, lambda user: user.user_id))
+
+async def update_user_role(db: AsyncSession, user_id: int, role: str):
+    """Change a user's role"""
+    db_user = await get_user_by_id(db, user_id)
+    if db_user:
+        db_user.role = role
+        await db.commit()
+        await db.refresh(db_user)
+        auth.invalidate_principal(db_user.username)
+    return db_user
+
+async def set_user_active(db: AsyncSession, user_id: int, is_active: bool):
+    """Activate or deactivate a user"""
+    db_user = await get_user_by_id(db, user_id)
+    if db_user:
+        db_user.is_active = is_active
+        await db.commit()
+        await db.refresh(db_user)
+        auth.invalidate_principal(db_user.username)
+    return db_user
+
+# Author CRUD operations
+async def get_author(db: AsyncSession, author_id: int, options: Sequence = loading.AUTHOR_LIST):
+    """Get an author by ID"""
+    result = await db.execute(select(models.Author).options(*options).where(models.Author.author_id == author_id))
+    return result.scalars().first()
+
+async def get_authors(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100, include_total: bool = False, options: Sequence = loading.AUTHOR_LIST):
+    """Get a page of authors ordered by ID"""
+    query = select(models.Author)
+    keys = [(models.Author.author_id, False)]
+    return await get_page(db, query, keys, cursor, limit, ("authors",) if include_total else None, options)
+
+async def get_authors_by_ids(db: AsyncSession, ids: Sequence[int], options: Sequence = loading.AUTHOR_LIST):
+    """Get the authors with the given IDs in one query, in request order"""
+    result = await db.execute(select(models.Author).options(*options).where(models.Author.author_id.in_(ids)))
+    return pagination.PageResult(items=pagination.in_order(result.scalars().all(), ids, lambda author: author.author_id))
+
+async def create_author(db: AsyncSession, author: schemas.AuthorCreate):
+    """Create a new author"""
+    db_author = models.Author(**author.dict())
+    db.add(db_author)
+    await versions.bump_async(db, "authors")
+    await db.commit()
+    await db.refresh(db_author)
+    return db_author
+
+# Category CRUD operations
+async def get_category(db: AsyncSession, category_id: int):
+    """Get a category by ID"""
+    result = await db.execute(select(models.Category).where(models.Category.category_id == category_id))
+    return result.scalars().first()
+
+async def get_categories(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100, include_total: bool = False):
+    """Get a page of categories ordered by ID"""
+    query = select(models.Category)
+    keys = [(models.Category.category_id, False)]
+    return await get_page(db, query, keys, cursor, limit, ("categories",) if include_total else None)
+
+async def create_category(db: AsyncSession, category: schemas.CategoryCreate):
+    """Create a new category"""
+    db_category = models.Category(**category.dict())
+    db.add(db_category)
+    await versions.bump_async(db, "categories")
+    await db.commit()
+    await db.refresh(db_category)
+    return db_category
+
+# Book CRUD operations
+async def get_book(db: AsyncSession, book_id: int, options: Sequence = loading.BOOK_DETAIL):
+    """Get a book by ID"""
+    result = await db.execute(
+        select(models.Book)
+        .options(*options)
+        .where(models.Book.book_id == book_id)
+    )
+    return result.scalars().first()
+
+async def get_books(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100, search: Optional[str] = None, include_total: bool = False, options: Sequence = loading.BOOK_LIST, filters: Optional[facets.BookFilters] = None):
+    """Get a page of books, by ID or by relevance when searching, optionally narrowed by facet filters"""
+    query = select(models.Book)
+    count_key = ("books", search) if include_total else None
+    if filters is not None:
+        query = query.where(*filters.clauses())
+        count_key = count_key + filters.key() if count_key else None
+
+    if search:
+        ranked = fulltext.ranked_book_ids(db.bind.dialect.name, search)
+        if ranked is not None:
+            query = query.join(ranked, ranked.c.book_id == models.Book.book_id)
+            total = await count_rows(db, count_key, query) if count_key else None
+            # Search pages are keyed on (rank, book_id) so the cursor follows relevance order
+            keys = [(ranked.c.rank, True), (models.Book.book_id, False)]
+            result = await db.execute(
+                pagination.paginate(query.add_columns(ranked.c.rank).options(*options), keys, cursor, limit)
+            )
+            rows, next_cursor = pagination.split_page(result.all(), limit, lambda row: [row.rank, row.Book.book_id])
+            return pagination.PageResult(items=[row.Book for row in rows], next_cursor=next_cursor, total=total)
+        query = query.where(
+            or_(
+                models.Book.title.ilike(f"%{search}%"),
+                models.Book.isbn.ilike(f"%{search}%")
+            )
+        )
+
+    keys = [(models.Book.book_id, False)]
+    return await get_page(db, query, keys, cursor, limit, count_key, options)
+
+async def get_books_by_ids(db: AsyncSession, ids: Sequence[int], options: Sequence = loading.BOOK_LIST):
+    """Get the books with the given IDs in one query, in request order"""
+    result = await db.execute(select(models.Book).options(*options).where(models.Book.book_id.in_(ids)))
+    return pagination.PageResult(items=pagination.in_order(result.scalars().all(), ids, lambda book: book.book_id))
+
+async def get_book_facets(db: AsyncSession, search: Optional[str] = None, filters: Optional[facets.BookFilters] = None) -> dict:
+    """Facet counts of the books a search and its filters match, from one grouped query"""
+    dialect = db.bind.dialect.name
+    query = select(models.Book)
+    ranked = fulltext.ranked_book_ids(dialect, search) if search else None
+    if ranked is not None:
+        query = query.join(ranked, ranked.c.book_id == models.Book.book_id)
+    elif search:
+        query = query.where(or_(models.Book.title.ilike(f"%{search}%"), models.Book.isbn.ilike(f"%{search}%")))
+    if filters is not None:
+        query = query.where(*filters.clauses())
+    result = await db.execute(facets.statement(dialect, query))
+    return facets.collect(result.all())
+
+async def get_book_availability(db: AsyncSession, ids: Sequence[int]) -> dict:
+    """Available copies of the given books, by book ID, from a two-column query"""
+    result = await db.execute(select(models.Book.book_id, models.Book.quantity_available).where(models.Book.book_id.in_(ids)))
+    return dict(result.all())
+
+async def create_book(db: AsyncSession, book: schemas.BookCreate):
+    """Create a new book"""
+    db_book = models.Book(**book.dict())
+    db.add(db_book)
+    await db.flush()
+    await fulltext.index_book_async(db, db_book.book_id)
+    await circulation.record_async(db, categories={db_book.category_id: (db_book.quantity_total, db_book.quantity_available)})
+    await versions.bump_async(db, "books")
+    await db.commit()
+    await db.refresh(db_book, attribute_names=["author", "category"])
+    return db_book
+
+async def update_book_quantity(db: AsyncSession, book_id: int, change: int):
+    """Atomically adjust book available quantity inside the caller's transaction"""
+    result = await db.execute(
+        update(models.Book)
+        .where(models.Book.book_id == book_id)
+        .values(quantity_available=models.Book.quantity_available + change)
+        .returning(models.Book.quantity_available)
+    )
+    return result.scalar_one_or_none()
+
+# Loan CRUD operations
+async def get_loan(db: AsyncSession, loan_id: int):
+    """Get a loan by ID"""
+    result = await db.execute(select(models.Loan).where(models.Loan.loan_id == loan_id))
+    return result.scalars().first()
+
+async def get_user_loans(db: AsyncSession, user_id: int, cursor: Optional[str] = None, limit: int = 100, include_total: bool = False, options: Sequence = loading.LOAN_LIST):
+    """Get a page of a user's loans ordered by ID"""
+    query = select(models.Loan).where(models.Loan.user_id == user_id)
+    keys = [(models.Loan.loan_id, False)]
+    return await get_page(db, query, keys, cursor, limit, ("loans", "user", user_id) if include_total else None, options)
+
+async def get_active_loans(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100, include_total: bool = False, options: Sequence = loading.LOAN_LIST, status: str = "active"):
+    """Get a page of loans in a status (active by default) ordered by ID"""
+    query = select(models.Loan).where(models.Loan.status == status)
+    keys = [(models.Loan.loan_id, False)]
+    return await get_page(db, query, keys, cursor, limit, ("loans", status) if include_total else None, options)
+
+async def create_loan(db: AsyncSession, user_id: int, loan: schemas.LoanCreate, days: int = 14):
+    """Create a new loan in a single transaction"""
+    # Conditional decrement: concurrent borrowers can never take the last copy twice
+    reserved = await db.execute(
+        update(models.Book)
+        .where(models.Book.book_id == loan.book_id, models.Book.quantity_available > 0)
+        .values(quantity_available=models.Book.quantity_available - 1, times_borrowed=models.Book.times_borrowed + 1)
+        .returning(models.Book.book_id)
+    )
+    if reserved.first() is None:
+        await db.rollback()
+        return None
+
+    due_date = datetime.utcnow() + timedelta(days=days)
+
+    db_loan = models.Loan(
+        user_id=user_id,
+        book_id=loan.book_id,
+        due_date=due_date,
+        status="active"
+    )
+
+    db.add(db_loan)
+    await circulation.record_async(db, loans={"active": 1}, copies={loan.book_id: -1})
+    await versions.bump_async(db, versions.COPIES)
+    await db.commit()
+    recommendations.record_borrow(user_id, loan.book_id)
+    return db_loan
+
+async def return_book(db: AsyncSession, loan_id: int):
+    """Return a book in a single transaction"""
+    return_date = datetime.utcnow()
+
+    # Only one caller can move a loan out of the active or overdue state. One status at a
+    # time, so the statistics know which count the loan leaves (active is the common case)
+    for previous in OPEN_LOAN_STATUSES:
+        result = await db.execute(
+            update(models.Loan)
+            .where(models.Loan.loan_id == loan_id, models.Loan.status == previous)
+            .values(status="returned", return_date=return_date)
+            .returning(models.Loan)
+        )
+        loan = result.scalars().first()
+        if loan is not None:
+            break
+    if loan is None:
+        await db.rollback()
+        return None
+
+    # Calculate fine if overdue
+    accrued = loan.fine_amount
+    if return_date > loan.due_date:
+        days_overdue = (return_date - loan.due_date).days
+        loan.fine_amount = days_overdue * FINE_PER_DAY
+
+    # Increase available quantity
+    await update_book_quantity(db, loan.book_id, 1)
+    await circulation.record_async(
+        db, loans={previous: -1, "returned": 1}, copies={loan.book_id: 1},
+        fines_cents=circulation.cents(loan.fine_amount) - circulation.cents(accrued),
+    )
+
+    await versions.bump_async(db, versions.COPIES)
+    await db.commit()
+    return loan
+
+async def create_loans(db: AsyncSession, user_id: int, book_ids: list[int], days: int = 14):
+    """Borrow several books in one transaction; returns (book_id, loan or status) pairs in request order"""
+    unique_ids = list(dict.fromkeys(book_ids))
+    # One set-based conditional decrement reserves a copy of every available title
+    result = await db.execute(
+        update(models.Book)
+        .where(models.Book.book_id.in_(unique_ids), models.Book.quantity_available > 0)
+        .values(quantity_available=models.Book.quantity_available - 1, times_borrowed=models.Book.times_borrowed + 1)
+        .returning(models.Book.book_id)
+    )
+    reserved = set(result.scalars().all())
+
+    due_date = datetime.utcnow() + timedelta(days=days)
+    loans = {
+        book_id: models.Loan(user_id=user_id, book_id=book_id, due_date=due_date, status="active")
+        for book_id in unique_ids if book_id in reserved
+    }
+    if loans:
+        db.add_all(loans.values())
+        await circulation.record_async(db, loans={"active": len(loans)}, copies={book_id: -1 for book_id in loans})
+        await versions.bump_async(db, versions.COPIES)
+        await db.commit()
+    else:
+        # Nothing reserved: keep the copies version, and every ETag, as they are
+        await db.rollback()
+    for book_id in loans:
+        recommendations.record_borrow(user_id, book_id)
+
+    outcomes, seen = [], set()
+    for book_id in book_ids:
+        if book_id in seen:
+            outcomes.append((book_id, "duplicate"))
+        else:
+            outcomes.append((book_id, loans.get(book_id, "unavailable")))
+        seen.add(book_id)
+    return outcomes
+
+async def return_books(db: AsyncSession, loan_ids: list[int]):
+    """Return several loans in one transaction; returns (loan_id, loan or status) pairs in request order"""
+    return_date = datetime.utcnow()
+    # One UPDATE per open status, so the statistics know which count each loan leaves
+    loans, previous = {}, {}
+    for status in OPEN_LOAN_STATUSES:
+        pending = set(loan_ids) - set(loans)
+        if not pending:
+            break
+        result = await db.execute(
+            update(models.Loan)
+            .where(models.Loan.loan_id.in_(list(pending)), models.Loan.status == status)
+            .values(status="returned", return_date=return_date)
+            .returning(models.Loan)
+        )
+        for loan in result.scalars().all():
+            loans[loan.loan_id] = loan
+            previous[status] = previous.get(status, 0) - 1
+
+    if loans:
+        copies, fines = {}, 0
+        for loan in loans.values():
+            accrued = loan.fine_amount
+            if return_date > loan.due_date:
+                loan.fine_amount = (return_date - loan.due_date).days * FINE_PER_DAY
+            fines += circulation.cents(loan.fine_amount) - circulation.cents(accrued)
+            copies[loan.book_id] = copies.get(loan.book_id, 0) + 1
+
+        # Put every returned copy back on the shelf with a single UPDATE
+        await db.execute(
+            update(models.Book)
+            .where(models.Book.book_id.in_(list(copies)))
+            .values(quantity_available=models.Book.quantity_available + case(copies, value=models.Book.book_id))
+        )
+        await circulation.record_async(db, loans={**previous, "returned": len(loans)}, fines_cents=fines, copies=copies)
+        await versions.bump_async(db, versions.COPIES)
+        await db.commit()
+    else:
+        # Nothing returned: keep the copies version, and every ETag, as they are
+        await db.rollback()
+
+    outcomes, seen = [], set()
+    for loan_id in loan_ids:
+        if loan_id in seen:
+            outcomes.append((loan_id, "duplicate"))
+        else:
+            outcomes.append((loan_id, loans.get(loan_id, "not_returnable")))
+        seen.add(loan_id)
+    return outcomes
@@ -1,12 +1,14 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.database import get_db
-from app import models, schemas
+from app.database import get_async_db
+from app import models, schemas, hashing
+from app.cache import TTLCache
 import os
 from dotenv import load_dotenv
 
@@ -17,11 +19,21 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 # Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = hashing.pwd_context
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
+# Authenticated principals keyed by token subject, so protected routes skip the user lookup.
+# Invalidated locally on role/status changes; the TTL bounds staleness across workers.
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL)
+
+def invalidate_principal(username: str):
+    """Forget the cached principal for a user after their role or status changes"""
+    principal_cache.delete(username)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against a hashed password"""
     return pwd_context.verify(plain_password, hashed_password)
@@ -46,12 +58,32 @@ def authenticate_user(db: Session, username: str, password: str):
     user = db.query(models.User).filter(models.User.username == username).first()
     if not user:
         return False
-    if not verify_password(password, user.password_hash):
+    verified, new_hash = hashing.verify_and_update(password, user.password_hash)
+    if not verified:
         return False
+    if new_hash:
+        # Stored hash uses an outdated cost, upgrade it now that we know the password
+        user.password_hash = new_hash
+        db.commit()
     return user
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    """Get the current authenticated user from the JWT token"""
+async def authenticate_user_async(db: AsyncSession, username: str, password: str):
+    """Authenticate a user by username and password, hashing in the hashing pool"""
+    result = await db.execute(select(models.User).where(models.User.username == username))
+    user = result.scalars().first()
+    if not user:
+        return False
+    verified, new_hash = await hashing.verify_and_update_async(password, user.password_hash)
+    if not verified:
+        return False
+    if new_hash:
+        # Stored hash uses an outdated cost, upgrade it now that we know the password
+        user.password_hash = new_hash
+        await db.commit()
+    return user
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """Get the current authenticated user from the JWT token, served from principal_cache when possible"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -66,12 +98,19 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
     except JWTError:
         raise credentials_exception
     
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
+    principal = principal_cache.get(token_data.username)
+    if principal is not None:
+        return principal
+
+    result = await db.execute(select(models.User).where(models.User.username == token_data.username))
+    user = result.scalars().first()
     if user is None:
         raise credentials_exception
-    return user
+    principal = schemas.UserResponse.model_validate(user)
+    principal_cache.set(token_data.username, principal)
+    return principal
 
-async def get_current_active_user(current_user: models.User = Depends(get_current_user)):
+async def get_current_active_user(current_user: schemas.UserResponse = Depends(get_current_user)):
     """Get the current active user"""
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -79,7 +118,7 @@ async def get_current_active_user(current_user: models.User = Depends(get_curren
 
 def require_role(allowed_roles: list[str]):
     """Dependency to check if user has required role"""
-    async def role_checker(current_user: models.User = Depends(get_current_active_user)):
+    async def role_checker(current_user: schemas.UserResponse = Depends(get_current_active_user)):
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -0,0 +1,156 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+class TTLCache:
+    """Thread-safe in-process LRU cache whose entries expire after ttl seconds"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        # Counters live apart from entries, so eviction and expiry never reset them
+        self._counters = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0 and self.ttl > 0
+
+    def get(self, key, default=None):
+        """Get a cached value, counting the lookup as a hit or miss"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entry when full"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        """Drop a single entry"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._data.clear()
+
+    def counter(self, key) -> int:
+        """Current value of a counter, 0 if never incremented"""
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def incr(self, key) -> int:
+        """Increment a counter and return its new value"""
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def stats(self) -> dict:
+        """Report size and hit/miss counters"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+class RedisCache:
+    """TTLCache-compatible cache kept in Redis, so every worker shares entries and counters.
+    Pass client to use any object with the redis-py get/set/incr/delete/scan_iter API."""
+
+    def __init__(self, url: str = "redis://localhost:6379/0", ttl: float = 60, prefix: str = "folio:", client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError:
+                raise RuntimeError("The redis cache backend needs the redis package: pip install redis")
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def get(self, key, default=None):
+        """Get a cached value, counting the lookup as a hit or miss"""
+        raw = self.client.get(self.prefix + key)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return pickle.loads(raw)
+
+    def set(self, key, value):
+        """Store a value; Redis expires it after ttl seconds"""
+        if self.enabled:
+            self.client.set(self.prefix + key, pickle.dumps(value), px=int(self.ttl * 1000))
+
+    def delete(self, key):
+        """Drop a single entry"""
+        self.client.delete(self.prefix + key)
+
+    def clear(self):
+        """Drop every entry and counter under this cache's prefix"""
+        for name in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(name)
+
+    def counter(self, key) -> int:
+        """Current value of a counter, 0 if never incremented"""
+        return int(self.client.get(self.prefix + key) or 0)
+
+    def incr(self, key) -> int:
+        """Increment a counter and return its new value"""
+        return self.client.incr(self.prefix + key)
+
+    def stats(self) -> dict:
+        """Report hit/miss counters seen by this process"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "backend": "redis",
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+def make_cache(backend: str, maxsize: int, ttl: float, url: str = "redis://localhost:6379/0"):
+    """Build the cache backend named by configuration: memory or redis"""
+    if backend == "memory":
+        return TTLCache(maxsize=maxsize, ttl=ttl)
+    if backend == "redis":
+        return RedisCache(url=url, ttl=ttl)
+    raise ValueError(f"Unknown cache backend '{backend}', expected memory or redis")
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+import threading
+from typing import Awaitable, Callable, Mapping, Optional, Sequence, Tuple
+from starlette.concurrency import run_in_threadpool
+from app.cache import TTLCache, make_cache
+from app.pagination import PageResult
+
+# Read-through cache for catalog queries. Entries are keyed on the query name and its
+# parameters under the change versions (see versions) that the route's validator read
+# for the tables in the payload. A write bumps those versions in its own transaction, so
+# the next read builds a new key and older entries simply age out; nothing is
+# invalidated at commit. An entry is only ever served under the versions it was loaded
+# at (or newer data), whichever worker loaded it and whichever database it read, so
+# routes load misses through their validator's read session (see replica).
+#
+# Book payloads also carry available copies, which every checkout and return changes.
+# Their keys leave out the "copies" version: an entry remembers the copies version it was
+# loaded at, and a hit at a newer one re-reads just the copy counts of its books and is
+# stored again, instead of reloading the page.
+#
+# The memory backend is per process, so each worker loads its own entries. Use
+# CATALOG_CACHE_BACKEND=redis to share them between workers.
+
+CATALOG_CACHE_BACKEND = os.getenv("CATALOG_CACHE_BACKEND", "memory")
+CATALOG_CACHE_URL = os.getenv("CATALOG_CACHE_URL", "redis://localhost:6379/0")
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "4096"))
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+
+backend = make_cache(CATALOG_CACHE_BACKEND, CATALOG_CACHE_SIZE, CATALOG_CACHE_TTL, CATALOG_CACHE_URL)
+
+# Concurrent misses on one key share a single load instead of stampeding the database
+_inflight = {}
+_stats_lock = threading.Lock()
+loads = 0
+coalesced = 0
+
+async def _call(fn, *args):
+    """Run a backend call, off the event loop when the backend does network I/O"""
+    if isinstance(backend, TTLCache):
+        return fn(*args)
+    return await run_in_threadpool(fn, *args)
+
+# A table whose version is left out of the key, and how to bring an entry up to date with it
+Refresh = Tuple[str, Callable[[object], Awaitable]]
+
+def _key(namespace: str, name: str, params: Sequence, versions: Mapping[str, int]) -> str:
+    tag = ",".join(f"{table}={version}" for table, version in sorted(versions.items()))
+    return f"{namespace}:{tag}:{name}:" + json.dumps(list(params), separators=(",", ":"), default=str)
+
+def freeze(value, schema):
+    """Convert ORM results into response schemas so they can outlive the session;
+    values loaded without a schema (already encoded) are cached as they are"""
+    if value is None or schema is None:
+        return value
+    if isinstance(value, PageResult):
+        items = [schema.model_validate(item) for item in value.items]
+        return PageResult(items=items, next_cursor=value.next_cursor, total=value.total)
+    return schema.model_validate(value)
+
+async def get_or_load(
+    namespace: str, name: str, params: Sequence, loader: Callable[[], Awaitable], schema,
+    versions: Optional[Mapping[str, int]], refresh: Optional[Refresh] = None,
+) -> Optional[object]:
+    """Return the cached result of a catalog query, or run loader once and cache it.
+    versions are the ones the route's validator read; None (not seeded) loads without caching.
+    With refresh=(table, patch), a hit loaded at an older version of table goes through patch."""
+    global loads, coalesced
+    if not backend.enabled or versions is None:
+        return freeze(await loader(), schema)
+
+    live_table, patch = refresh or (None, None)
+    live = versions.get(live_table)
+    key = _key(namespace, name, params, {table: version for table, version in versions.items() if table != live_table})
+    entry = await _call(backend.get, key)
+    if entry is not None:
+        loaded_at, value = entry
+        if loaded_at != live:
+            value = await patch(value)
+            await _call(backend.set, key, (live, value))
+        return value
+
+    pending = _inflight.get(key)
+    if pending is not None:
+        with _stats_lock:
+            coalesced += 1
+        try:
+            loaded_at, value = await asyncio.shield(pending)
+        except asyncio.CancelledError:
+            # The leading request went away mid-load; load for this one instead
+            if not pending.cancelled():
+                raise
+            return freeze(await loader(), schema)
+        # The leading request may have read an older version of the refreshed table
+        return await patch(value) if loaded_at != live and value is not None else value
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    try:
+        value = freeze(await loader(), schema)
+        with _stats_lock:
+            loads += 1
+        if value is not None:
+            await _call(backend.set, key, (live, value))
+        future.set_result((live, value))
+        return value
+    except asyncio.CancelledError:
+        future.cancel()
+        raise
+    except Exception as exc:
+        future.set_exception(exc)
+        # Mark it retrieved, there may be no waiters to do so
+        future.exception()
+        raise
+    finally:
+        del _inflight[key]
+
+def stats() -> dict:
+    """Backend counters plus loads and coalesced misses in this process"""
+    with _stats_lock:
+        return {**backend.stats(), "loads": loads, "coalesced": coalesced, "inflight": len(_inflight)}
@@ -0,0 +1,152 @@
+import time
+from typing import Optional
+from sqlalchemy import case, event, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from app import models
+
+# Circulation statistics kept as running totals, so /stats reads a handful of rows
+# instead of aggregating loans and books:
+#   circulation_counters  loans by status and outstanding fines (in cents), one row each
+#   books.times_borrowed  checkouts per title, indexed for the most-borrowed list
+#   categories.copies_*   copies owned and on the shelf per category
+# Checkouts, returns, the overdue sweep, new books and imports apply their deltas in
+# the same transaction as the change itself. No payments are recorded, so every fine
+# charged counts as outstanding. rebuild() recomputes everything from loans and books
+# (python -m app.cli reconcile-stats) and reports how far the totals had drifted.
+
+LOAN_COUNTERS = ("loans_active", "loans_overdue", "loans_returned")
+COUNTERS = LOAN_COUNTERS + ("fines_cents",)
+
+def cents(amount) -> int:
+    """Money amount (float, Decimal or None) in whole cents"""
+    return round(float(amount or 0) * 100)
+
+def _statements(loans: Optional[dict], fines_cents: int, copies: Optional[dict], categories: Optional[dict]) -> list:
+    statements = []
+    counters = {f"loans_{status}": change for status, change in (loans or {}).items() if change}
+    if fines_cents:
+        counters["fines_cents"] = fines_cents
+    if counters:
+        statements.append(
+            update(models.CirculationCounter)
+            .where(models.CirculationCounter.name.in_(list(counters)))
+            .values(value=models.CirculationCounter.value + case(counters, value=models.CirculationCounter.name))
+        )
+    copies = {book_id: change for book_id, change in (copies or {}).items() if change}
+    if copies:
+        # Copies back on (or off) the shelf, summed per category of the books they belong to
+        change = (
+            select(func.sum(case(copies, value=models.Book.book_id)))
+            .where(models.Book.book_id.in_(list(copies)), models.Book.category_id == models.Category.category_id)
+            .scalar_subquery()
+        )
+        statements.append(
+            update(models.Category)
+            .where(models.Category.category_id.in_(
+                select(models.Book.category_id).where(models.Book.book_id.in_(list(copies)))
+            ))
+            .values(copies_available=models.Category.copies_available + change)
+        )
+    categories = {category_id: totals for category_id, totals in (categories or {}).items() if category_id is not None and any(totals)}
+    if categories:
+        statements.append(
+            update(models.Category)
+            .where(models.Category.category_id.in_(list(categories)))
+            .values(
+                copies_total=models.Category.copies_total + case(
+                    {category_id: total for category_id, (total, _) in categories.items()}, value=models.Category.category_id
+                ),
+                copies_available=models.Category.copies_available + case(
+                    {category_id: available for category_id, (_, available) in categories.items()}, value=models.Category.category_id
+                ),
+            )
+        )
+    return [statement.execution_options(synchronize_session=False) for statement in statements]
+
+def record(db: Session, loans: dict = None, fines_cents: int = 0, copies: dict = None, categories: dict = None):
+    """Apply statistics deltas inside the caller's transaction.
+
+    loans maps a loan status to the change in its count, copies maps a book_id to the
+    change in its available copies and categories maps a category_id to
+    (copies_total, copies_available) changes for books added to it.
+    """
+    for statement in _statements(loans, fines_cents, copies, categories):
+        db.execute(statement)
+
+async def record_async(db: AsyncSession, loans: dict = None, fines_cents: int = 0, copies: dict = None, categories: dict = None):
+    """Apply statistics deltas inside the caller's transaction (see record)"""
+    for statement in _statements(loans, fines_cents, copies, categories):
+        await db.execute(statement)
+
+async def snapshot(db: AsyncSession, top: int = 10) -> dict:
+    """Current statistics, read from the running totals"""
+    counters = dict((await db.execute(select(models.CirculationCounter.name, models.CirculationCounter.value))).all())
+    most_borrowed = await db.execute(
+        select(models.Book.book_id, models.Book.title, models.Book.times_borrowed)
+        .where(models.Book.times_borrowed > 0)
+        .order_by(models.Book.times_borrowed.desc(), models.Book.book_id.desc())
+        .limit(top)
+    )
+    categories = await db.execute(
+        select(models.Category.category_id, models.Category.name, models.Category.copies_total, models.Category.copies_available)
+        .order_by(models.Category.category_id)
+    )
+    return {
+        "loans": {name.removeprefix("loans_"): counters.get(name, 0) for name in LOAN_COUNTERS},
+        "fines_outstanding": counters.get("fines_cents", 0) / 100,
+        "most_borrowed": [
+            {"book_id": book_id, "title": title, "times_borrowed": times_borrowed}
+            for book_id, title, times_borrowed in most_borrowed.all()
+        ],
+        "categories": [
+            {
+                "category_id": category_id, "name": name, "copies_total": total, "copies_available": available,
+                "utilization": round((total - available) / total, 4) if total else 0.0,
+            }
+            for category_id, name, total, available in categories.all()
+        ],
+    }
+
+def rebuild(db: Session) -> dict:
+    """Recompute every running total from loans and books and commit; returns what was corrected"""
+    started = time.perf_counter()
+    counts = dict(db.execute(select(models.Loan.status, func.count()).group_by(models.Loan.status)).all())
+    actual = {name: counts.get(name.removeprefix("loans_"), 0) for name in LOAN_COUNTERS}
+    actual["fines_cents"] = cents(db.scalar(select(func.sum(models.Loan.fine_amount))))
+    stored = dict(db.execute(select(models.CirculationCounter.name, models.CirculationCounter.value)).all())
+    drift = {name: value - stored[name] for name, value in actual.items() if name in stored and stored[name] != value}
+    for name, value in actual.items():
+        if name not in stored:
+            db.execute(insert(models.CirculationCounter).values(name=name, value=value))
+        elif name in drift:
+            db.execute(update(models.CirculationCounter).where(models.CirculationCounter.name == name).values(value=value))
+
+    borrowed = select(func.count()).where(models.Loan.book_id == models.Book.book_id).scalar_subquery()
+    books = db.execute(
+        update(models.Book).where(models.Book.times_borrowed != borrowed).values(times_borrowed=borrowed)
+        .execution_options(synchronize_session=False)
+    )
+
+    in_category = models.Book.category_id == models.Category.category_id
+    total = func.coalesce(select(func.sum(models.Book.quantity_total)).where(in_category).scalar_subquery(), 0)
+    available = func.coalesce(select(func.sum(models.Book.quantity_available)).where(in_category).scalar_subquery(), 0)
+    categories = db.execute(
+        update(models.Category)
+        .where((models.Category.copies_total != total) | (models.Category.copies_available != available))
+        .values(copies_total=total, copies_available=available)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return {
+        "counters": actual,
+        "counter_drift": drift,
+        "books_corrected": books.rowcount,
+        "categories_corrected": categories.rowcount,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+# Seed the counters when create_all builds the table; the migration fills them from existing loans
+@event.listens_for(models.CirculationCounter.__table__, "after_create")
+def _seed_counters(target, connection, **kw):
+    connection.execute(insert(target), [{"name": name, "value": 0} for name in COUNTERS])
@@ -0,0 +1,59 @@
+"""Folio maintenance commands.
+
+    python -m app.cli import-books catalog.csv
+    python -m app.cli import-books catalog.jsonl --chunk-size 5000
+    python -m app.cli sweep-overdue
+    python -m app.cli reconcile-stats
+"""
+import argparse
+import json
+import sys
+from datetime import datetime
+from app.database import SessionLocal
+from app import importer, overdue, circulation
+
+def import_books(args) -> int:
+    """Stream a CSV/JSONL catalog dump into the books table"""
+    fmt = args.format or importer.detect_format(args.path)
+    with open(args.path, "rb") as stream, SessionLocal() as db:
+        report = importer.import_stream(db, stream, fmt, chunk_size=args.chunk_size)
+    print(report.model_dump_json(indent=2))
+    return 1 if report.error_count else 0
+
+def sweep_overdue(args) -> int:
+    """Mark loans past their due date overdue and accrue their fines"""
+    with SessionLocal() as db:
+        report = overdue.sweep_overdue(db, as_of=args.as_of, batch_size=args.batch_size)
+    print(json.dumps(report, indent=2))
+    return 0
+
+def reconcile_stats(args) -> int:
+    """Rebuild the circulation statistics from loans and books"""
+    with SessionLocal() as db:
+        report = circulation.rebuild(db)
+    print(json.dumps(report, indent=2))
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Folio maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    parser_import = commands.add_parser("import-books", help=import_books.__doc__)
+    parser_import.add_argument("path", help="CSV or JSONL file")
+    parser_import.add_argument("--format", choices=importer.FORMATS, help="Default: from the file extension")
+    parser_import.add_argument("--chunk-size", type=int, default=importer.DEFAULT_CHUNK_SIZE)
+    parser_import.set_defaults(handler=import_books)
+
+    parser_sweep = commands.add_parser("sweep-overdue", help=sweep_overdue.__doc__)
+    parser_sweep.add_argument("--as-of", type=datetime.fromisoformat, help="UTC timestamp, default: now")
+    parser_sweep.add_argument("--batch-size", type=int, default=overdue.SWEEP_BATCH_SIZE)
+    parser_sweep.set_defaults(handler=sweep_overdue)
+
+    parser_reconcile = commands.add_parser("reconcile-stats", help=reconcile_stats.__doc__)
+    parser_reconcile.set_defaults(handler=reconcile_stats)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,30 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from app import models, schemas, auth
+from sqlalchemy import case, or_, select, update
+from app import models, schemas, auth, loading, fulltext, pagination, versions, circulation, recommendations, facets
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Sequence
+
+# Fine charged per day a loan is returned late
+FINE_PER_DAY = 0.50
+# Loans that still hold a copy; the overdue sweeper moves active loans past due to overdue
+OPEN_LOAN_STATUSES = ("active", "overdue")
+
+def count_rows(db: Session, key: tuple, query) -> int:
+    """Approximate row count for a list query, cached for pagination.COUNT_CACHE_TTL seconds"""
+    total = pagination.count_cache.get(key)
+    if total is None:
+        total = query.order_by(None).count()
+        pagination.count_cache.set(key, total)
+    return total
+
+def get_page(db: Session, query, keys, cursor: Optional[str], limit: int, count_key: tuple = None, options: Sequence = ()):
+    """Fetch one keyset page of a single-entity query"""
+    total = count_rows(db, count_key, query) if count_key else None
+    rows = pagination.paginate(query.options(*options), keys, cursor, limit).all()
+    items, next_cursor = pagination.split_page(
+        rows, limit, lambda row: [getattr(row, column.key) for column, _ in keys]
+    )
+    return pagination.PageResult(items=items, next_cursor=next_cursor, total=total)
 
 # User CRUD operations
 def get_user_by_username(db: Session, username: str):
@@ -32,23 +54,58 @@ def create_user(db: Session, user: schemas.UserCreate):
     db.refresh(db_user)
     return db_user
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
-    """Get all users with pagination"""
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_users(db: Session, cursor: Optional[str] = None, limit: int = 100, include_total: bool = False):
+    """Get a page of users ordered by ID"""
+    query = db.query(models.User)
+    keys = [(models.User.user_id, False)]
+    return get_page(db, query, keys, cursor, limit, ("users",) if include_total else None)
+
+def get_users_by_ids(db: Session, ids: Sequence[int]):
+    """Get the users with the given IDs in one query, in request order"""
+    rows = db.query(models.User).filter(models.User.user_id.in_(ids)).all()
+    return pagination.PageResult(items=pagination.in_order(rows, ids, lambda user: user.user_id))
+
+def update_user_role(db: Session, user_id: int, role: str):
+    """Change a user's role"""
+    db_user = get_user_by_id(db, user_id)
+    if db_user:
+        db_user.role = role
+        db.commit()
+        db.refresh(db_user)
+        auth.invalidate_principal(db_user.username)
+    return db_user
+
+def set_user_active(db: Session, user_id: int, is_active: bool):
+    """Activate or deactivate a user"""
+    db_user = get_user_by_id(db, user_id)
+    if db_user:
+        db_user.is_active = is_active
+        db.commit()
+        db.refresh(db_user)
+        auth.invalidate_principal(db_user.username)
+    return db_user
 
 # Author CRUD operations
-def get_author(db: Session, author_id: int):
+def get_author(db: Session, author_id: int, options: Sequence = loading.AUTHOR_LIST):
     """Get an author by ID"""
-    return db.query(models.Author).filter(models.Author.author_id == author_id).first()
+    return db.query(models.Author).options(*options).filter(models.Author.author_id == author_id).first()
+
+def get_authors(db: Session, cursor: Optional[str] = None, limit: int = 100, include_total: bool = False, options: Sequence = loading.AUTHOR_LIST):
+    """Get a page of authors ordered by ID"""
+    query = db.query(models.Author)
+    keys = [(models.Author.author_id, False)]
+    return get_page(db, query, keys, cursor, limit, ("authors",) if include_total else None, options)
 
-def get_authors(db: Session, skip: int = 0, limit: int = 100):
-    """Get all authors with pagination"""
-    return db.query(models.Author).offset(skip).limit(limit).all()
+def get_authors_by_ids(db: Session, ids: Sequence[int], options: Sequence = loading.AUTHOR_LIST):
+    """Get the authors with the given IDs in one query, in request order"""
+    rows = db.query(models.Author).options(*options).filter(models.Author.author_id.in_(ids)).all()
+    return pagination.PageResult(items=pagination.in_order(rows, ids, lambda author: author.author_id))
 
 def create_author(db: Session, author: schemas.AuthorCreate):
     """Create a new author"""
     db_author = models.Author(**author.dict())
     db.add(db_author)
+    versions.bump(db, "authors")
     db.commit()
     db.refresh(db_author)
     return db_author
@@ -58,28 +115,44 @@ def get_category(db: Session, category_id: int):
     """Get a category by ID"""
     return db.query(models.Category).filter(models.Category.category_id == category_id).first()
 
-def get_categories(db: Session, skip: int = 0, limit: int = 100):
-    """Get all categories with pagination"""
-    return db.query(models.Category).offset(skip).limit(limit).all()
+def get_categories(db: Session, cursor: Optional[str] = None, limit: int = 100, include_total: bool = False):
+    """Get a page of categories ordered by ID"""
+    query = db.query(models.Category)
+    keys = [(models.Category.category_id, False)]
+    return get_page(db, query, keys, cursor, limit, ("categories",) if include_total else None)
 
 def create_category(db: Session, category: schemas.CategoryCreate):
     """Create a new category"""
     db_category = models.Category(**category.dict())
     db.add(db_category)
+    versions.bump(db, "categories")
     db.commit()
     db.refresh(db_category)
     return db_category
 
 # Book CRUD operations
-def get_book(db: Session, book_id: int):
+def get_book(db: Session, book_id: int, options: Sequence = loading.BOOK_DETAIL):
     """Get a book by ID"""
-    return db.query(models.Book).filter(models.Book.book_id == book_id).first()
+    return db.query(models.Book).options(*options).filter(models.Book.book_id == book_id).first()
 
-def get_books(db: Session, skip: int = 0, limit: int = 100, search: Optional[str] = None):
-    """Get all books with pagination and optional search"""
+def get_books(db: Session, cursor: Optional[str] = None, limit: int = 100, search: Optional[str] = None, include_total: bool = False, options: Sequence = loading.BOOK_LIST, filters: Optional[facets.BookFilters] = None):
+    """Get a page of books, by ID or by relevance when searching, optionally narrowed by facet filters"""
     query = db.query(models.Book)
+    count_key = ("books", search) if include_total else None
+    if filters is not None:
+        query = query.filter(*filters.clauses())
+        count_key = count_key + filters.key() if count_key else None
     
     if search:
+        ranked = fulltext.ranked_book_ids(db.get_bind().dialect.name, search)
+        if ranked is not None:
+            query = query.join(ranked, ranked.c.book_id == models.Book.book_id)
+            total = count_rows(db, count_key, query) if count_key else None
+            # Search pages are keyed on (rank, book_id) so the cursor follows relevance order
+            keys = [(ranked.c.rank, True), (models.Book.book_id, False)]
+            rows = pagination.paginate(query.add_columns(ranked.c.rank).options(*options), keys, cursor, limit).all()
+            rows, next_cursor = pagination.split_page(rows, limit, lambda row: [row.rank, row.Book.book_id])
+            return pagination.PageResult(items=[row.Book for row in rows], next_cursor=next_cursor, total=total)
         query = query.filter(
             or_(
                 models.Book.title.ilike(f"%{search}%"),
@@ -87,43 +160,82 @@ def get_books(db: Session, skip: int = 0, limit: int = 100, search: Optional[str
             )
         )
     
-    return query.offset(skip).limit(limit).all()
+    keys = [(models.Book.book_id, False)]
+    return get_page(db, query, keys, cursor, limit, count_key, options)
+
+def get_books_by_ids(db: Session, ids: Sequence[int], options: Sequence = loading.BOOK_LIST):
+    """Get the books with the given IDs in one query, in request order"""
+    rows = db.query(models.Book).options(*options).filter(models.Book.book_id.in_(ids)).all()
+    return pagination.PageResult(items=pagination.in_order(rows, ids, lambda book: book.book_id))
+
+def get_book_facets(db: Session, search: Optional[str] = None, filters: Optional[facets.BookFilters] = None) -> dict:
+    """Facet counts of the books a search and its filters match, from one grouped query"""
+    dialect = db.get_bind().dialect.name
+    query = select(models.Book)
+    ranked = fulltext.ranked_book_ids(dialect, search) if search else None
+    if ranked is not None:
+        query = query.join(ranked, ranked.c.book_id == models.Book.book_id)
+    elif search:
+        query = query.where(or_(models.Book.title.ilike(f"%{search}%"), models.Book.isbn.ilike(f"%{search}%")))
+    if filters is not None:
+        query = query.where(*filters.clauses())
+    return facets.collect(db.execute(facets.statement(dialect, query)).all())
+
+def get_book_availability(db: Session, ids: Sequence[int]) -> dict:
+    """Available copies of the given books, by book ID, from a two-column query"""
+    rows = db.execute(select(models.Book.book_id, models.Book.quantity_available).where(models.Book.book_id.in_(ids)))
+    return dict(rows.all())
 
 def create_book(db: Session, book: schemas.BookCreate):
     """Create a new book"""
     db_book = models.Book(**book.dict())
     db.add(db_book)
+    db.flush()
+    fulltext.index_book(db, db_book.book_id)
+    circulation.record(db, categories={db_book.category_id: (db_book.quantity_total, db_book.quantity_available)})
+    versions.bump(db, "books")
     db.commit()
     db.refresh(db_book)
     return db_book
 
 def update_book_quantity(db: Session, book_id: int, change: int):
-    """Update book available quantity"""
-    book = get_book(db, book_id)
-    if book:
-        book.quantity_available += change
-        db.commit()
-        db.refresh(book)
-    return book
+    """Atomically adjust book available quantity inside the caller's transaction"""
+    result = db.execute(
+        update(models.Book)
+        .where(models.Book.book_id == book_id)
+        .values(quantity_available=models.Book.quantity_available + change)
+        .returning(models.Book.quantity_available)
+    )
+    return result.scalar_one_or_none()
 
 # Loan CRUD operations
 def get_loan(db: Session, loan_id: int):
     """Get a loan by ID"""
     return db.query(models.Loan).filter(models.Loan.loan_id == loan_id).first()
 
-def get_user_loans(db: Session, user_id: int, skip: int = 0, limit: int = 100):
-    """Get all loans for a user"""
-    return db.query(models.Loan).filter(models.Loan.user_id == user_id).offset(skip).limit(limit).all()
+def get_user_loans(db: Session, user_id: int, cursor: Optional[str] = None, limit: int = 100, include_total: bool = False, options: Sequence = loading.LOAN_LIST):
+    """Get a page of a user's loans ordered by ID"""
+    query = db.query(models.Loan).filter(models.Loan.user_id == user_id)
+    keys = [(models.Loan.loan_id, False)]
+    return get_page(db, query, keys, cursor, limit, ("loans", "user", user_id) if include_total else None, options)
 
-def get_active_loans(db: Session, skip: int = 0, limit: int = 100):
-    """Get all active loans"""
-    return db.query(models.Loan).filter(models.Loan.status == "active").offset(skip).limit(limit).all()
+def get_active_loans(db: Session, cursor: Optional[str] = None, limit: int = 100, include_total: bool = False, options: Sequence = loading.LOAN_LIST, status: str = "active"):
+    """Get a page of loans in a status (active by default) ordered by ID"""
+    query = db.query(models.Loan).filter(models.Loan.status == status)
+    keys = [(models.Loan.loan_id, False)]
+    return get_page(db, query, keys, cursor, limit, ("loans", status) if include_total else None, options)
 
 def create_loan(db: Session, user_id: int, loan: schemas.LoanCreate, days: int = 14):
-    """Create a new loan"""
-    book = get_book(db, loan.book_id)
-    
-    if not book or book.quantity_available <= 0:
+    """Create a new loan in a single transaction"""
+    # Conditional decrement: concurrent borrowers can never take the last copy twice
+    reserved = db.execute(
+        update(models.Book)
+        .where(models.Book.book_id == loan.book_id, models.Book.quantity_available > 0)
+        .values(quantity_available=models.Book.quantity_available - 1, times_borrowed=models.Book.times_borrowed + 1)
+        .returning(models.Book.book_id)
+    )
+    if reserved.first() is None:
+        db.rollback()
         return None
     
     due_date = datetime.utcnow() + timedelta(days=days)
@@ -135,32 +247,134 @@ def create_loan(db: Session, user_id: int, loan: schemas.LoanCreate, days: int =
         status="active"
     )
     
-    # Decrease available quantity
-    update_book_quantity(db, loan.book_id, -1)
-    
     db.add(db_loan)
+    circulation.record(db, loans={"active": 1}, copies={loan.book_id: -1})
+    versions.bump(db, versions.COPIES)
     db.commit()
     db.refresh(db_loan)
+    recommendations.record_borrow(user_id, loan.book_id)
     return db_loan
 
 def return_book(db: Session, loan_id: int):
-    """Return a book"""
-    loan = get_loan(db, loan_id)
+    """Return a book in a single transaction"""
+    return_date = datetime.utcnow()
     
-    if not loan or loan.status != "active":
+    # Only one caller can move a loan out of the active or overdue state. One status at a
+    # time, so the statistics know which count the loan leaves (active is the common case)
+    for previous in OPEN_LOAN_STATUSES:
+        result = db.execute(
+            update(models.Loan)
+            .where(models.Loan.loan_id == loan_id, models.Loan.status == previous)
+            .values(status="returned", return_date=return_date)
+            .returning(models.Loan)
+        )
+        loan = result.scalars().first()
+        if loan is not None:
+            break
+    if loan is None:
+        db.rollback()
         return None
     
-    loan.return_date = datetime.utcnow()
-    loan.status = "returned"
-    
     # Calculate fine if overdue
-    if loan.return_date > loan.due_date:
-        days_overdue = (loan.return_date - loan.due_date).days
-        loan.fine_amount = days_overdue * 0.50  # $0.50 per day
+    accrued = loan.fine_amount
+    if return_date > loan.due_date:
+        days_overdue = (return_date - loan.due_date).days
+        loan.fine_amount = days_overdue * FINE_PER_DAY
     
     # Increase available quantity
     update_book_quantity(db, loan.book_id, 1)
+    circulation.record(
+        db, loans={previous: -1, "returned": 1}, copies={loan.book_id: 1},
+        fines_cents=circulation.cents(loan.fine_amount) - circulation.cents(accrued),
+    )
     
+    versions.bump(db, versions.COPIES)
     db.commit()
-    db.refresh(loan)
-    return loan
\ No newline at end of file
+    return loan
+
+def create_loans(db: Session, user_id: int, book_ids: list[int], days: int = 14):
+    """Borrow several books in one transaction; returns (book_id, loan or status) pairs in request order"""
+    unique_ids = list(dict.fromkeys(book_ids))
+    # One set-based conditional decrement reserves a copy of every available title
+    result = db.execute(
+        update(models.Book)
+        .where(models.Book.book_id.in_(unique_ids), models.Book.quantity_available > 0)
+        .values(quantity_available=models.Book.quantity_available - 1, times_borrowed=models.Book.times_borrowed + 1)
+        .returning(models.Book.book_id)
+    )
+    reserved = set(result.scalars().all())
+    
+    due_date = datetime.utcnow() + timedelta(days=days)
+    loans = {
+        book_id: models.Loan(user_id=user_id, book_id=book_id, due_date=due_date, status="active")
+        for book_id in unique_ids if book_id in reserved
+    }
+    if loans:
+        db.add_all(loans.values())
+        circulation.record(db, loans={"active": len(loans)}, copies={book_id: -1 for book_id in loans})
+        versions.bump(db, versions.COPIES)
+        db.commit()
+    else:
+        # Nothing reserved: keep the copies version, and every ETag, as they are
+        db.rollback()
+    for book_id in loans:
+        recommendations.record_borrow(user_id, book_id)
+    
+    outcomes, seen = [], set()
+    for book_id in book_ids:
+        if book_id in seen:
+            outcomes.append((book_id, "duplicate"))
+        else:
+            outcomes.append((book_id, loans.get(book_id, "unavailable")))
+        seen.add(book_id)
+    return outcomes
+
+def return_books(db: Session, loan_ids: list[int]):
+    """Return several loans in one transaction; returns (loan_id, loan or status) pairs in request order"""
+    return_date = datetime.utcnow()
+    # One UPDATE per open status, so the statistics know which count each loan leaves
+    loans, previous = {}, {}
+    for status in OPEN_LOAN_STATUSES:
+        pending = set(loan_ids) - set(loans)
+        if not pending:
+            break
+        result = db.execute(
+            update(models.Loan)
+            .where(models.Loan.loan_id.in_(list(pending)), models.Loan.status == status)
+            .values(status="returned", return_date=return_date)
+            .returning(models.Loan)
+        )
+        for loan in result.scalars().all():
+            loans[loan.loan_id] = loan
+            previous[status] = previous.get(status, 0) - 1
+    
+    if loans:
+        copies, fines = {}, 0
+        for loan in loans.values():
+            accrued = loan.fine_amount
+            if return_date > loan.due_date:
+                loan.fine_amount = (return_date - loan.due_date).days * FINE_PER_DAY
+            fines += circulation.cents(loan.fine_amount) - circulation.cents(accrued)
+            copies[loan.book_id] = copies.get(loan.book_id, 0) + 1
+    
+        # Put every returned copy back on the shelf with a single UPDATE
+        db.execute(
+            update(models.Book)
+            .where(models.Book.book_id.in_(list(copies)))
+            .values(quantity_available=models.Book.quantity_available + case(copies, value=models.Book.book_id))
+        )
+        circulation.record(db, loans={**previous, "returned": len(loans)}, fines_cents=fines, copies=copies)
+        versions.bump(db, versions.COPIES)
+        db.commit()
+    else:
+        # Nothing returned: keep the copies version, and every ETag, as they are
+        db.rollback()
+    
+    outcomes, seen = [], set()
+    for loan_id in loan_ids:
+        if loan_id in seen:
+            outcomes.append((loan_id, "duplicate"))
+        else:
+            outcomes.append((loan_id, loans.get(loan_id, "not_returnable")))
+        seen.add(loan_id)
+    return outcomes
@@ -1,8 +1,12 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 import os
+import threading
+import time
 from dotenv import load_dotenv
 import urllib
 
@@ -10,19 +14,174 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(
-    DATABASE_URL,
-    poolclass = NullPool,
-    echo = True,
-    fast_executemany = True
-)
+# Async driver for each sync driver used in DATABASE_URL
+ASYNC_DRIVERS = {
+    "mssql": "mssql+aioodbc",
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+def get_async_database_url(url: str = None, override_env: str = "ASYNC_DATABASE_URL") -> str:
+    """Derive the asyncio driver URL from the sync DATABASE_URL"""
+    override = os.getenv(override_env)
+    if override:
+        return override
+    parsed = make_url(url or DATABASE_URL)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver known for '{parsed.drivername}', set ASYNC_DATABASE_URL")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = get_async_database_url()
+
+# Optional read replica, used by read-only routes through app.replica while it keeps up
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL") or None
+
+# Engine profile: dev, test or prod
+DB_PROFILE = os.getenv("DB_PROFILE", "dev")
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait to check out a connection"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.wait_count = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.wait_count += 1
+                self.wait_time_total += waited
+                self.wait_time_max = max(self.wait_time_max, waited)
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """Instrumented pool for engines created with create_async_engine"""
+
+ENGINE_PROFILES = {
+    "dev": {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": 5,
+        "max_overflow": 5,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        # Statement-by-statement output is opt-in (DB_ECHO=1); slow ones go to app.metrics' log
+        "echo": False,
+    },
+    "test": {
+        "poolclass": NullPool,
+        "pool_pre_ping": False,
+        "echo": False,
+    },
+    "prod": {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": 20,
+        "max_overflow": 10,
+        "pool_timeout": 30,
+        "pool_pre_ping": True,
+        "pool_recycle": 1800,
+        "echo": False,
+    },
+}
+
+def _env_override(name: str, cast, default):
+    """Read an optional environment override for a profile setting"""
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    if cast is bool:
+        return value.lower() in ("1", "true", "yes", "on")
+    return cast(value)
+
+def get_engine_options(url: str = None, profile: str = None, is_async: bool = False) -> dict:
+    """Build create_engine keyword arguments for the named profile"""
+    profile = profile or DB_PROFILE
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE '{profile}', expected one of {sorted(ENGINE_PROFILES)}")
+
+    options = dict(ENGINE_PROFILES[profile])
+    options["echo"] = _env_override("DB_ECHO", bool, options["echo"])
+    options["pool_pre_ping"] = _env_override("DB_POOL_PRE_PING", bool, options["pool_pre_ping"])
+    if issubclass(options["poolclass"], QueuePool):
+        options["pool_size"] = _env_override("DB_POOL_SIZE", int, options["pool_size"])
+        options["max_overflow"] = _env_override("DB_MAX_OVERFLOW", int, options["max_overflow"])
+        options["pool_timeout"] = _env_override("DB_POOL_TIMEOUT", float, options.get("pool_timeout", 30))
+        options["pool_recycle"] = _env_override("DB_POOL_RECYCLE", int, options["pool_recycle"])
+
+    if is_async and options["poolclass"] is InstrumentedQueuePool:
+        options["poolclass"] = InstrumentedAsyncQueuePool
+
+    backend = make_url(url or DATABASE_URL).get_backend_name()
+    if backend == "mssql":
+        # pyodbc and aioodbc only
+        options["fast_executemany"] = True
+    elif backend == "sqlite" and not is_async:
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+engine = create_engine(DATABASE_URL, **get_engine_options(DATABASE_URL))
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **get_engine_options(ASYNC_DATABASE_URL, is_async=True))
 
 SessionLocal = sessionmaker(autocommit=False, autoflush = False, bind = engine)
+# expire_on_commit=False: attributes must not lazy-refresh after commit under asyncio
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+if REPLICA_DATABASE_URL:
+    REPLICA_ASYNC_DATABASE_URL = get_async_database_url(REPLICA_DATABASE_URL, "REPLICA_ASYNC_DATABASE_URL")
+    replica_engine = create_engine(REPLICA_DATABASE_URL, **get_engine_options(REPLICA_DATABASE_URL))
+    async_replica_engine = create_async_engine(
+        REPLICA_ASYNC_DATABASE_URL, **get_engine_options(REPLICA_ASYNC_DATABASE_URL, is_async=True)
+    )
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_replica_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+else:
+    # No replica: reads share the primary
+    replica_engine = async_replica_engine = None
+    ReadSessionLocal, AsyncReadSessionLocal = SessionLocal, AsyncSessionLocal
 Base = declarative_base()
 
+def get_pool_stats(bind=None) -> dict:
+    """Report connection pool usage for sizing against real traffic"""
+    bind = bind or engine
+    pool = bind.sync_engine.pool if hasattr(bind, "sync_engine") else bind.pool
+    stats = {
+        "profile": DB_PROFILE,
+        "pool_class": type(pool).__name__,
+    }
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "size": pool.size(),
+            "checked_in": pool.checkedin(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+            "max_overflow": pool._max_overflow,
+        })
+    if isinstance(pool, InstrumentedQueuePool):
+        with pool._stats_lock:
+            stats.update({
+                "wait_count": pool.wait_count,
+                "wait_time_total_ms": round(pool.wait_time_total * 1000, 3),
+                "wait_time_avg_ms": round(pool.wait_time_total * 1000 / pool.wait_count, 3) if pool.wait_count else 0.0,
+                "wait_time_max_ms": round(pool.wait_time_max * 1000, 3),
+            })
+    return stats
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
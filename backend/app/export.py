@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, Optional
+from sqlalchemy import select
+from app import models
+from app.replica import read_sessionmaker
+
+# Streaming exports. Rows are selected as plain column tuples (no ORM identity map)
+# with yield_per, so the driver hands them over batch by batch from a server-side
+# cursor, and each batch is encoded and sent before the next is fetched. Memory stays
+# at one batch whatever the table size.
+
+EXPORT_BATCH_SIZE = 1000
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def books_query(since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """Books with their author and category names, filtered on created_at"""
+    query = (
+        select(
+            models.Book.book_id,
+            models.Book.title,
+            models.Book.isbn,
+            models.Book.author_id,
+            models.Author.name.label("author"),
+            models.Book.category_id,
+            models.Category.name.label("category"),
+            models.Book.description,
+            models.Book.cover_image_url,
+            models.Book.quantity_total,
+            models.Book.quantity_available,
+            models.Book.publication_year,
+            models.Book.created_at,
+        )
+        .outerjoin(models.Author, models.Author.author_id == models.Book.author_id)
+        .outerjoin(models.Category, models.Category.category_id == models.Book.category_id)
+    )
+    if since:
+        query = query.where(models.Book.created_at >= since)
+    if until:
+        query = query.where(models.Book.created_at < until)
+    return query.order_by(models.Book.book_id)
+
+def loans_query(since: Optional[datetime] = None, until: Optional[datetime] = None, status: Optional[str] = None):
+    """Loans filtered on loan_date and status"""
+    query = select(
+        models.Loan.loan_id,
+        models.Loan.user_id,
+        models.Loan.book_id,
+        models.Loan.loan_date,
+        models.Loan.due_date,
+        models.Loan.return_date,
+        models.Loan.status,
+        models.Loan.fine_amount,
+    )
+    if since:
+        query = query.where(models.Loan.loan_date >= since)
+    if until:
+        query = query.where(models.Loan.loan_date < until)
+    if status:
+        query = query.where(models.Loan.status == status)
+    return query.order_by(models.Loan.loan_id)
+
+def users_query(since: Optional[datetime] = None, until: Optional[datetime] = None):
+    """Users without credentials, filtered on created_at"""
+    query = select(
+        models.User.user_id,
+        models.User.username,
+        models.User.email,
+        models.User.full_name,
+        models.User.role,
+        models.User.is_active,
+        models.User.created_at,
+    )
+    if since:
+        query = query.where(models.User.created_at >= since)
+    if until:
+        query = query.where(models.User.created_at < until)
+    return query.order_by(models.User.user_id)
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+def _encode_ndjson(columns: list, rows) -> bytes:
+    return "".join(
+        json.dumps(dict(zip(columns, row)), default=_json_default, separators=(",", ":")) + "\n"
+        for row in rows
+    ).encode()
+
+def _encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(
+        [value.isoformat() if isinstance(value, datetime) else value for value in row] for row in rows
+    )
+    return buffer.getvalue().encode()
+
+def stream_export(query, fmt: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """Yield the encoded result of query one batch at a time"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}', expected one of {sorted(FORMATS)}")
+    with read_sessionmaker()() as db:
+        result = db.execute(query.execution_options(yield_per=batch_size))
+        columns = list(result.keys())
+        if fmt == "csv":
+            yield _encode_csv([columns])
+        for batch in result.partitions():
+            yield _encode_ndjson(columns, batch) if fmt == "ndjson" else _encode_csv(batch)
@@ -0,0 +1,115 @@
+import os
+from dataclasses import astuple, dataclass
+from typing import Optional
+from sqlalchemy import case, func, literal, null, select, tuple_, union_all
+from app import models
+
+# Facet counts for book search: how many matching books there are per category, per
+# author and per publication decade, and how many have a copy on the shelf. They come
+# from one grouped query over the books the search and filters match:
+#   postgresql, mssql  GROUP BY GROUPING SETS, one set per facet, in a single scan
+#   others (sqlite)    UNION ALL of one GROUP BY per facet over the matches as a CTE
+# Either way each row carries one flag per facet telling which set it belongs to
+# (GROUPING() or a literal). Counts are within the current filters, so picking a category
+# narrows the author and decade counts too. Categories and authors keep the FACET_LIMIT
+# largest values; every decade is returned, so the decades add up to the match count.
+
+FACET_LIMIT = int(os.getenv("FACET_LIMIT", "20"))
+GROUPING_SETS_DIALECTS = ("postgresql", "mssql")
+
+decade = models.Book.publication_year // 10 * 10
+on_shelf = func.coalesce(models.Book.quantity_available, 0) > 0
+
+@dataclass(frozen=True)
+class BookFilters:
+    """Facet values a book search is narrowed to; None leaves a facet open"""
+    category_id: Optional[int] = None
+    author_id: Optional[int] = None
+    decade: Optional[int] = None
+    available: Optional[bool] = None
+
+    def clauses(self) -> list:
+        """WHERE clauses selecting the books these filters allow"""
+        clauses = []
+        if self.category_id is not None:
+            clauses.append(models.Book.category_id == self.category_id)
+        if self.author_id is not None:
+            clauses.append(models.Book.author_id == self.author_id)
+        if self.decade is not None:
+            # A range on the year itself rather than on the computed decade
+            start = self.decade - self.decade % 10
+            clauses.append(models.Book.publication_year.between(start, start + 9))
+        if self.available is not None:
+            clauses.append(on_shelf if self.available else ~on_shelf)
+        return clauses
+
+    def key(self) -> tuple:
+        """Filter values for cache and count keys"""
+        return astuple(self)
+
+def statement(dialect: str, query):
+    """One grouped query counting every facet over the books matched by query (a select of models.Book)"""
+    matched = query.with_only_columns(
+        models.Book.category_id,
+        models.Book.author_id,
+        decade.label("decade"),
+        case((on_shelf, 1), else_=0).label("available"),
+    ).order_by(None)
+    if dialect in GROUPING_SETS_DIALECTS:
+        matched = matched.subquery("matched")
+    else:
+        # Read by all four branches, so SQLite materialises it once
+        matched = matched.cte("matched")
+    columns = (matched.c.category_id, models.Category.name, matched.c.author_id, models.Author.name, matched.c.decade, matched.c.available)
+    # Each facet groups by some of the columns: category and author with their names
+    sets = ((0, 1), (2, 3), (4,), (5,))
+
+    def grouped(selected, flags, names: set):
+        query = select(*selected, *flags, func.count()).select_from(matched)
+        if 0 in names:
+            query = query.outerjoin(models.Category, models.Category.category_id == matched.c.category_id)
+        if 1 in names:
+            query = query.outerjoin(models.Author, models.Author.author_id == matched.c.author_id)
+        return query
+
+    if dialect in GROUPING_SETS_DIALECTS:
+        flags = [func.grouping(columns[positions[0]]) for positions in sets]
+        return grouped(columns, flags, {0, 1}).group_by(
+            func.grouping_sets(*(tuple_(*(columns[position] for position in positions)) for positions in sets))
+        )
+    # Without grouping sets, one GROUP BY per facet with the other columns NULL, as GROUPING SETS would
+    # return them; each branch joins only the table its names come from
+    branches = []
+    for facet, positions in enumerate(sets):
+        selected = [column if position in positions else null() for position, column in enumerate(columns)]
+        flags = [literal(int(other != facet)) for other in range(len(sets))]
+        branches.append(grouped(selected, flags, {facet}).group_by(*(columns[position] for position in positions)))
+    return union_all(*branches)
+
+def _top(counts: dict, limit: int) -> list:
+    ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0][0] is None, item[0][0] or 0))
+    return [{"value": value, "label": label, "count": count} for (value, label), count in ranked[:limit]]
+
+def collect(rows, limit: int = FACET_LIMIT) -> dict:
+    """Facet counts from the rows of statement()"""
+    categories, authors, decades = {}, {}, {}
+    available = 0
+    for category_id, category, author_id, author, book_decade, shelf, *flags, count in rows:
+        in_category, in_author, in_decade, in_available = (not flag for flag in flags)
+        if in_category:
+            categories[category_id, category] = categories.get((category_id, category), 0) + count
+        if in_author:
+            authors[author_id, author] = authors.get((author_id, author), 0) + count
+        if in_decade:
+            decades[book_decade] = decades.get(book_decade, 0) + count
+        if in_available and shelf:
+            available += count
+    return {
+        "categories": _top(categories, limit),
+        "authors": _top(authors, limit),
+        "decades": [
+            {"value": value, "label": f"{value}s" if value is not None else None, "count": count}
+            for value, count in sorted(decades.items(), key=lambda item: (item[0] is None, item[0] or 0))
+        ],
+        "available": available,
+    }
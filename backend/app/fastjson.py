@@ -0,0 +1,152 @@
+import os
+from decimal import Decimal
+from typing import Callable, Optional
+import orjson
+from fastapi import Response
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models, fulltext, pagination
+from app.async_crud import count_rows
+
+# Opt-in fast path for list endpoints (FAST_JSON=1). Pages are selected as plain column
+# tuples, so no ORM objects, identity map or relationship loaders are involved, shaped
+# into dicts laid out exactly like the response schemas, and encoded once with orjson.
+# The rows come from our own tables and were validated on the way in, so they are not
+# re-validated on the way out. The default path (ORM + response_model) is unchanged.
+
+FAST_JSON = os.getenv("FAST_JSON", "0") == "1"
+
+AUTHOR_COLUMNS = (models.Author.name, models.Author.bio, models.Author.country, models.Author.author_id)
+CATEGORY_COLUMNS = (models.Category.name, models.Category.description, models.Category.category_id)
+BOOK_COLUMNS = (
+    models.Book.title, models.Book.isbn, models.Book.author_id, models.Book.category_id,
+    models.Book.description, models.Book.cover_image_url, models.Book.quantity_total,
+    models.Book.quantity_available, models.Book.publication_year, models.Book.book_id, models.Book.created_at,
+)
+LOAN_COLUMNS = (
+    models.Loan.book_id, models.Loan.loan_id, models.Loan.user_id, models.Loan.loan_date,
+    models.Loan.due_date, models.Loan.return_date, models.Loan.status, models.Loan.fine_amount,
+)
+USER_COLUMNS = (
+    models.User.username, models.User.email, models.User.full_name, models.User.user_id,
+    models.User.role, models.User.is_active, models.User.created_at,
+)
+
+def _default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+def encode(payload) -> bytes:
+    """Encode a JSON payload with orjson; datetimes come out in the same ISO format as pydantic"""
+    return orjson.dumps(payload, default=_default)
+
+def decode(body: bytes):
+    """Decode a payload made by encode, to change it and encode it again"""
+    return orjson.loads(body)
+
+def json_response(body: bytes, response: Optional[Response] = None) -> Response:
+    """Send pre-encoded JSON, keeping any headers dependencies set on the route's response"""
+    return Response(content=body, media_type="application/json", headers=dict(response.headers) if response else None)
+
+def _plain(columns) -> Callable:
+    names = [column.key for column in columns]
+    return lambda row: dict(zip(names, row))
+
+_author = _plain(AUTHOR_COLUMNS)
+_category = _plain(CATEGORY_COLUMNS)
+_loan = _plain(LOAN_COLUMNS)
+_user = _plain(USER_COLUMNS)
+
+def _book(row) -> dict:
+    book = dict(zip([column.key for column in BOOK_COLUMNS], row[:len(BOOK_COLUMNS)]))
+    author = row[len(BOOK_COLUMNS):len(BOOK_COLUMNS) + len(AUTHOR_COLUMNS)]
+    category = row[len(BOOK_COLUMNS) + len(AUTHOR_COLUMNS):len(BOOK_COLUMNS) + len(AUTHOR_COLUMNS) + len(CATEGORY_COLUMNS)]
+    # An outer join with no match yields all-NULL columns, the ORM path would give None
+    book["author"] = _author(author) if author[-1] is not None else None
+    book["category"] = _category(category) if category[-1] is not None else None
+    return book
+
+async def _page(db: AsyncSession, query, keys, cursor: Optional[str], limit: int, count_key: Optional[tuple], shape: Callable) -> bytes:
+    """Fetch one keyset page of column tuples and encode it as a Page payload"""
+    total = await count_rows(db, count_key, query) if count_key else None
+    result = await db.execute(pagination.paginate(query, keys, cursor, limit))
+    # Sort keys are read by position: they are always selected after the payload columns
+    width = len(query.selected_columns) - len(keys)
+    rows, next_cursor = pagination.split_page(result.all(), limit, lambda row: list(row[width:]))
+    return encode({"items": [shape(row) for row in rows], "next_cursor": next_cursor, "total": total})
+
+async def _by_ids(db: AsyncSession, query, id_column, ids, shape: Callable) -> bytes:
+    """Fetch the rows with the given IDs and encode them as a Page payload in request order"""
+    result = await db.execute(query.where(id_column.in_(ids)))
+    items = pagination.in_order([shape(row) for row in result.all()], ids, lambda item: item[id_column.key])
+    return encode({"items": items, "next_cursor": None, "total": None})
+
+def _keyed(columns, keys) -> tuple:
+    return tuple(columns) + tuple(column.label(f"_key{i}") for i, (column, _) in enumerate(keys))
+
+async def authors_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100, include_total: bool = False) -> bytes:
+    """Encoded page of authors ordered by ID"""
+    keys = [(models.Author.author_id, False)]
+    query = select(*_keyed(AUTHOR_COLUMNS, keys))
+    return await _page(db, query, keys, cursor, limit, ("authors",) if include_total else None, _author)
+
+async def authors_by_ids(db: AsyncSession, ids) -> bytes:
+    """Encoded authors with the given IDs, in request order"""
+    return await _by_ids(db, select(*AUTHOR_COLUMNS), models.Author.author_id, ids, _author)
+
+async def categories_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100, include_total: bool = False) -> bytes:
+    """Encoded page of categories ordered by ID"""
+    keys = [(models.Category.category_id, False)]
+    query = select(*_keyed(CATEGORY_COLUMNS, keys))
+    return await _page(db, query, keys, cursor, limit, ("categories",) if include_total else None, _category)
+
+async def books_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100, search: Optional[str] = None, include_total: bool = False) -> bytes:
+    """Encoded page of books with their author and category, by ID or by relevance when searching"""
+    keys = [(models.Book.book_id, False)]
+    count_key = ("books", search) if include_total else None
+    ranked = fulltext.ranked_book_ids(db.bind.dialect.name, search) if search else None
+    if ranked is not None:
+        keys = [(ranked.c.rank, True), (models.Book.book_id, False)]
+
+    query = (
+        select(*BOOK_COLUMNS, *AUTHOR_COLUMNS, *CATEGORY_COLUMNS, *_keyed((), keys))
+        .outerjoin(models.Author, models.Author.author_id == models.Book.author_id)
+        .outerjoin(models.Category, models.Category.category_id == models.Book.category_id)
+    )
+    if ranked is not None:
+        query = query.join(ranked, ranked.c.book_id == models.Book.book_id)
+    elif search:
+        query = query.where(or_(models.Book.title.ilike(f"%{search}%"), models.Book.isbn.ilike(f"%{search}%")))
+    return await _page(db, query, keys, cursor, limit, count_key, _book)
+
+async def books_by_ids(db: AsyncSession, ids) -> bytes:
+    """Encoded books with the given IDs and their author and category, in request order"""
+    query = (
+        select(*BOOK_COLUMNS, *AUTHOR_COLUMNS, *CATEGORY_COLUMNS)
+        .outerjoin(models.Author, models.Author.author_id == models.Book.author_id)
+        .outerjoin(models.Category, models.Category.category_id == models.Book.category_id)
+    )
+    return await _by_ids(db, query, models.Book.book_id, ids, _book)
+
+async def user_loans_page(db: AsyncSession, user_id: int, cursor: Optional[str] = None, limit: int = 100, include_total: bool = False) -> bytes:
+    """Encoded page of a user's loans ordered by ID"""
+    keys = [(models.Loan.loan_id, False)]
+    query = select(*_keyed(LOAN_COLUMNS, keys)).where(models.Loan.user_id == user_id)
+    return await _page(db, query, keys, cursor, limit, ("loans", "user", user_id) if include_total else None, _loan)
+
+async def loans_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100, include_total: bool = False, status: str = "active") -> bytes:
+    """Encoded page of loans in a status ordered by ID"""
+    keys = [(models.Loan.loan_id, False)]
+    query = select(*_keyed(LOAN_COLUMNS, keys)).where(models.Loan.status == status)
+    return await _page(db, query, keys, cursor, limit, ("loans", status) if include_total else None, _loan)
+
+async def users_page(db: AsyncSession, cursor: Optional[str] = None, limit: int = 100, include_total: bool = False) -> bytes:
+    """Encoded page of users ordered by ID"""
+    keys = [(models.User.user_id, False)]
+    query = select(*_keyed(USER_COLUMNS, keys))
+    return await _page(db, query, keys, cursor, limit, ("users",) if include_total else None, _user)
+
+async def users_by_ids(db: AsyncSession, ids) -> bytes:
+    """Encoded users with the given IDs, in request order"""
+    return await _by_ids(db, select(*USER_COLUMNS), models.User.user_id, ids, _user)
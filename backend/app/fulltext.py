@@ -0,0 +1,126 @@
+import re
+from sqlalchemy import DDL, Float, Integer, event, text
+from app import models
+
+# Full-text book search over title, author name, description and ISBN.
+# Each dialect keeps a `book_search` index using its native engine:
+#   sqlite      FTS5 virtual table, ranked with bm25
+#   postgresql  weighted tsvector column with a GIN index, ranked with ts_rank
+#   mssql       full-text index on a document column, ranked with CONTAINSTABLE
+# The index is updated per book by index_book() and created by the
+# c4e1a7d2b9f0 migration (or by create_all for sqlite/postgresql).
+
+SEARCH_DIALECTS = ("sqlite", "postgresql", "mssql")
+MAX_SEARCH_TERMS = 8
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(search: str) -> list[str]:
+    """Split a search string into lowercase word tokens"""
+    return _TOKEN_RE.findall(search.lower())[:MAX_SEARCH_TERMS]
+
+def build_match_expression(dialect: str, tokens: list[str]) -> str:
+    """Build the native full-text query; every token must match as a prefix"""
+    # Tokens are \w+ only, so no quoting or operator escaping is needed
+    if dialect == "sqlite":
+        return " AND ".join(f'"{token}"*' for token in tokens)
+    if dialect == "postgresql":
+        return " & ".join(f"{token}:*" for token in tokens)
+    if dialect == "mssql":
+        return " AND ".join(f'"{token}*"' for token in tokens)
+    raise ValueError(f"Full-text search is not supported on {dialect}")
+
+_RANKED_IDS_SQL = {
+    "sqlite": (
+        "SELECT rowid AS book_id, -bm25(book_search, 10.0, 5.0, 1.0, 10.0) AS rank "
+        "FROM book_search WHERE book_search MATCH :match"
+    ),
+    "postgresql": (
+        "SELECT book_id, ts_rank(document, to_tsquery('simple', :match)) AS rank "
+        "FROM book_search WHERE document @@ to_tsquery('simple', :match)"
+    ),
+    "mssql": (
+        "SELECT [KEY] AS book_id, [RANK] AS rank "
+        "FROM CONTAINSTABLE(book_search, document, :match)"
+    ),
+}
+
+def ranked_book_ids(dialect: str, search: str):
+    """Subquery of (book_id, rank) for books matching search, or None when not searchable"""
+    tokens = tokenize(search)
+    if not tokens or dialect not in SEARCH_DIALECTS:
+        return None
+    match = build_match_expression(dialect, tokens)
+    return (
+        text(_RANKED_IDS_SQL[dialect])
+        .bindparams(match=match)
+        .columns(book_id=Integer, rank=Float)
+        .subquery("ranked")
+    )
+
+_INDEX_BOOK_SQL = {
+    "sqlite": [
+        "DELETE FROM book_search WHERE rowid {op} :book_id",
+        "INSERT INTO book_search (rowid, title, author, description, isbn) "
+        "SELECT b.book_id, b.title, coalesce(a.name, ''), coalesce(b.description, ''), coalesce(b.isbn, '') "
+        "FROM books b LEFT JOIN authors a ON a.author_id = b.author_id WHERE b.book_id {op} :book_id",
+    ],
+    "postgresql": [
+        "INSERT INTO book_search (book_id, document) "
+        "SELECT b.book_id, "
+        "setweight(to_tsvector('simple', coalesce(b.title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(b.isbn, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(a.name, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(b.description, '')), 'C') "
+        "FROM books b LEFT JOIN authors a ON a.author_id = b.author_id WHERE b.book_id {op} :book_id "
+        "ON CONFLICT (book_id) DO UPDATE SET document = EXCLUDED.document",
+    ],
+    "mssql": [
+        "DELETE FROM book_search WHERE book_id {op} :book_id",
+        "INSERT INTO book_search (book_id, document) "
+        "SELECT b.book_id, CONCAT(b.title, N' ', a.name, N' ', b.isbn, N' ', b.description) "
+        "FROM books b LEFT JOIN authors a ON a.author_id = b.author_id WHERE b.book_id {op} :book_id",
+    ],
+}
+
+def index_statements(dialect: str, book_id: int, after: bool = False) -> list:
+    """Statements that (re)index one book, or every book after book_id when after is set.
+    Empty for dialects without full-text search."""
+    op = ">" if after else "="
+    return [text(sql.format(op=op)).bindparams(book_id=book_id) for sql in _INDEX_BOOK_SQL.get(dialect, [])]
+
+def index_book(db, book_id: int):
+    """Update the search index for one book inside the caller's transaction"""
+    for statement in index_statements(db.get_bind().dialect.name, book_id):
+        db.execute(statement)
+
+def index_books_after(db, book_id: int):
+    """Set-based index update for every book with an ID above book_id, used after bulk inserts"""
+    for statement in index_statements(db.get_bind().dialect.name, book_id, after=True):
+        db.execute(statement)
+
+async def index_book_async(db, book_id: int):
+    """Update the search index for one book inside the caller's transaction"""
+    for statement in index_statements(db.bind.dialect.name, book_id):
+        await db.execute(statement)
+
+# Let create_all build the index for local sqlite/postgresql databases.
+# SQL Server full-text catalogs cannot be created inside a transaction, use the migration.
+event.listen(
+    models.Book.__table__,
+    "after_create",
+    DDL(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS book_search "
+        "USING fts5(title, author, description, isbn, tokenize='unicode61')"
+    ).execute_if(dialect="sqlite"),
+)
+event.listen(
+    models.Book.__table__,
+    "after_create",
+    DDL(
+        "CREATE TABLE IF NOT EXISTS book_search ("
+        "book_id INTEGER PRIMARY KEY REFERENCES books (book_id) ON DELETE CASCADE, "
+        "document tsvector NOT NULL); "
+        "CREATE INDEX IF NOT EXISTS ix_book_search_document ON book_search USING gin (document)"
+    ).execute_if(dialect="postgresql"),
+)
@@ -0,0 +1,96 @@
+import asyncio
+import os
+from typing import TYPE_CHECKING, Optional, Tuple
+from passlib.context import CryptContext
+from dotenv import load_dotenv
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+# Hashing runs in a pool of worker processes, started from a forkserver: forking the
+# server itself once its event loop, threadpool and background tasks have threads
+# running is unsafe. Jobs refer to the functions below by name, so every worker imports
+# app.hashing and with it the app package; the forkserver preloads it once, and each
+# worker it forks starts with it already imported.
+
+load_dotenv()
+
+# bcrypt cost factor. Raising it rehashes users transparently on their next login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Worker processes dedicated to hashing
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Hash jobs allowed in flight (running + queued) before new ones are rejected
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", str(HASH_WORKERS * 8)))
+# Seconds suggested to clients in Retry-After when the pool is saturated
+HASH_RETRY_AFTER = int(os.getenv("HASH_RETRY_AFTER", "1"))
+
+# Password hashing context
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+class HashingBusyError(RuntimeError):
+    """Raised when the hashing pool already has HASH_MAX_PENDING jobs in flight"""
+
+_executor: Optional["ProcessPoolExecutor"] = None
+_pending = 0
+
+def hash_password(password: str) -> str:
+    """Hash a password"""
+    return pwd_context.hash(password)
+
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password, returning a replacement hash if the stored one is outdated"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+def start_executor() -> "ProcessPoolExecutor":
+    """Start the hashing process pool (from the app lifespan) if it is not running"""
+    global _executor
+    if _executor is None:
+        # Imported here: multiprocessing adds ~50 ms to every process that imports app
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["app.hashing"])
+        _executor = ProcessPoolExecutor(max_workers=HASH_WORKERS, mp_context=context)
+        # Starts the forkserver now rather than on the first login
+        _executor.submit(os.getpid)
+    return _executor
+
+def get_executor() -> "ProcessPoolExecutor":
+    """Get the hashing process pool; started on first use outside the app lifespan"""
+    return start_executor()
+
+def shutdown_executor():
+    """Stop the hashing process pool"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def get_hashing_stats() -> dict:
+    """Report hashing pool load"""
+    return {
+        "workers": HASH_WORKERS,
+        "pending": _pending,
+        "max_pending": HASH_MAX_PENDING,
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+    }
+
+async def _submit(fn, *args):
+    """Run fn in the hashing pool, refusing work once the queue is full"""
+    global _pending
+    if _pending >= HASH_MAX_PENDING:
+        raise HashingBusyError("Password hashing pool is saturated")
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_executor(), fn, *args)
+    finally:
+        _pending -= 1
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password in the hashing pool"""
+    return await _submit(hash_password, password)
+
+async def verify_and_update_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password in the hashing pool, returning a replacement hash if outdated"""
+    return await _submit(verify_and_update, plain_password, hashed_password)
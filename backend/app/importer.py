@@ -0,0 +1,171 @@
+import codecs
+import csv
+import json
+import time
+from itertools import islice
+from typing import IO, Iterable, Iterator, Tuple
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app import models, schemas, fulltext, versions, circulation
+
+# Streaming bulk catalog import. Records are read lazily from a CSV or JSONL stream,
+# validated, and written in chunks: authors and categories are resolved (or created)
+# by name with one IN query per chunk, and books go in with a single executemany.
+# Bad rows are reported and skipped; the rest of the chunk is still imported.
+
+DEFAULT_CHUNK_SIZE = 1000
+# Per-row errors kept in the report; the error count is always exact
+MAX_REPORTED_ERRORS = 1000
+
+FORMATS = ("csv", "jsonl")
+
+def detect_format(filename: str) -> str:
+    """Guess the record format from a file name"""
+    lowered = (filename or "").lower()
+    if lowered.endswith((".jsonl", ".ndjson")):
+        return "jsonl"
+    return "csv"
+
+def read_records(stream: IO[bytes], fmt: str) -> Iterator[Tuple[int, object]]:
+    """Yield (line number, raw record) pairs from a binary stream without loading it whole"""
+    text = codecs.getreader("utf-8-sig")(stream)
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "jsonl":
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_no, exc
+    else:
+        raise ValueError(f"Unsupported import format '{fmt}', expected one of {FORMATS}")
+
+def parse_record(raw) -> schemas.BookImportRow:
+    """Validate one raw record; blank CSV cells count as missing"""
+    if isinstance(raw, Exception):
+        raise ValueError(f"Malformed JSON: {raw}")
+    if not isinstance(raw, dict):
+        raise ValueError("Record must be an object")
+    return schemas.BookImportRow(**{key: value for key, value in raw.items() if key and value not in ("", None)})
+
+def _resolve_names(db: Session, model, id_column, name_column, names: set, known: dict) -> int:
+    """Map names to IDs in known, inserting missing ones in one executemany. Returns rows created."""
+    missing = names - known.keys()
+    if not missing:
+        return 0
+    # Author names are not unique, reuse the oldest row for each name
+    lookup = select(name_column, func.min(id_column)).where(name_column.in_(missing)).group_by(name_column)
+    known.update(db.execute(lookup).all())
+    missing -= known.keys()
+    if missing:
+        db.execute(insert(model), [{"name": name} for name in sorted(missing)])
+        known.update(db.execute(lookup).all())
+    return len(missing)
+
+def _import_chunk(db: Session, chunk: list, report: schemas.ImportReport, authors: dict, categories: dict):
+    """Validate and insert one chunk of (line number, raw record) pairs"""
+    rows = []
+    for line_no, raw in chunk:
+        try:
+            rows.append((line_no, parse_record(raw)))
+        except ValidationError as exc:
+            _add_error(report, line_no, "; ".join(
+                f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" for error in exc.errors()
+            ))
+        except (ValueError, TypeError) as exc:
+            _add_error(report, line_no, str(exc))
+    if not rows:
+        return
+
+    # Drop ISBNs that already exist or repeat within the chunk, they would abort the executemany
+    isbns = {row.isbn for _, row in rows if row.isbn}
+    taken = set(db.scalars(select(models.Book.isbn).where(models.Book.isbn.in_(isbns)))) if isbns else set()
+    accepted = []
+    for line_no, row in rows:
+        if row.isbn and row.isbn in taken:
+            _add_error(report, line_no, f"Duplicate ISBN {row.isbn}")
+            continue
+        if row.isbn:
+            taken.add(row.isbn)
+        accepted.append((line_no, row))
+    if not accepted:
+        return
+
+    try:
+        _insert_books(db, accepted, report, authors, categories)
+    except SQLAlchemyError as exc:
+        db.rollback()
+        # The chunk's name lookups may have been rolled back too
+        authors.clear()
+        categories.clear()
+        for line_no, _ in accepted:
+            _add_error(report, line_no, f"Chunk rejected by database: {exc.__class__.__name__}")
+
+def _insert_books(db: Session, accepted: list, report: schemas.ImportReport, authors: dict, categories: dict):
+    """Resolve names and insert the accepted rows of one chunk in a single transaction"""
+    rows = [row for _, row in accepted]
+    authors_created = _resolve_names(
+        db, models.Author, models.Author.author_id, models.Author.name, {row.author for row in rows}, authors
+    )
+    categories_created = _resolve_names(
+        db, models.Category, models.Category.category_id, models.Category.name, {row.category for row in rows}, categories
+    )
+
+    last_book_id = db.scalar(select(func.max(models.Book.book_id))) or 0
+    books = [
+        {
+            "title": row.title,
+            "isbn": row.isbn,
+            "author_id": authors[row.author],
+            "category_id": categories[row.category],
+            "description": row.description,
+            "cover_image_url": row.cover_image_url,
+            "quantity_total": row.quantity_total,
+            "quantity_available": row.quantity_total if row.quantity_available is None else row.quantity_available,
+            "publication_year": row.publication_year,
+        }
+        for row in rows
+    ]
+    db.execute(insert(models.Book), books)
+    fulltext.index_books_after(db, last_book_id)
+    copies = {}
+    for book in books:
+        total, available = copies.get(book["category_id"], (0, 0))
+        copies[book["category_id"]] = (total + book["quantity_total"], available + book["quantity_available"])
+    circulation.record(db, categories=copies)
+    versions.bump(db, "books", *(["authors"] if authors_created else []), *(["categories"] if categories_created else []))
+    db.commit()
+    report.authors_created += authors_created
+    report.categories_created += categories_created
+    report.books_created += len(rows)
+
+def _add_error(report: schemas.ImportReport, line_no: int, message: str):
+    """Record a rejected row in the report"""
+    report.error_count += 1
+    if len(report.errors) < MAX_REPORTED_ERRORS:
+        report.errors.append(schemas.ImportRowError(line=line_no, error=message))
+
+def import_records(db: Session, records: Iterable[Tuple[int, object]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> schemas.ImportReport:
+    """Import (line number, raw record) pairs chunk by chunk, committing each chunk"""
+    start = time.perf_counter()
+    report = schemas.ImportReport()
+    authors, categories = {}, {}
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        report.rows_read += len(chunk)
+        _import_chunk(db, chunk, report, authors, categories)
+    report.elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+    return report
+
+def import_stream(db: Session, stream: IO[bytes], fmt: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> schemas.ImportReport:
+    """Import books from a CSV or JSONL byte stream"""
+    return import_records(db, read_records(stream, fmt), chunk_size)
@@ -0,0 +1,26 @@
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from app import models
+
+# Loader strategies for each endpoint, shaped to what its response schema serializes.
+# Anything not listed raises instead of lazy loading, so one page costs a fixed
+# number of statements whatever its size.
+
+# GET /books/{book_id}: a single row, join the two many-to-one parents in the same SELECT
+BOOK_DETAIL = (
+    joinedload(models.Book.author),
+    joinedload(models.Book.category),
+    raiseload("*"),
+)
+
+# GET /books: one SELECT per relationship for the whole page, keeps LIMIT on the base query
+BOOK_LIST = (
+    selectinload(models.Book.author),
+    selectinload(models.Book.category),
+    raiseload("*"),
+)
+
+# GET /loans, /loans/my-loans: LoanResponse has no nested objects
+LOAN_LIST = (raiseload("*"),)
+
+# GET /authors, /authors/{author_id}: AuthorResponse does not include books
+AUTHOR_LIST = (raiseload("*"),)
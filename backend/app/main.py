@@ -1,15 +1,55 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, File, HTTPException, Query, Request, Response, UploadFile, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import timedelta
-from app.database import get_db, engine, Base
-from app import models, schemas, crud, auth
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+from app.database import get_async_db, engine, async_engine, replica_engine, async_replica_engine, get_pool_stats, SessionLocal, AsyncSessionLocal
+from app import models, schemas, async_crud, auth, hashing, pagination, importer, export, overdue, versions, catalog_cache, fastjson, replica, metrics, startup, admission, circulation, recommendations, facets
 
-Base.metadata.create_all(bind=engine)
+async def warm_catalog_cache():
+    """Load the default first page of each catalog list, exactly as the routes cache it"""
+    async with AsyncSessionLocal() as db:
+        for read_list, tables in ((read_books, versions.BOOK_TABLES), (read_authors, ("authors",)), (read_categories, ("categories",))):
+            seen = await versions.current(db, tables)
+            await read_list(cursor=None, limit=100, include_total=False, response=None, seen=seen, db=db)
 
-app = FastAPI(title="Folio - Library Management System")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Check the schema and warm up before serving, run background tasks, clean up on shutdown"""
+    tasks = []
+    try:
+        hashing.start_executor()
+        tasks.append(await startup.run(warm_catalog_cache))
+        if overdue.SWEEP_INTERVAL > 0:
+            # Sweep overdue loans in the background when OVERDUE_SWEEP_INTERVAL is set
+            tasks.append(asyncio.create_task(overdue.run_periodically()))
+        if replica_engine is not None:
+            # Track replica lag so reads fall back to the primary when it falls behind
+            tasks.append(asyncio.create_task(replica.monitor_lag()))
+        if recommendations.RECOMMENDATIONS_ENABLED:
+            # Built in the background: "also borrowed" lists are empty (503) until it is ready
+            tasks.append(asyncio.create_task(recommendations.run_periodically()))
+        yield
+    finally:
+        # Also on a failed startup: open connections would keep the process alive
+        for task in tasks:
+            if task is not None:
+                task.cancel()
+        # Close pooled asyncio connections on the loop that opened them
+        await async_engine.dispose()
+        if async_replica_engine is not None:
+            await async_replica_engine.dispose()
+        hashing.shutdown_executor()
+
+app = FastAPI(title="Folio - Library Management System", lifespan=lifespan)
+
+# Innermost, so shed requests still get CORS headers and show up in the metrics
+app.add_middleware(admission.AdmissionMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,13 +59,35 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Outermost, so latency includes every other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
+@app.exception_handler(hashing.HashingBusyError)
+async def hashing_busy_handler(request: Request, exc: hashing.HashingBusyError):
+    """Shed login/registration load when the hashing pool is saturated"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server busy, please retry"},
+        headers={"Retry-After": str(hashing.HASH_RETRY_AFTER)},
+    )
+
+@app.exception_handler(pagination.InvalidCursorError)
+async def invalid_cursor_handler(request: Request, exc: pagination.InvalidCursorError):
+    """Reject cursors that were not issued by a list endpoint"""
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
+
+@app.exception_handler(pagination.InvalidIdsError)
+async def invalid_ids_handler(request: Request, exc: pagination.InvalidIdsError):
+    """Reject malformed or oversized multi-get ID lists"""
+    return JSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
+
 # ==================== Authentication Routes ====================
 
 @app.post("/register", response_model=schemas.UserResponse, status_code=status.HTTP_201_CREATED)
-def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
+async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_async_db)):
     """Register a new user"""
     # Check if username already exists
-    db_user = crud.get_user_by_username(db, username=user.username)
+    db_user = await async_crud.get_user_by_username(db, username=user.username)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -33,19 +95,19 @@ def register(user: schemas.UserCreate, db: Session = Depends(get_db)):
         )
     
     # Check if email already exists
-    db_user = crud.get_user_by_email(db, email=user.email)
+    db_user = await async_crud.get_user_by_email(db, email=user.email)
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    return crud.create_user(db=db, user=user)
+    return await async_crud.create_user(db=db, user=user)
 
 @app.post("/token", response_model=schemas.Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     """Login to get access token"""
-    user = auth.authenticate_user(db, form_data.username, form_data.password)
+    user = await auth.authenticate_user_async(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -60,9 +122,9 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.post("/login", response_model=schemas.Token)
-def login_json(user_login: schemas.UserLogin, db: Session = Depends(get_db)):
+async def login_json(user_login: schemas.UserLogin, db: AsyncSession = Depends(get_async_db)):
     """Login with JSON payload to get access token"""
-    user = auth.authenticate_user(db, user_login.username, user_login.password)
+    user = await auth.authenticate_user_async(db, user_login.username, user_login.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -77,56 +139,131 @@ def login_json(user_login: schemas.UserLogin, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.get("/me", response_model=schemas.UserResponse)
-def read_users_me(current_user: models.User = Depends(auth.get_current_active_user)):
+async def read_users_me(current_user: schemas.UserResponse = Depends(auth.get_current_active_user)):
     """Get current user information"""
     return current_user
 
 # ==================== User Routes ====================
 
-@app.get("/users", response_model=List[schemas.UserResponse])
-def read_users(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.require_role(["admin", "librarian"]))
+@app.get("/users", response_model=schemas.Page[schemas.UserResponse])
+async def read_users(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=pagination.MAX_PAGE_SIZE),
+    include_total: bool = False,
+    ids: Optional[str] = None,
+    db: AsyncSession = Depends(replica.get_async_read_db),
+    current_user: schemas.UserResponse = Depends(auth.require_role(["admin", "librarian"]))
 ):
-    """Get all users (Admin/Librarian only)"""
-    users = crud.get_users(db, skip=skip, limit=limit)
+    """Get all users, or exactly the comma-separated ids in one query (Admin/Librarian only)"""
+    if ids is not None:
+        user_ids = pagination.parse_ids(ids)
+        if fastjson.FAST_JSON:
+            return fastjson.json_response(await fastjson.users_by_ids(db, user_ids))
+        return await async_crud.get_users_by_ids(db, user_ids)
+    if fastjson.FAST_JSON:
+        return fastjson.json_response(
+            await fastjson.users_page(db, cursor=cursor, limit=limit, include_total=include_total)
+        )
+    users = await async_crud.get_users(db, cursor=cursor, limit=limit, include_total=include_total)
     return users
 
 @app.get("/users/{user_id}", response_model=schemas.UserResponse)
-def read_user(
+async def read_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    db: AsyncSession = Depends(replica.get_async_read_db),
+    current_user: schemas.UserResponse = Depends(auth.get_current_active_user)
 ):
     """Get a specific user"""
-    db_user = crud.get_user_by_id(db, user_id=user_id)
+    db_user = await async_crud.get_user_by_id(db, user_id=user_id)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return db_user
+
+@app.put("/users/{user_id}/role", response_model=schemas.UserResponse)
+async def update_user_role(
+    user_id: int,
+    role_update: schemas.UserRoleUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserResponse = Depends(auth.require_role(["admin"]))
+):
+    """Change a user's role (Admin only)"""
+    db_user = await async_crud.update_user_role(db, user_id=user_id, role=role_update.role)
+    if db_user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return db_user
+
+@app.put("/users/{user_id}/status", response_model=schemas.UserResponse)
+async def update_user_status(
+    user_id: int,
+    status_update: schemas.UserStatusUpdate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserResponse = Depends(auth.require_role(["admin", "librarian"]))
+):
+    """Activate or deactivate a user (Admin/Librarian only)"""
+    db_user = await async_crud.set_user_active(db, user_id=user_id, is_active=status_update.is_active)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
     return db_user
 
 # ==================== Author Routes ====================
 
+# ETag/Last-Modified for catalog reads, from the change versions of every table in the payload;
+# they return those versions, which key the route's catalog cache entries. Routes take the
+# same read session as their validator (FastAPI resolves get_async_read_db once per request),
+# so a miss is loaded from the database whose versions key it: the replica while it is fresh,
+# the primary when it lags or the caller has just written
+AUTHOR_VERSIONS = versions.conditional_get("authors")
+CATEGORY_VERSIONS = versions.conditional_get("categories")
+BOOK_VERSIONS = versions.conditional_get(*versions.BOOK_TABLES)
+
 @app.post("/authors", response_model=schemas.AuthorResponse, status_code=status.HTTP_201_CREATED)
-def create_author(
+async def create_author(
     author: schemas.AuthorCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.require_role(["admin", "librarian"]))
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserResponse = Depends(auth.require_role(["admin", "librarian"]))
 ):
     """Create a new author (Admin/Librarian only)"""
-    return crud.create_author(db=db, author=author)
+    return await async_crud.create_author(db=db, author=author)
 
-@app.get("/authors", response_model=List[schemas.AuthorResponse])
-def read_authors(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    """Get all authors"""
-    authors = crud.get_authors(db, skip=skip, limit=limit)
-    return authors
+@app.get("/authors", response_model=schemas.Page[schemas.AuthorResponse])
+async def read_authors(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=pagination.MAX_PAGE_SIZE),
+    include_total: bool = False,
+    ids: Optional[str] = None,
+    response: Response = None,
+    seen: Optional[dict] = Depends(AUTHOR_VERSIONS),
+    db: AsyncSession = Depends(replica.get_async_read_db)
+):
+    """Get all authors, or exactly the comma-separated ids in one query"""
+    if ids is not None:
+        author_ids = pagination.parse_ids(ids)
+        if fastjson.FAST_JSON:
+            body = await catalog_cache.get_or_load(
+                "authors", "ids.json", author_ids, lambda: fastjson.authors_by_ids(db, author_ids), None, seen,
+            )
+            return fastjson.json_response(body, response)
+        return await catalog_cache.get_or_load(
+            "authors", "ids", author_ids, lambda: async_crud.get_authors_by_ids(db, author_ids), schemas.AuthorResponse, seen,
+        )
+    if fastjson.FAST_JSON:
+        body = await catalog_cache.get_or_load(
+            "authors", "list.json", [cursor, limit, include_total],
+            lambda: fastjson.authors_page(db, cursor=cursor, limit=limit, include_total=include_total), None, seen,
+        )
+        return fastjson.json_response(body, response)
+    return await catalog_cache.get_or_load(
+        "authors", "list", [cursor, limit, include_total],
+        lambda: async_crud.get_authors(db, cursor=cursor, limit=limit, include_total=include_total),
+        schemas.AuthorResponse, seen,
+    )
 
 @app.get("/authors/{author_id}", response_model=schemas.AuthorResponse)
-def read_author(author_id: int, db: Session = Depends(get_db)):
+async def read_author(author_id: int, seen: Optional[dict] = Depends(AUTHOR_VERSIONS), db: AsyncSession = Depends(replica.get_async_read_db)):
     """Get a specific author"""
-    db_author = crud.get_author(db, author_id=author_id)
+    db_author = await catalog_cache.get_or_load(
+        "authors", "detail", [author_id], lambda: async_crud.get_author(db, author_id=author_id), schemas.AuthorResponse, seen,
+    )
     if db_author is None:
         raise HTTPException(status_code=404, detail="Author not found")
     return db_author
@@ -134,24 +271,43 @@ def read_author(author_id: int, db: Session = Depends(get_db)):
 # ==================== Category Routes ====================
 
 @app.post("/categories", response_model=schemas.CategoryResponse, status_code=status.HTTP_201_CREATED)
-def create_category(
+async def create_category(
     category: schemas.CategoryCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.require_role(["admin", "librarian"]))
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserResponse = Depends(auth.require_role(["admin", "librarian"]))
 ):
     """Create a new category (Admin/Librarian only)"""
-    return crud.create_category(db=db, category=category)
+    return await async_crud.create_category(db=db, category=category)
 
-@app.get("/categories", response_model=List[schemas.CategoryResponse])
-def read_categories(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+@app.get("/categories", response_model=schemas.Page[schemas.CategoryResponse])
+async def read_categories(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=pagination.MAX_PAGE_SIZE),
+    include_total: bool = False,
+    response: Response = None,
+    seen: Optional[dict] = Depends(CATEGORY_VERSIONS),
+    db: AsyncSession = Depends(replica.get_async_read_db)
+):
     """Get all categories"""
-    categories = crud.get_categories(db, skip=skip, limit=limit)
-    return categories
+    if fastjson.FAST_JSON:
+        body = await catalog_cache.get_or_load(
+            "categories", "list.json", [cursor, limit, include_total],
+            lambda: fastjson.categories_page(db, cursor=cursor, limit=limit, include_total=include_total), None, seen,
+        )
+        return fastjson.json_response(body, response)
+    return await catalog_cache.get_or_load(
+        "categories", "list", [cursor, limit, include_total],
+        lambda: async_crud.get_categories(db, cursor=cursor, limit=limit, include_total=include_total),
+        schemas.CategoryResponse, seen,
+    )
 
 @app.get("/categories/{category_id}", response_model=schemas.CategoryResponse)
-def read_category(category_id: int, db: Session = Depends(get_db)):
+async def read_category(category_id: int, seen: Optional[dict] = Depends(CATEGORY_VERSIONS), db: AsyncSession = Depends(replica.get_async_read_db)):
     """Get a specific category"""
-    db_category = crud.get_category(db, category_id=category_id)
+    db_category = await catalog_cache.get_or_load(
+        "categories", "detail", [category_id],
+        lambda: async_crud.get_category(db, category_id=category_id), schemas.CategoryResponse, seen,
+    )
     if db_category is None:
         raise HTTPException(status_code=404, detail="Category not found")
     return db_category
@@ -159,80 +315,369 @@ def read_category(category_id: int, db: Session = Depends(get_db)):
 # ==================== Book Routes ====================
 
 @app.post("/books", response_model=schemas.BookResponse, status_code=status.HTTP_201_CREATED)
-def create_book(
+async def create_book(
     book: schemas.BookCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.require_role(["admin", "librarian"]))
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserResponse = Depends(auth.require_role(["admin", "librarian"]))
 ):
     """Create a new book (Admin/Librarian only)"""
-    return crud.create_book(db=db, book=book)
+    return await async_crud.create_book(db=db, book=book)
+
+@app.post("/books/import", response_model=schemas.ImportReport)
+async def import_books(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|jsonl)$"),
+    chunk_size: int = Query(importer.DEFAULT_CHUNK_SIZE, ge=1, le=10000),
+    current_user: schemas.UserResponse = Depends(auth.require_role(["admin", "librarian"]))
+):
+    """Bulk import books from a CSV or JSONL upload (Admin/Librarian only)"""
+    fmt = format or importer.detect_format(file.filename)
+
+    def run_import():
+        with SessionLocal() as db:
+            return importer.import_stream(db, file.file, fmt, chunk_size=chunk_size)
+
+    # executemany runs on the sync engine, keep it off the event loop
+    return await run_in_threadpool(run_import)
+
+def live_copies(db: AsyncSession) -> catalog_cache.Refresh:
+    """Refresh for cached book payloads: checkouts and returns only change their copy counts"""
+    return versions.COPIES, lambda value: with_copies(db, value)
+
+async def with_copies(db: AsyncSession, value):
+    """A cached book payload (a book, a page, or a page pre-encoded by fastjson) with its copy counts re-read"""
+    if isinstance(value, bytes):
+        payload = fastjson.decode(value)
+        copies = await async_crud.get_book_availability(db, [book["book_id"] for book in payload["items"]])
+        for book in payload["items"]:
+            book["quantity_available"] = copies.get(book["book_id"], book["quantity_available"])
+        return fastjson.encode(payload)
+    books = value.items if isinstance(value, pagination.PageResult) else [value]
+    copies = await async_crud.get_book_availability(db, [book.book_id for book in books])
+    # Copies, not in-place updates: the memory backend hands the same objects to concurrent requests
+    books = [book.model_copy(update={"quantity_available": copies.get(book.book_id, book.quantity_available)}) for book in books]
+    if isinstance(value, pagination.PageResult):
+        return pagination.PageResult(items=books, next_cursor=value.next_cursor, total=value.total)
+    return books[0]
+
+@app.get("/books", response_model=schemas.Page[schemas.BookResponse])
+async def read_books(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=pagination.MAX_PAGE_SIZE),
+    include_total: bool = False,
+    search: str = None,
+    ids: Optional[str] = None,
+    response: Response = None,
+    seen: Optional[dict] = Depends(BOOK_VERSIONS),
+    db: AsyncSession = Depends(replica.get_async_read_db)
+):
+    """Get all books with optional search, or exactly the comma-separated ids in one query"""
+    if ids is not None:
+        book_ids = pagination.parse_ids(ids)
+        if fastjson.FAST_JSON:
+            body = await catalog_cache.get_or_load(
+                "books", "ids.json", book_ids, lambda: fastjson.books_by_ids(db, book_ids), None, seen, live_copies(db),
+            )
+            return fastjson.json_response(body, response)
+        return await catalog_cache.get_or_load(
+            "books", "ids", book_ids, lambda: async_crud.get_books_by_ids(db, book_ids), schemas.BookResponse,
+            seen, live_copies(db),
+        )
+    if fastjson.FAST_JSON:
+        body = await catalog_cache.get_or_load(
+            "books", "list.json", [cursor, limit, search, include_total],
+            lambda: fastjson.books_page(db, cursor=cursor, limit=limit, search=search, include_total=include_total), None,
+            seen, live_copies(db),
+        )
+        return fastjson.json_response(body, response)
+    return await catalog_cache.get_or_load(
+        "books", "list", [cursor, limit, search, include_total],
+        lambda: async_crud.get_books(db, cursor=cursor, limit=limit, search=search, include_total=include_total),
+        schemas.BookResponse, seen, live_copies(db),
+    )
+
+# These two are declared before /books/{book_id}, which would otherwise take "search" and "availability" as IDs
+@app.get("/books/search", response_model=schemas.FacetedBookPage)
+async def search_books(
+    search: Optional[str] = None,
+    category_id: Optional[int] = None,
+    author_id: Optional[int] = None,
+    decade: Optional[int] = None,
+    available: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=pagination.MAX_PAGE_SIZE),
+    seen: Optional[dict] = Depends(BOOK_VERSIONS),
+    db: AsyncSession = Depends(replica.get_async_read_db)
+):
+    """Search books narrowed by category, author, decade or availability, with facet counts for all matches"""
+    filters = facets.BookFilters(category_id=category_id, author_id=author_id, decade=decade, available=available)
+    page = await catalog_cache.get_or_load(
+        "books", "search", [cursor, limit, search, *filters.key()],
+        lambda: async_crud.get_books(db, cursor=cursor, limit=limit, search=search, filters=filters),
+        # Filtering on availability picks the books by their copies, so then they key the entry
+        schemas.BookResponse, seen, live_copies(db) if available is None else None,
+    )
+    # Shared by every page of the same search; the available count depends on copies
+    counts = await catalog_cache.get_or_load(
+        "books", "facets", [search, *filters.key()],
+        lambda: async_crud.get_book_facets(db, search=search, filters=filters), schemas.BookFacets, seen,
+    )
+    return schemas.FacetedBookPage(
+        items=page.items, next_cursor=page.next_cursor, total=sum(entry.count for entry in counts.decades), facets=counts,
+    )
 
-@app.get("/books", response_model=List[schemas.BookResponse])
-def read_books(skip: int = 0, limit: int = 100, search: str = None, db: Session = Depends(get_db)):
-    """Get all books with optional search"""
-    books = crud.get_books(db, skip=skip, limit=limit, search=search)
-    return books
+@app.get("/books/availability", response_model=Dict[int, int], dependencies=[Depends(versions.conditional_get("books", versions.COPIES))])
+async def read_book_availability(ids: str, db: AsyncSession = Depends(replica.get_async_read_db)):
+    """Get available copies by book ID for the comma-separated ids"""
+    return await async_crud.get_book_availability(db, pagination.parse_ids(ids))
 
 @app.get("/books/{book_id}", response_model=schemas.BookResponse)
-def read_book(book_id: int, db: Session = Depends(get_db)):
+async def read_book(book_id: int, seen: Optional[dict] = Depends(BOOK_VERSIONS), db: AsyncSession = Depends(replica.get_async_read_db)):
     """Get a specific book"""
-    db_book = crud.get_book(db, book_id=book_id)
+    db_book = await catalog_cache.get_or_load(
+        "books", "detail", [book_id], lambda: async_crud.get_book(db, book_id=book_id), schemas.BookResponse,
+        seen, live_copies(db),
+    )
     if db_book is None:
         raise HTTPException(status_code=404, detail="Book not found")
     return db_book
 
+@app.get("/books/{book_id}/recommendations", response_model=List[schemas.RecommendedBook])
+async def read_book_recommendations(
+    book_id: int,
+    limit: int = Query(10, ge=1, le=recommendations.RECOMMENDATIONS_TOP_K),
+    db: AsyncSession = Depends(replica.get_async_read_db)
+):
+    """Get the books most often borrowed by patrons who also borrowed this one"""
+    if not recommendations.RECOMMENDATIONS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    ranked = recommendations.recommend(book_id, limit)
+    if ranked is None:
+        raise HTTPException(status_code=503, detail="Recommendations are still being built", headers={"Retry-After": "30"})
+    if not ranked:
+        return []
+    counts = dict(ranked)
+    # No validators here, the ranking changes with every rebuild; the versions only key the cache entry
+    seen = await versions.current(db, versions.BOOK_TABLES)
+    books = await catalog_cache.get_or_load(
+        "books", "ids", list(counts), lambda: async_crud.get_books_by_ids(db, list(counts)), schemas.BookResponse,
+        seen, live_copies(db),
+    )
+    return [schemas.RecommendedBook(**book.model_dump(), borrowed_together=counts[book.book_id]) for book in books.items]
+
 # ==================== Loan Routes ====================
 
 @app.post("/loans", response_model=schemas.LoanResponse, status_code=status.HTTP_201_CREATED)
-def create_loan(
+async def create_loan(
     loan: schemas.LoanCreate,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserResponse = Depends(auth.get_current_active_user)
 ):
     """Create a new loan (borrow a book)"""
-    db_loan = crud.create_loan(db=db, user_id=current_user.user_id, loan=loan)
+    db_loan = await async_crud.create_loan(db=db, user_id=current_user.user_id, loan=loan)
     if db_loan is None:
         raise HTTPException(status_code=400, detail="Book not available")
+    await replica.stick(request)
     return db_loan
 
-@app.get("/loans/my-loans", response_model=List[schemas.LoanResponse])
-def read_my_loans(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+@app.post("/loans/batch", response_model=schemas.LoanBatchResponse)
+async def create_loans_batch(
+    batch: schemas.LoanBatchCreate,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserResponse = Depends(auth.get_current_active_user)
+):
+    """Borrow several books in one transaction, with a result per book"""
+    outcomes = await async_crud.create_loans(db, user_id=current_user.user_id, book_ids=batch.book_ids)
+    items = [
+        {"book_id": book_id, "status": "success", "loan": outcome}
+        if isinstance(outcome, models.Loan) else {"book_id": book_id, "status": outcome}
+        for book_id, outcome in outcomes
+    ]
+    succeeded = sum(item["status"] == "success" for item in items)
+    if succeeded:
+        await replica.stick(request)
+    return {"items": items, "succeeded": succeeded, "failed": len(items) - succeeded}
+
+@app.put("/loans/batch/return", response_model=schemas.LoanBatchResponse)
+async def return_loans_batch(
+    batch: schemas.LoanBatchReturn,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserResponse = Depends(auth.get_current_active_user)
+):
+    """Return several borrowed books in one transaction, with a result per loan"""
+    outcomes = await async_crud.return_books(db, loan_ids=batch.loan_ids)
+    items = [
+        {"loan_id": loan_id, "book_id": outcome.book_id, "status": "success", "loan": outcome}
+        if isinstance(outcome, models.Loan) else {"loan_id": loan_id, "status": outcome}
+        for loan_id, outcome in outcomes
+    ]
+    succeeded = sum(item["status"] == "success" for item in items)
+    if succeeded:
+        await replica.stick(request)
+    return {"items": items, "succeeded": succeeded, "failed": len(items) - succeeded}
+
+@app.get("/loans/my-loans", response_model=schemas.Page[schemas.LoanResponse])
+async def read_my_loans(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=pagination.MAX_PAGE_SIZE),
+    include_total: bool = False,
+    db: AsyncSession = Depends(replica.get_async_read_db),
+    current_user: schemas.UserResponse = Depends(auth.get_current_active_user)
 ):
     """Get current user's loans"""
-    loans = crud.get_user_loans(db, user_id=current_user.user_id, skip=skip, limit=limit)
+    if fastjson.FAST_JSON:
+        return fastjson.json_response(await fastjson.user_loans_page(
+            db, user_id=current_user.user_id, cursor=cursor, limit=limit, include_total=include_total
+        ))
+    loans = await async_crud.get_user_loans(
+        db, user_id=current_user.user_id, cursor=cursor, limit=limit, include_total=include_total
+    )
     return loans
 
-@app.get("/loans", response_model=List[schemas.LoanResponse])
-def read_all_loans(
-    skip: int = 0,
-    limit: int = 100,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.require_role(["admin", "librarian"]))
+@app.get("/loans", response_model=schemas.Page[schemas.LoanResponse])
+async def read_all_loans(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=pagination.MAX_PAGE_SIZE),
+    include_total: bool = False,
+    status: models.LoanStatus = models.LoanStatus.ACTIVE,
+    db: AsyncSession = Depends(replica.get_async_read_db),
+    current_user: schemas.UserResponse = Depends(auth.require_role(["admin", "librarian"]))
 ):
-    """Get all active loans (Admin/Librarian only)"""
-    loans = crud.get_active_loans(db, skip=skip, limit=limit)
+    """Get all loans in a status, active by default (Admin/Librarian only)"""
+    if fastjson.FAST_JSON:
+        return fastjson.json_response(await fastjson.loans_page(
+            db, cursor=cursor, limit=limit, include_total=include_total, status=status.value
+        ))
+    loans = await async_crud.get_active_loans(
+        db, cursor=cursor, limit=limit, include_total=include_total, status=status.value
+    )
     return loans
 
 @app.put("/loans/{loan_id}/return", response_model=schemas.LoanResponse)
-def return_loan(
+async def return_loan(
     loan_id: int,
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(auth.get_current_active_user)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserResponse = Depends(auth.get_current_active_user)
 ):
     """Return a borrowed book"""
-    db_loan = crud.return_book(db, loan_id=loan_id)
+    db_loan = await async_crud.return_book(db, loan_id=loan_id)
     if db_loan is None:
         raise HTTPException(status_code=400, detail="Loan not found or already returned")
+    await replica.stick(request)
     return db_loan
 
+# ==================== Statistics Routes ====================
+
+@app.get("/stats", response_model=schemas.CirculationStats)
+async def read_circulation_stats(
+    top: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(replica.get_async_read_db),
+    current_user: schemas.UserResponse = Depends(auth.require_role(["admin", "librarian"]))
+):
+    """Get loan counts, most-borrowed books, category utilization and outstanding fines (Admin/Librarian only)"""
+    return await circulation.snapshot(db, top=top)
+
+# ==================== Export Routes ====================
+
+def export_response(query, fmt: str, name: str) -> StreamingResponse:
+    """Stream an export query as a downloadable NDJSON/CSV file"""
+    extension = "csv" if fmt == "csv" else "ndjson"
+    return StreamingResponse(
+        export.stream_export(query, fmt),
+        media_type=export.FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{extension}"'},
+    )
+
+@app.get("/export/books")
+async def export_books(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: schemas.UserResponse = Depends(auth.require_role(["admin", "librarian"]))
+):
+    """Stream all books, optionally created within [since, until) (Admin/Librarian only)"""
+    return export_response(export.books_query(since, until), format, "books")
+
+@app.get("/export/loans")
+async def export_loans(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    status: Optional[models.LoanStatus] = None,
+    current_user: schemas.UserResponse = Depends(auth.require_role(["admin", "librarian"]))
+):
+    """Stream loans made within [since, until), optionally by status (Admin/Librarian only)"""
+    return export_response(export.loans_query(since, until, status.value if status else None), format, "loans")
+
+@app.get("/export/users")
+async def export_users(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    current_user: schemas.UserResponse = Depends(auth.require_role(["admin"]))
+):
+    """Stream all users, optionally registered within [since, until) (Admin only)"""
+    return export_response(export.users_query(since, until), format, "users")
+
+# ==================== Admin Routes ====================
+
+@app.get("/admin/pool-stats")
+async def read_pool_stats(current_user: schemas.UserResponse = Depends(auth.require_role(["admin"]))):
+    """Get database connection pool statistics (Admin only)"""
+    stats = {
+        "sync": get_pool_stats(engine),
+        "async": get_pool_stats(async_engine),
+        "hashing": hashing.get_hashing_stats(),
+        "replica": replica.stats(),
+        "admission": admission.stats(),
+    }
+    if replica_engine is not None:
+        stats["replica"].update({"sync": get_pool_stats(replica_engine), "async": get_pool_stats(async_replica_engine)})
+    return stats
+
+@app.get("/admin/cache-stats")
+async def read_cache_stats(current_user: schemas.UserResponse = Depends(auth.require_role(["admin"]))):
+    """Get in-process cache hit/miss counters (Admin only)"""
+    return {
+        "principals": auth.principal_cache.stats(),
+        "catalog": catalog_cache.stats(),
+        "recommendations": recommendations.stats(),
+    }
+
+@app.get("/admin/startup")
+async def read_startup_report(current_user: schemas.UserResponse = Depends(auth.require_role(["admin"]))):
+    """Get how long this worker took to start, by phase (Admin only)"""
+    return {"budget_ms": startup.STARTUP_BUDGET_MS, "schema_check": startup.SCHEMA_CHECK, "phases_ms": startup.report}
+
+@app.get("/admin/overdue-sweep")
+async def read_overdue_sweep(current_user: schemas.UserResponse = Depends(auth.require_role(["admin"]))):
+    """Get the report of the last overdue sweep run by this process (Admin only)"""
+    return {"interval": overdue.SWEEP_INTERVAL, "last_report": overdue.last_report}
+
+@app.post("/admin/overdue-sweep")
+async def run_overdue_sweep(current_user: schemas.UserResponse = Depends(auth.require_role(["admin"]))):
+    """Mark overdue loans and accrue fines now (Admin only)"""
+    report = await run_in_threadpool(overdue.run_sweep)
+    if report is None:
+        raise HTTPException(status_code=409, detail="An overdue sweep is already running")
+    return report
+
+@app.get("/metrics", include_in_schema=False)
+async def read_metrics():
+    """Request, SQL and connection pool metrics in Prometheus text format"""
+    if not metrics.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    metrics.observe_pools(primary=engine, primary_async=async_engine, replica=replica_engine, replica_async=async_replica_engine)
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
 # ==================== Root Route ====================
 
 @app.get("/")
-def root():
+async def root():
     """API root endpoint"""
     return {
         "message": "Welcome to Folio Library Management System API",
@@ -0,0 +1,267 @@
+import logging
+import os
+import re
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional, Sequence
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.database import get_pool_stats
+
+# Request and database metrics in Prometheus text format, without a client library.
+# MetricsMiddleware times every request and labels it with its route template (not the
+# raw path, which would give one series per book ID). Engine-wide cursor events time
+# every SQL statement and charge it to the request running it, found through a context
+# variable that follows the request into threadpool calls and async driver greenlets.
+# Statements slower than SLOW_QUERY_MS are logged with their route; this replaces
+# echo=True, which printed every statement and slowed everything down.
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Statements slower than this many milliseconds are logged; 0 turns the log off
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "250"))
+# Longest statement text written to the slow query log
+SLOW_QUERY_MAX_CHARS = int(os.getenv("SLOW_QUERY_MAX_CHARS", "2000"))
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+STATEMENT_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class Metric:
+    """Base of the metric types: a name, help text and label names"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _label_text(self, values: tuple, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> list:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> list:
+        with self._lock:
+            return [f"{self.name}{self._label_text(labels)} {_number(value)}" for labels, value in sorted(self._values.items())]
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values = {}
+
+    def set(self, value: float, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> list:
+        with self._lock:
+            return [f"{self.name}{self._label_text(labels)} {_number(value)}" for labels, value in sorted(self._values.items())]
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float], labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (last one is +Inf), sum]
+        self._series = {}
+
+    def observe(self, value: float, *labels):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def samples(self) -> list:
+        lines = []
+        with self._lock:
+            series = sorted((labels, list(counts), total) for labels, (counts, total) in self._series.items())
+        for labels, counts, total in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{self._label_text(labels, bucket)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{self._label_text(labels)} {cumulative}")
+        return lines
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+REGISTRY: list = []
+
+http_requests = Counter("folio_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+http_duration = Histogram("folio_http_request_duration_seconds", "HTTP request latency", HTTP_BUCKETS, ("method", "route"))
+http_in_progress = Gauge("folio_http_requests_in_progress", "HTTP requests being served", ("method",))
+request_statements = Histogram(
+    "folio_http_request_db_statements", "SQL statements run per HTTP request", STATEMENT_COUNT_BUCKETS, ("route",)
+)
+request_db_time = Histogram("folio_http_request_db_seconds", "Time spent in SQL per HTTP request", HTTP_BUCKETS, ("route",))
+db_statements = Counter("folio_db_statements_total", "SQL statements by route (background work has route \"background\")", ("route",))
+db_duration = Histogram("folio_db_statement_duration_seconds", "SQL statement latency", DB_BUCKETS, ("route",))
+db_slow = Counter("folio_db_slow_statements_total", "SQL statements slower than SLOW_QUERY_MS", ("route",))
+db_errors = Counter("folio_db_statement_errors_total", "SQL statements that raised", ("route",))
+pool_connections = Gauge("folio_db_pool_connections", "Pooled connections by engine and state", ("engine", "state"))
+pool_wait = Gauge("folio_db_pool_wait_seconds_total", "Time spent waiting for a pooled connection", ("engine",))
+
+class RequestStats:
+    """Database work done on behalf of one request"""
+    __slots__ = ("scope", "statements", "db_seconds")
+
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.statements = 0
+        self.db_seconds = 0.0
+
+    @property
+    def route(self) -> str:
+        return route_of(self.scope)
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+# endpoint function -> route template, filled in lazily from the app's routes
+_route_paths = {}
+
+def route_of(scope: dict) -> str:
+    """Route template the router matched for this request, 'unmatched' before routing or on a 404"""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    path = _route_paths.get(endpoint)
+    if path is None:
+        _route_paths.update({route.endpoint: route.path for route in scope["app"].routes if hasattr(route, "endpoint")})
+        path = _route_paths.setdefault(endpoint, getattr(endpoint, "__name__", "unknown"))
+    return path
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and database work per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        method = scope["method"]
+        http_in_progress.inc(method)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request.reset(token)
+            http_in_progress.inc(method, amount=-1)
+            route = stats.route
+            http_requests.inc(method, route, str(status))
+            http_duration.observe(elapsed, method, route)
+            request_statements.observe(stats.statements, route)
+            request_db_time.observe(stats.db_seconds, route)
+
+def _one_line(statement: str) -> str:
+    statement = re.sub(r"\s+", " ", statement).strip()
+    return statement if len(statement) <= SLOW_QUERY_MAX_CHARS else statement[:SLOW_QUERY_MAX_CHARS] + "..."
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    if METRICS_ENABLED:
+        conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _finish_statement(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("metrics_started")
+    if not started:
+        return
+    elapsed = time.perf_counter() - started.pop()
+    stats = current_request.get()
+    route = stats.route if stats is not None else "background"
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+    db_statements.inc(route)
+    db_duration.observe(elapsed, route)
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        db_slow.inc(route)
+        # Statement text only: bound parameters can hold credentials and personal data
+        method = stats.scope["method"] if stats is not None else "-"
+        logger.warning("Slow query %.1f ms on %s %s: %s", elapsed * 1000, method, route, _one_line(statement))
+
+@event.listens_for(Engine, "handle_error")
+def _failed_statement(exception_context):
+    connection = exception_context.connection
+    started = connection.info.get("metrics_started") if connection is not None else None
+    if started:
+        started.pop()
+        stats = current_request.get()
+        db_errors.inc(stats.route if stats is not None else "background")
+
+def observe_pools(**binds):
+    """Copy connection pool usage of the named engines into the pool gauges"""
+    for name, bind in binds.items():
+        if bind is None:
+            continue
+        stats = get_pool_stats(bind)
+        for state in ("checked_in", "checked_out"):
+            if state in stats:
+                pool_connections.set(stats[state], name, state)
+        if "wait_time_total_ms" in stats:
+            pool_wait.set(stats["wait_time_total_ms"] / 1000, name)
+
+def render() -> str:
+    """Every registered metric in Prometheus text exposition format"""
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
@@ -44,6 +44,9 @@ class Category(Base):
     category_id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String(50), unique=True, nullable=False, index=True)
     description = Column(Text)
+    # Running totals over the category's books, kept by app.circulation
+    copies_total = Column(Integer, nullable=False, default=0, server_default="0")
+    copies_available = Column(Integer, nullable=False, default=0, server_default="0")
     
     books = relationship("Book", back_populates="category")
 
@@ -53,19 +56,24 @@ class Book(Base):
     book_id = Column(Integer, primary_key=True, autoincrement=True)
     title = Column(String(200), nullable=False, index=True)
     isbn = Column(String(13), unique=True, index=True)
-    author_id = Column(Integer, ForeignKey("authors.author_id"))
-    category_id = Column(Integer, ForeignKey("categories.category_id"))
+    author_id = Column(Integer, ForeignKey("authors.author_id"), index=True)
+    category_id = Column(Integer, ForeignKey("categories.category_id"), index=True)
     description = Column(Text)
     cover_image_url = Column(String(500))
     quantity_total = Column(Integer, default=1)
     quantity_available = Column(Integer, default=1)
     publication_year = Column(Integer)
     created_at = Column(DateTime, default=datetime.utcnow)
+    # Checkouts of this title ever, kept by app.circulation
+    times_borrowed = Column(Integer, nullable=False, default=0, server_default="0")
     
     author = relationship("Author", back_populates="books")
     category = relationship("Category", back_populates="books")
     loans = relationship("Loan", back_populates="book")
 
+    # Most-borrowed list, read newest-first on ties
+    __table_args__ = (Index("ix_books_times_borrowed_book_id", "times_borrowed", "book_id"),)
+
 class Loan(Base):
     __tablename__ = "loans"
     
@@ -79,4 +87,30 @@ class Loan(Base):
     fine_amount = Column(Numeric(10, 2), default=0.00)
     
     user = relationship("User", back_populates="loans")
-    book = relationship("Book", back_populates="loans")
\ No newline at end of file
+    book = relationship("Book", back_populates="loans")
+
+    # Shaped to the keyset queries in crud: filter column first, then the loan_id sort key.
+    # The due-date index only covers loans still out, which is all the overdue sweep reads.
+    __table_args__ = (
+        Index("ix_loans_user_id_loan_id", "user_id", "loan_id"),
+        Index("ix_loans_status_loan_id", "status", "loan_id"),
+        Index(
+            "ix_loans_open_due_date", "status", "due_date",
+            postgresql_where=text("status IN ('active', 'overdue')"),
+            sqlite_where=text("status IN ('active', 'overdue')"),
+            mssql_where=text("status IN ('active', 'overdue')"),
+        ),
+    )
+
+class ChangeVersion(Base):
+    __tablename__ = "change_versions"
+    
+    table_name = Column(String(50), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class CirculationCounter(Base):
+    __tablename__ = "circulation_counters"
+    
+    name = Column(String(50), primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
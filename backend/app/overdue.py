@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Integer, Numeric, and_, bindparam, cast, func, or_, select, update
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import FunctionElement
+from starlette.concurrency import run_in_threadpool
+from app import models, circulation
+from app.crud import FINE_PER_DAY, OPEN_LOAN_STATUSES
+from app.database import SessionLocal
+
+# Overdue sweeper. Moves active loans past their due date to overdue and accrues
+# their fines, all set-based in SQL. Loans are walked in loan_id windows, one
+# commit per window, so an interrupted run keeps its progress; every statement is
+# idempotent for a given as_of, so rerunning (or two workers racing) is harmless.
+
+logger = logging.getLogger(__name__)
+
+# Seconds between in-process sweeps; 0 disables the scheduler (run the CLI from cron instead)
+SWEEP_INTERVAL = float(os.getenv("OVERDUE_SWEEP_INTERVAL", "0"))
+SWEEP_BATCH_SIZE = int(os.getenv("OVERDUE_SWEEP_BATCH_SIZE", "10000"))
+
+# Rendered inline instead of bound, so the planner can match the partial ix_loans_open_due_date
+# (SQL Server never uses a filtered index for a parameterized predicate)
+OPEN_LOANS = models.Loan.status.in_(
+    bindparam("open_statuses", list(OPEN_LOAN_STATUSES), expanding=True, literal_execute=True)
+)
+
+class days_between(FunctionElement):
+    """Whole days elapsed from the first datetime to the second"""
+    type = Integer()
+    name = "days_between"
+    inherit_cache = True
+
+@compiles(days_between)
+def _days_between_default(element, compiler, **kw):
+    start, end = [compiler.process(clause, **kw) for clause in element.clauses]
+    return f"CAST(FLOOR(EXTRACT(EPOCH FROM ({end} - {start})) / 86400) AS INTEGER)"
+
+@compiles(days_between, "sqlite")
+def _days_between_sqlite(element, compiler, **kw):
+    start, end = [compiler.process(clause, **kw) for clause in element.clauses]
+    return f"CAST(julianday({end}) - julianday({start}) AS INTEGER)"
+
+@compiles(days_between, "mssql")
+def _days_between_mssql(element, compiler, **kw):
+    start, end = [compiler.process(clause, **kw) for clause in element.clauses]
+    return f"(DATEDIFF(minute, {start}, {end}) / 1440)"
+
+def sweep_overdue(db: Session, as_of: Optional[datetime] = None, batch_size: int = SWEEP_BATCH_SIZE) -> dict:
+    """Mark loans overdue and accrue their fines as of a point in time"""
+    started = time.perf_counter()
+    as_of = as_of or datetime.utcnow()
+    report = {"as_of": as_of.isoformat(), "marked_overdue": 0, "fines_updated": 0, "batches": 0}
+
+    low, high = db.execute(
+        select(func.min(models.Loan.loan_id), func.max(models.Loan.loan_id))
+        .where(OPEN_LOANS, models.Loan.due_date < as_of)
+    ).first()
+
+    fine = cast(days_between(models.Loan.due_date, as_of) * FINE_PER_DAY, Numeric(10, 2))
+    while low is not None and low <= high:
+        window = and_(models.Loan.loan_id >= low, models.Loan.loan_id < low + batch_size)
+        marked = db.execute(
+            update(models.Loan)
+            .where(window, models.Loan.status == "active", models.Loan.due_date < as_of)
+            .values(status="overdue")
+            .execution_options(synchronize_session=False)
+        )
+        stale_fine = and_(
+            window,
+            models.Loan.status == "overdue",
+            models.Loan.due_date < as_of,
+            or_(models.Loan.fine_amount.is_(None), models.Loan.fine_amount != fine),
+        )
+        # What the fines are about to grow by, for the outstanding fines total
+        accrued = db.scalar(select(func.sum(fine - func.coalesce(models.Loan.fine_amount, 0))).where(stale_fine))
+        fined = db.execute(
+            update(models.Loan)
+            .where(stale_fine)
+            .values(fine_amount=fine)
+            .execution_options(synchronize_session=False)
+        )
+        circulation.record(
+            db, loans={"active": -marked.rowcount, "overdue": marked.rowcount}, fines_cents=circulation.cents(accrued),
+        )
+        db.commit()
+        report["marked_overdue"] += marked.rowcount
+        report["fines_updated"] += fined.rowcount
+        report["batches"] += 1
+        low += batch_size
+
+    report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    return report
+
+_sweep_lock = threading.Lock()
+last_report: Optional[dict] = None
+
+def run_sweep(as_of: Optional[datetime] = None) -> Optional[dict]:
+    """Run one sweep with its own session, or return None if one is already running here"""
+    global last_report
+    if not _sweep_lock.acquire(blocking=False):
+        return None
+    try:
+        with SessionLocal() as db:
+            last_report = sweep_overdue(db, as_of=as_of)
+        logger.info("Overdue sweep: %s", last_report)
+        return last_report
+    finally:
+        _sweep_lock.release()
+
+async def run_periodically(interval: float = SWEEP_INTERVAL):
+    """Sweep every interval seconds until cancelled"""
+    while True:
+        try:
+            await run_in_threadpool(run_sweep)
+        except Exception:
+            logger.exception("Overdue sweep failed")
+        await asyncio.sleep(interval)
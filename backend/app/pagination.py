@@ -0,0 +1,83 @@
+import base64
+import json
+import os
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+from sqlalchemy import and_, or_
+from app.cache import TTLCache
+
+# Keyset (cursor) pagination. A cursor is the opaque, base64-encoded sort key of the
+# last row on the previous page; the next page starts strictly after it, so deep pages
+# cost the same as the first and new rows never shift existing pages.
+
+MAX_PAGE_SIZE = 500
+
+# Approximate totals, so list endpoints don't run COUNT(*) on every call
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", "30"))
+count_cache = TTLCache(maxsize=1024, ttl=COUNT_CACHE_TTL)
+
+@dataclass
+class PageResult:
+    items: list
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor this API did not issue"""
+
+class InvalidIdsError(ValueError):
+    """Raised when a multi-get ids parameter is malformed or too long"""
+
+def encode_cursor(values: Sequence) -> str:
+    """Encode sort key values as an opaque cursor"""
+    raw = json.dumps(list(values), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor back into its sort key values"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise InvalidCursorError("Invalid cursor")
+    return values
+
+def after(keys: Sequence[Tuple[object, bool]], values: Sequence):
+    """Condition selecting rows that sort after values; keys are (column, descending) pairs"""
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        equal_prefix = [keys[j][0] == values[j] for j in range(i)]
+        beyond = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal_prefix, beyond))
+    return or_(*clauses)
+
+def paginate(query, keys: Sequence[Tuple[object, bool]], cursor: Optional[str], limit: int):
+    """Apply keyset ordering, the cursor position and limit + 1 to a Query or Select"""
+    if cursor:
+        query = query.filter(after(keys, decode_cursor(cursor, len(keys))))
+    order = [column.desc() if descending else column.asc() for column, descending in keys]
+    return query.order_by(*order).limit(limit + 1)
+
+def split_page(rows: list, limit: int, key_of) -> Tuple[list, Optional[str]]:
+    """Trim the look-ahead row and build the next cursor from the last row kept"""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(key_of(rows[-1]))
+
+def parse_ids(ids: str) -> list:
+    """IDs of a multi-get (comma-separated), deduplicated in request order"""
+    try:
+        values = list(dict.fromkeys(int(value) for value in ids.split(",")))
+    except ValueError:
+        raise InvalidIdsError("ids must be comma-separated integers")
+    if len(values) > MAX_PAGE_SIZE:
+        raise InvalidIdsError(f"At most {MAX_PAGE_SIZE} ids per request")
+    return values
+
+def in_order(rows: list, ids: Sequence[int], key_of) -> list:
+    """Rows in the order their IDs were requested; IDs without a row are left out"""
+    found = {key_of(row): row for row in rows}
+    return [found[row_id] for row_id in ids if row_id in found]
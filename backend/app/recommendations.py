@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Optional
+from sqlalchemy import func, select
+from starlette.concurrency import run_in_threadpool
+from app import models
+from app.database import SessionLocal
+
+# "Patrons also borrowed". Two books co-occur once for every patron who has borrowed
+# both; recommendations for a book are the books it co-occurs with most.
+#
+# build() reads the distinct (user_id, book_id) pairs from loans into a sparse binary
+# patron x book matrix A and computes the co-occurrence counts A.T @ A with SciPy, a
+# block of books at a time so the full book x book matrix never exists. Only the top
+# RECOMMENDATIONS_TOP_K neighbours of each book are kept, in two int32 arrays (book IDs
+# and counts), so a lookup is one row read. Patrons with more than
+# RECOMMENDATIONS_MAX_HISTORY distinct titles (test accounts, branch transfers) are
+# left out: they would make every book a neighbour of every other.
+#
+# Each checkout is applied as it commits: the new title gains one co-occurrence with
+# every title already in the patron's history, and each of those with it. A neighbour
+# cut from a top-K list is not known any more, so it can only come back once its list
+# has a free slot; the periodic rebuild (RECOMMENDATIONS_REBUILD_INTERVAL) makes the
+# lists exact again. The index lives in each worker, which only applies the checkouts
+# it served itself until its next rebuild.
+
+logger = logging.getLogger(__name__)
+
+RECOMMENDATIONS_ENABLED = os.getenv("RECOMMENDATIONS_ENABLED", "1") == "1"
+RECOMMENDATIONS_TOP_K = int(os.getenv("RECOMMENDATIONS_TOP_K", "20"))
+RECOMMENDATIONS_MAX_HISTORY = int(os.getenv("RECOMMENDATIONS_MAX_HISTORY", "500"))
+# Seconds between full rebuilds; 0 builds once at startup
+RECOMMENDATIONS_REBUILD_INTERVAL = float(os.getenv("RECOMMENDATIONS_REBUILD_INTERVAL", "3600"))
+
+# Books per A.T @ A block and loan rows per fetch while building
+BUILD_BLOCK = 4096
+FETCH_CHUNK = 100_000
+
+class CooccurrenceIndex:
+    """Top-K co-occurring books per book, plus the patron histories needed to update it"""
+
+    def __init__(self, neighbors, counts, rows, history_indptr, history_books, excluded: set, max_loan_id: int):
+        # (books with neighbours, K) book IDs and counts, 0 in free slots
+        self.neighbors = neighbors
+        self.counts = counts
+        # book_id -> row in neighbors/counts, -1 if none
+        self.rows = rows
+        # Each patron's distinct books, CSR style
+        self.history_indptr = history_indptr
+        self.history_books = history_books
+        # Patrons over RECOMMENDATIONS_MAX_HISTORY
+        self.excluded = excluded
+        self.max_loan_id = max_loan_id
+        # Books and patrons the arrays have no room for, filled by checkouts after the build
+        self.extra_neighbors = {}
+        self.extra_history = {}
+        self.updates = 0
+
+    def history(self, user_id: int) -> set:
+        books = set(self.extra_history.get(user_id, ()))
+        if user_id + 1 < len(self.history_indptr):
+            start, end = self.history_indptr[user_id], self.history_indptr[user_id + 1]
+            books.update(self.history_books[start:end].tolist())
+        return books
+
+    def _bump(self, book_id: int, other: int):
+        row = self.rows[book_id] if book_id < len(self.rows) else -1
+        if row < 0:
+            extra = self.extra_neighbors.setdefault(book_id, {})
+            extra[other] = extra.get(other, 0) + 1
+            return
+        neighbors, counts = self.neighbors[row], self.counts[row]
+        hit = (neighbors == other).nonzero()[0]
+        if hit.size:
+            counts[hit[0]] += 1
+            return
+        slot = counts.argmin()
+        if counts[slot] == 0:
+            neighbors[slot] = other
+            counts[slot] = 1
+
+    def add_borrow(self, user_id: int, book_id: int):
+        """Count one patron borrowing one book"""
+        if user_id in self.excluded:
+            return
+        history = self.history(user_id)
+        if book_id in history:
+            return
+        if len(history) >= RECOMMENDATIONS_MAX_HISTORY:
+            self.excluded.add(user_id)
+            return
+        for other in history:
+            self._bump(book_id, other)
+            self._bump(other, book_id)
+        self.extra_history.setdefault(user_id, []).append(book_id)
+        self.updates += 1
+
+    def lookup(self, book_id: int, limit: int) -> list:
+        """(book_id, count) pairs for a book, highest count first"""
+        row = self.rows[book_id] if 0 <= book_id < len(self.rows) else -1
+        pairs = {}
+        if row >= 0:
+            pairs = {int(other): int(count) for other, count in zip(self.neighbors[row], self.counts[row]) if count}
+        for other, count in self.extra_neighbors.get(book_id, {}).items():
+            pairs[other] = pairs.get(other, 0) + count
+        return sorted(pairs.items(), key=lambda pair: (-pair[1], pair[0]))[:limit]
+
+def _load_pairs(db, max_loan_id: int):
+    """(user_id, book_id) arrays of every loan up to max_loan_id"""
+    import numpy as np
+    result = db.execute(
+        select(models.Loan.user_id, models.Loan.book_id)
+        .where(models.Loan.loan_id <= max_loan_id, models.Loan.user_id.is_not(None), models.Loan.book_id.is_not(None))
+        .execution_options(yield_per=FETCH_CHUNK)
+    )
+    chunks = [np.array(rows, dtype=np.int64).reshape(-1, 2) for rows in result.partitions()]
+    pairs = np.concatenate(chunks) if chunks else np.empty((0, 2), dtype=np.int64)
+    return pairs[:, 0], pairs[:, 1]
+
+def build(top_k: int = RECOMMENDATIONS_TOP_K, max_history: int = RECOMMENDATIONS_MAX_HISTORY) -> CooccurrenceIndex:
+    """Build the index from every loan committed so far"""
+    # Deferred: numpy and scipy take a while to import and are only needed here
+    import numpy as np
+    from scipy import sparse
+
+    with SessionLocal() as db:
+        max_loan_id = db.scalar(select(func.max(models.Loan.loan_id))) or 0
+        users, books = _load_pairs(db, max_loan_id)
+    n_users = int(users.max()) + 1 if users.size else 1
+    n_books = int(books.max()) + 1 if books.size else 1
+
+    # Patron x book, 1 where the patron ever borrowed the book
+    a = sparse.csr_matrix((np.ones(users.size, dtype=np.int32), (users, books)), shape=(n_users, n_books))
+    a.sum_duplicates()
+    a.data[:] = 1
+    history_indptr, history_books = a.indptr.astype(np.int64), a.indices.astype(np.int32)
+
+    lengths = np.diff(a.indptr)
+    excluded = set(np.flatnonzero(lengths > max_history).tolist())
+    if excluded:
+        a.data[np.repeat(lengths > max_history, lengths)] = 0
+        a.eliminate_zeros()
+
+    by_book = a.T.tocsr()
+    rows = np.full(n_books, -1, dtype=np.int32)
+    neighbors, counts = [], []
+    for start in range(0, n_books, BUILD_BLOCK):
+        block = (by_book[start:start + BUILD_BLOCK] @ a).tocsr()
+        for offset in range(block.shape[0]):
+            begin, end = block.indptr[offset], block.indptr[offset + 1]
+            others, together = block.indices[begin:end], block.data[begin:end]
+            keep = others != start + offset
+            others, together = others[keep], together[keep]
+            if not others.size:
+                continue
+            if others.size > top_k:
+                best = np.argpartition(-together, top_k - 1)[:top_k]
+                others, together = others[best], together[best]
+            order = np.lexsort((others, -together))
+            row_neighbors = np.zeros(top_k, dtype=np.int32)
+            row_counts = np.zeros(top_k, dtype=np.int32)
+            row_neighbors[:order.size] = others[order]
+            row_counts[:order.size] = together[order]
+            rows[start + offset] = len(neighbors)
+            neighbors.append(row_neighbors)
+            counts.append(row_counts)
+
+    shape = (len(neighbors), top_k)
+    return CooccurrenceIndex(
+        np.vstack(neighbors) if neighbors else np.zeros(shape, dtype=np.int32),
+        np.vstack(counts) if counts else np.zeros(shape, dtype=np.int32),
+        rows, history_indptr, history_books, excluded, max_loan_id,
+    )
+
+# The current index, swapped whole after each build. Checkouts that commit while a
+# build runs are kept and replayed onto the new index. The build may or may not have
+# read them: loan IDs from a sequence can commit out of order, so there is no ID that
+# splits them. add_borrow skips pairs already in the patron's history, so replaying
+# every one of them is exact.
+_lock = threading.Lock()
+index: Optional[CooccurrenceIndex] = None
+_building = False
+_during_build = []
+last_build: dict = {}
+
+def record_borrow(user_id: int, book_id: int):
+    """Apply a committed checkout to the index"""
+    if not RECOMMENDATIONS_ENABLED:
+        return
+    with _lock:
+        if _building:
+            _during_build.append((user_id, book_id))
+        if index is not None:
+            index.add_borrow(user_id, book_id)
+
+def recommend(book_id: int, limit: int = 10) -> Optional[list]:
+    """(book_id, count) pairs borrowed by patrons who borrowed this book; None before the first build"""
+    with _lock:
+        return index.lookup(book_id, limit) if index is not None else None
+
+def rebuild():
+    """Build a fresh index and swap it in"""
+    global index, _building
+    started = time.perf_counter()
+    with _lock:
+        _building = True
+        _during_build.clear()
+    try:
+        fresh = build()
+    except BaseException:
+        with _lock:
+            _building = False
+            _during_build.clear()
+        raise
+    # One critical section, so a checkout is either queued and replayed here or applied
+    # to the new index; never to the old index alone
+    with _lock:
+        _building = False
+        for user_id, book_id in _during_build:
+            fresh.add_borrow(user_id, book_id)
+        _during_build.clear()
+        index = fresh
+    last_build.update({
+        "max_loan_id": fresh.max_loan_id,
+        "books": int(fresh.neighbors.shape[0]),
+        "excluded_patrons": len(fresh.excluded),
+        "memory_bytes": int(fresh.neighbors.nbytes + fresh.counts.nbytes + fresh.rows.nbytes
+                            + fresh.history_indptr.nbytes + fresh.history_books.nbytes),
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
+    logger.info("Recommendation index built: %s", last_build)
+
+def stats() -> dict:
+    """Size of the current index and how it was last built"""
+    with _lock:
+        updates = index.updates if index is not None else 0
+    return {"enabled": RECOMMENDATIONS_ENABLED, "ready": index is not None, "updates_since_build": updates, "last_build": last_build}
+
+async def run_periodically(interval: float = RECOMMENDATIONS_REBUILD_INTERVAL):
+    """Build the index now, then rebuild every interval seconds until cancelled"""
+    while True:
+        try:
+            await run_in_threadpool(rebuild)
+        except Exception:
+            logger.exception("Building the recommendation index failed")
+        if interval <= 0:
+            return
+        await asyncio.sleep(interval)
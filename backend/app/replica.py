@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Optional
+from fastapi import Request
+from sqlalchemy import select, update
+from starlette.concurrency import run_in_threadpool
+from app import models
+from app.cache import TTLCache, make_cache
+from app.database import (
+    REPLICA_DATABASE_URL, SessionLocal, AsyncSessionLocal, ReadSessionLocal, AsyncReadSessionLocal,
+)
+
+# Read/write routing. Read-only routes take their session from get_async_read_db, which
+# hands out a replica session while the replica is within REPLICA_MAX_LAG seconds of the
+# primary, and a primary session otherwise. Lag is measured with a heartbeat row in
+# change_versions: the primary's copy is refreshed every REPLICA_LAG_CHECK_INTERVAL
+# seconds and lag is how old the replica's copy is, so it works with any replication
+# (or none, in which case reads simply stay on the primary).
+#
+# A caller that has just written (a checkout or return) is pinned to the primary for
+# REPLICA_STICKY_SECONDS, so its next read sees its own write. Callers are identified by
+# a hash of their bearer token; use REPLICA_STICKY_BACKEND=redis to share pins between workers.
+
+logger = logging.getLogger(__name__)
+
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+REPLICA_LAG_CHECK_INTERVAL = float(os.getenv("REPLICA_LAG_CHECK_INTERVAL", "1"))
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+REPLICA_STICKY_BACKEND = os.getenv("REPLICA_STICKY_BACKEND", "memory")
+REPLICA_STICKY_URL = os.getenv("REPLICA_STICKY_URL", "redis://localhost:6379/0")
+
+HEARTBEAT = "heartbeat"
+
+sticky_tokens = make_cache(REPLICA_STICKY_BACKEND, 100000, REPLICA_STICKY_SECONDS, REPLICA_STICKY_URL)
+
+# Last measured lag in seconds; None until measured or while the replica is unreachable
+lag: Optional[float] = None
+checked_at = 0.0
+
+def replica_fresh() -> bool:
+    """Whether a replica is configured and its last lag measurement is recent and within bounds"""
+    return (
+        REPLICA_DATABASE_URL is not None
+        and lag is not None
+        and lag <= REPLICA_MAX_LAG
+        and time.monotonic() - checked_at <= 3 * REPLICA_LAG_CHECK_INTERVAL
+    )
+
+async def _call(fn, *args):
+    """Run a sticky-store call, off the event loop when it does network I/O"""
+    if isinstance(sticky_tokens, TTLCache):
+        return fn(*args)
+    return await run_in_threadpool(fn, *args)
+
+def _caller_key(request: Request) -> Optional[str]:
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return "sticky:" + hashlib.blake2b(token.encode(), digest_size=16).hexdigest()
+
+async def stick(request: Request):
+    """Pin the caller's reads to the primary for REPLICA_STICKY_SECONDS after a write"""
+    key = _caller_key(request)
+    if key and REPLICA_DATABASE_URL and sticky_tokens.enabled:
+        await _call(sticky_tokens.set, key, True)
+
+async def use_replica(request: Request) -> bool:
+    """Whether this request may read from the replica"""
+    if not replica_fresh():
+        return False
+    key = _caller_key(request)
+    return key is None or await _call(sticky_tokens.get, key) is None
+
+async def get_async_read_db(request: Request):
+    """Session for read-only routes: the replica when it is fresh and the caller has no recent writes"""
+    session_factory = AsyncReadSessionLocal if await use_replica(request) else AsyncSessionLocal
+    async with session_factory() as db:
+        yield db
+
+def get_read_db(request: Request):
+    """Sync counterpart of get_async_read_db"""
+    key = _caller_key(request)
+    pinned = key is not None and sticky_tokens.get(key) is not None
+    db = ReadSessionLocal() if replica_fresh() and not pinned else SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def read_sessionmaker():
+    """Session factory for background reads such as exports"""
+    return ReadSessionLocal if replica_fresh() else SessionLocal
+
+async def measure_lag() -> Optional[float]:
+    """Refresh the heartbeat on the primary and return the age of the replica's copy"""
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as primary:
+        result = await primary.execute(
+            update(models.ChangeVersion)
+            .where(models.ChangeVersion.table_name == HEARTBEAT)
+            .values(version=models.ChangeVersion.version + 1, updated_at=now)
+        )
+        if result.rowcount == 0:
+            primary.add(models.ChangeVersion(table_name=HEARTBEAT, version=1, updated_at=now))
+        await primary.commit()
+    async with AsyncReadSessionLocal() as replica:
+        seen = await replica.scalar(
+            select(models.ChangeVersion.updated_at).where(models.ChangeVersion.table_name == HEARTBEAT)
+        )
+    if seen is None:
+        return None
+    return max((datetime.utcnow() - seen).total_seconds(), 0.0)
+
+async def monitor_lag(interval: float = REPLICA_LAG_CHECK_INTERVAL):
+    """Measure replica lag every interval seconds until cancelled"""
+    global lag, checked_at
+    while True:
+        try:
+            lag = await measure_lag()
+        except Exception:
+            # Log when the replica becomes unreachable, not on every failed check after that
+            if lag is not None or not checked_at:
+                logger.exception("Replica lag check failed, reading from the primary")
+            lag = None
+        checked_at = time.monotonic()
+        await asyncio.sleep(interval)
+
+def stats() -> dict:
+    """Replica routing state for the admin endpoints"""
+    return {
+        "configured": REPLICA_DATABASE_URL is not None,
+        "lag_seconds": None if lag is None else round(lag, 3),
+        "max_lag_seconds": REPLICA_MAX_LAG,
+        "fresh": replica_fresh(),
+        "sticky": sticky_tokens.stats(),
+    }
@@ -1,7 +1,18 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import Generic, List, Literal, Optional, TypeVar
 from datetime import datetime
 
+T = TypeVar("T")
+
+# Pagination Schemas
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+    
+    class Config:
+        from_attributes = True
+
 # User Schemas
 class UserBase(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
@@ -24,6 +35,12 @@ class UserResponse(UserBase):
     class Config:
         from_attributes = True
 
+class UserRoleUpdate(BaseModel):
+    role: Literal["admin", "librarian", "member"]
+
+class UserStatusUpdate(BaseModel):
+    is_active: bool
+
 class UserInDB(UserResponse):
     password_hash: str
 
@@ -88,6 +105,51 @@ class BookResponse(BookBase):
     class Config:
         from_attributes = True
 
+class RecommendedBook(BookResponse):
+    # Patrons who borrowed both this book and the one asked about
+    borrowed_together: int
+
+class FacetCount(BaseModel):
+    # Category/author ID or decade, None for books without one
+    value: Optional[int] = None
+    label: Optional[str] = None
+    count: int
+
+class BookFacets(BaseModel):
+    categories: List[FacetCount]
+    authors: List[FacetCount]
+    decades: List[FacetCount]
+    # Matching books with a copy on the shelf
+    available: int
+
+class FacetedBookPage(Page[BookResponse]):
+    facets: BookFacets
+
+# Bulk Import Schemas
+class BookImportRow(BaseModel):
+    title: str = Field(..., min_length=1, max_length=200)
+    isbn: Optional[str] = Field(None, max_length=13)
+    author: str = Field(..., min_length=1, max_length=100)
+    category: str = Field(..., min_length=1, max_length=50)
+    description: Optional[str] = None
+    cover_image_url: Optional[str] = Field(None, max_length=500)
+    quantity_total: int = Field(default=1, ge=0)
+    quantity_available: Optional[int] = Field(None, ge=0)
+    publication_year: Optional[int] = None
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+class ImportReport(BaseModel):
+    rows_read: int = 0
+    books_created: int = 0
+    authors_created: int = 0
+    categories_created: int = 0
+    error_count: int = 0
+    errors: List[ImportRowError] = []
+    elapsed_ms: float = 0.0
+
 # Loan Schemas
 class LoanBase(BaseModel):
     book_id: int
@@ -105,4 +167,45 @@ class LoanResponse(LoanBase):
     fine_amount: float
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class LoanBatchCreate(BaseModel):
+    book_ids: List[int] = Field(..., min_length=1, max_length=50)
+
+class LoanBatchReturn(BaseModel):
+    loan_ids: List[int] = Field(..., min_length=1, max_length=50)
+
+class LoanBatchItem(BaseModel):
+    book_id: Optional[int] = None
+    loan_id: Optional[int] = None
+    status: Literal["success", "unavailable", "duplicate", "not_returnable"]
+    loan: Optional[LoanResponse] = None
+
+class LoanBatchResponse(BaseModel):
+    items: List[LoanBatchItem]
+    succeeded: int
+    failed: int
+
+# Statistics Schemas
+class LoanCounts(BaseModel):
+    active: int
+    overdue: int
+    returned: int
+
+class BorrowedBook(BaseModel):
+    book_id: int
+    title: str
+    times_borrowed: int
+
+class CategoryUtilization(BaseModel):
+    category_id: int
+    name: str
+    copies_total: int
+    copies_available: int
+    utilization: float
+
+class CirculationStats(BaseModel):
+    loans: LoanCounts
+    fines_outstanding: float
+    most_borrowed: List[BorrowedBook]
+    categories: List[CategoryUtilization]
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from starlette.concurrency import run_in_threadpool
+from app import metrics
+from app.database import Base, engine, async_engine, async_replica_engine
+
+# Startup work for the lifespan in app.main. Importing the app does not touch the
+# database; the lifespan then, in order:
+#   1. checks the schema is at the Alembic head (SCHEMA_CHECK=verify, the default)
+#      instead of running create_all, which reflected every table in every worker and
+#      could start on an outdated schema without noticing. SCHEMA_CHECK=create builds
+#      missing tables for throwaway databases, SCHEMA_CHECK=off skips the check.
+#   2. opens WARM_CONNECTIONS pooled connections per engine,
+#   3. fills the hot catalog cache entries,
+# and compares the time from process start to ready against STARTUP_BUDGET_MS.
+# A database that is unreachable at startup does not stop the worker: it starts cold
+# and verifies the schema in the background once the database answers.
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_CHECK = os.getenv("SCHEMA_CHECK", "verify")
+# Time from process start until the app is ready to serve
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "3000"))
+# Refuse to start when over budget, so a slow worker is replaced rather than served from
+STARTUP_BUDGET_STRICT = os.getenv("STARTUP_BUDGET_STRICT", "0") == "1"
+WARM_CONNECTIONS = int(os.getenv("WARM_CONNECTIONS", "2"))
+# Seconds to wait for the database before starting cold
+STARTUP_DB_TIMEOUT = float(os.getenv("STARTUP_DB_TIMEOUT", "5"))
+SCHEMA_RETRY_INTERVAL = float(os.getenv("SCHEMA_RETRY_INTERVAL", "5"))
+
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic")
+
+# Fallback clock where the process start time cannot be read
+_imported_at = time.monotonic()
+
+startup_seconds = metrics.Gauge("folio_startup_seconds", "Time spent in each startup phase of this worker", ("phase",))
+
+# Phase durations in ms of the last startup, for /admin endpoints
+report: dict = {}
+
+class SchemaMismatchError(RuntimeError):
+    """Raised when the database is not at the revision this code was written for"""
+
+def process_age() -> float:
+    """Seconds since this process started (Linux /proc), else since this module was imported"""
+    try:
+        with open("/proc/self/stat") as stat, open("/proc/uptime") as uptime:
+            # Field 22 is the start time in clock ticks after boot; the name in field 2 may contain spaces
+            started = int(stat.read().rpartition(")")[2].split()[19]) / os.sysconf("SC_CLK_TCK")
+            return float(uptime.read().split()[0]) - started
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.monotonic() - _imported_at
+
+def head_revisions() -> set:
+    """Head revisions of the migration scripts"""
+    # Deferred: alembic parses every migration file, only needed while starting up
+    from alembic.script import ScriptDirectory
+    return set(ScriptDirectory(ALEMBIC_DIR).get_heads())
+
+def _current_revisions(connection) -> set:
+    from alembic.runtime.migration import MigrationContext
+    return set(MigrationContext.configure(connection).get_current_heads())
+
+async def check_schema(mode: str = SCHEMA_CHECK):
+    """Verify the schema revision (or create missing tables); raises SchemaMismatchError"""
+    if mode == "off":
+        return
+    async with async_engine.begin() as connection:
+        if mode == "create":
+            await connection.run_sync(Base.metadata.create_all)
+            return
+        current = await connection.run_sync(_current_revisions)
+    expected = head_revisions()
+    if current != expected:
+        raise SchemaMismatchError(
+            f"Database is at revision {', '.join(sorted(current)) or 'none'} but the code expects "
+            f"{', '.join(sorted(expected))}. Run 'alembic upgrade head', or set SCHEMA_CHECK=create "
+            f"for a throwaway database."
+        )
+
+async def verify_when_reachable():
+    """Keep retrying the schema check until the database answers, then check once"""
+    while True:
+        await asyncio.sleep(SCHEMA_RETRY_INTERVAL)
+        try:
+            await asyncio.wait_for(check_schema(), STARTUP_DB_TIMEOUT)
+        except (DBAPIError, OSError, asyncio.TimeoutError):
+            continue
+        except SchemaMismatchError:
+            logger.exception("Schema check failed once the database became reachable")
+        else:
+            logger.info("Database reachable, schema verified")
+        return
+
+async def warm_pools(connections: int = WARM_CONNECTIONS):
+    """Open pooled connections up front so the first requests don't pay for connecting"""
+    def touch_sync():
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+
+    binds = [bind for bind in (async_engine, async_replica_engine) if bind is not None]
+    # Held open together, so each pool really grows to that many connections
+    async with AsyncExitStack() as stack:
+        opened = await asyncio.gather(*(stack.enter_async_context(bind.connect()) for bind in binds for _ in range(connections)))
+        await asyncio.gather(*(connection.execute(text("SELECT 1")) for connection in opened), run_in_threadpool(touch_sync))
+
+@asynccontextmanager
+async def phase(name: str):
+    """Time a startup phase into the report and the startup gauge"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        report[name] = round(elapsed * 1000, 1)
+        startup_seconds.set(round(elapsed, 4), name)
+
+async def run(warm_caches) -> Optional[asyncio.Task]:
+    """Schema check, pool and cache warmup, budget check; returns the background schema
+    check task when the database was unreachable"""
+    report.clear()
+    imported = process_age()
+    report["import"] = round(imported * 1000, 1)
+    startup_seconds.set(round(imported, 4), "import")
+
+    retry = None
+    try:
+        async with phase("schema"):
+            await asyncio.wait_for(check_schema(), STARTUP_DB_TIMEOUT)
+    except (DBAPIError, OSError, asyncio.TimeoutError) as exc:
+        logger.warning("Database unreachable at startup (%s), starting cold", exc.__class__.__name__)
+        retry = asyncio.create_task(verify_when_reachable())
+    else:
+        try:
+            async with phase("pools"):
+                await warm_pools()
+            async with phase("caches"):
+                await warm_caches()
+        except Exception:
+            # Warmup only saves the first requests some work, never worth failing over
+            logger.exception("Warmup failed, serving cold")
+
+    total = process_age()
+    report["total"] = round(total * 1000, 1)
+    startup_seconds.set(round(total, 4), "total")
+    steps = ", ".join(f"{name} {ms:.0f} ms" for name, ms in report.items() if name != "total")
+    if total * 1000 > STARTUP_BUDGET_MS:
+        message = f"Startup took {total * 1000:.0f} ms, over the {STARTUP_BUDGET_MS:.0f} ms budget ({steps})"
+        if STARTUP_BUDGET_STRICT:
+            if retry is not None:
+                retry.cancel()
+            raise RuntimeError(message)
+        logger.warning(message)
+    else:
+        logger.info("Ready in %.0f ms (%s)", total * 1000, steps)
+    return retry
@@ -0,0 +1,104 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import models
+from app.replica import get_async_read_db
+
+# Per-table change versions for conditional GETs. Every write to a catalog table bumps
+# its row in change_versions inside the same transaction, so all workers share one
+# version that never runs ahead of committed data. Catalog reads derive a strong ETag
+# from the versions their payload depends on and answer 304 before loading any rows.
+# The same versions key the route's catalog cache entries (see catalog_cache), so an
+# entry and an ETag always describe the same versions, in every worker.
+#
+# Checkouts and returns only change how many copies of a book are on the shelf. They
+# bump "copies" rather than "books": ETags of book reads include both, but cached book
+# payloads only have their copy counts refreshed instead of being reloaded.
+
+CATALOG_TABLES = ("authors", "categories", "books")
+COPIES = "copies"
+BOOK_TABLES = (*CATALOG_TABLES, COPIES)
+
+# Seconds clients may reuse a catalog response without revalidating; 0 means always revalidate
+CATALOG_MAX_AGE = int(os.getenv("CATALOG_MAX_AGE", "0"))
+
+def _bump_statement(tables):
+    return (
+        update(models.ChangeVersion)
+        .where(models.ChangeVersion.table_name.in_(tables))
+        .values(version=models.ChangeVersion.version + 1, updated_at=datetime.utcnow())
+    )
+
+def bump(db, *tables: str):
+    """Mark tables as changed inside the caller's transaction; call right before commit"""
+    db.execute(_bump_statement(tables))
+
+async def bump_async(db, *tables: str):
+    """Mark tables as changed inside the caller's transaction; call right before commit"""
+    await db.execute(_bump_statement(tables))
+
+async def get_versions(db: AsyncSession, tables) -> list:
+    """(table_name, version, updated_at) rows for tables, in name order"""
+    result = await db.execute(
+        select(models.ChangeVersion.table_name, models.ChangeVersion.version, models.ChangeVersion.updated_at)
+        .where(models.ChangeVersion.table_name.in_(tables))
+        .order_by(models.ChangeVersion.table_name)
+    )
+    return result.all()
+
+async def current(db: AsyncSession, tables) -> Optional[Dict[str, int]]:
+    """Versions of tables by name, or None while any of them is not seeded"""
+    rows = await get_versions(db, tables)
+    if len(rows) < len(tables):
+        return None
+    return {name: version for name, version, _ in rows}
+
+def _not_modified(request: Request, etag: str, last_modified: datetime) -> bool:
+    """Evaluate If-None-Match, falling back to If-Modified-Since as RFC 7232 requires"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+def conditional_get(*tables: str):
+    """Dependency that sets validators on a catalog read and answers 304 when the client's copy is current;
+    it returns the versions the validators were built from, for the route's catalog cache entries"""
+    async def check(request: Request, response: Response, db: AsyncSession = Depends(get_async_read_db)) -> Optional[Dict[str, int]]:
+        rows = await get_versions(db, tables)
+        if len(rows) < len(tables):
+            # Versions not seeded yet, serve without validators rather than risk a stale 304
+            return None
+        # The versions are read before the payload, so a body can be newer than its ETag but never older
+        fingerprint = f"{request.url.path}?{request.url.query}|" + ",".join(f"{name}:{version}" for name, version, _ in rows)
+        etag = '"' + hashlib.blake2b(fingerprint.encode(), digest_size=16).hexdigest() + '"'
+        last_modified = max(updated_at for _, _, updated_at in rows).replace(microsecond=0, tzinfo=timezone.utc)
+        headers = {
+            "ETag": etag,
+            "Last-Modified": format_datetime(last_modified, usegmt=True),
+            "Cache-Control": f"public, max-age={CATALOG_MAX_AGE}" if CATALOG_MAX_AGE else "public, no-cache",
+        }
+        if _not_modified(request, etag, last_modified):
+            raise HTTPException(status_code=304, headers=headers)
+        response.headers.update(headers)
+        return {name: version for name, version, _ in rows}
+    return check
+
+# Seed one row per catalog table when create_all builds the table; the migration does the same
+@event.listens_for(models.ChangeVersion.__table__, "after_create")
+def _seed_versions(target, connection, **kw):
+    connection.execute(
+        insert(target),
+        [{"table_name": name, "version": 0, "updated_at": datetime.utcnow()} for name in BOOK_TABLES],
+    )
@@ -0,0 +1,95 @@
+"""Concurrent checkout load test: proves crud.create_loan never oversells a title.
+
+Many threads race to borrow the same few copies; afterwards the number of loans
+must equal the copies handed out and quantity_available must never go negative.
+
+    python -m benchmarks.checkout_concurrency --threads 32 --attempts 50 --copies 200
+"""
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--url", help="Database URL to use (default: temporary SQLite file)")
+parser.add_argument("--threads", type=int, default=16)
+parser.add_argument("--attempts", type=int, default=50, help="Checkout attempts per thread")
+parser.add_argument("--copies", type=int, default=100, help="Copies of the contested title")
+args = parser.parse_args()
+
+url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'checkout_bench.db')}"
+os.environ["DATABASE_URL"] = url
+os.environ.setdefault("DB_PROFILE", "test")
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, get_engine_options
+from app import models, schemas, crud
+
+def main():
+    options = get_engine_options(url, profile="test")
+    if url.startswith("sqlite"):
+        # SQLite serializes writers; wait for the lock instead of failing fast
+        options["connect_args"] = {**options.get("connect_args", {}), "timeout": 30}
+    engine = create_engine(url, **options)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False)
+
+    with Session() as db:
+        user = models.User(username="bench", email="bench@example.com", password_hash="x", full_name="Bench")
+        author = models.Author(name="Bench Author")
+        category = models.Category(name="Bench")
+        db.add_all([user, author, category])
+        db.flush()
+        book = models.Book(
+            title="Contested Title", author_id=author.author_id, category_id=category.category_id,
+            quantity_total=args.copies, quantity_available=args.copies,
+        )
+        db.add(book)
+        db.commit()
+        user_id, book_id = user.user_id, book.book_id
+
+    counts = {"granted": 0, "refused": 0, "errors": 0}
+    lock = threading.Lock()
+    start_gate = threading.Barrier(args.threads)
+
+    def borrower():
+        start_gate.wait()
+        for _ in range(args.attempts):
+            with Session() as db:
+                try:
+                    loan = crud.create_loan(db, user_id, schemas.LoanCreate(book_id=book_id))
+                    outcome = "granted" if loan else "refused"
+                except OperationalError:
+                    db.rollback()
+                    outcome = "errors"
+            with lock:
+                counts[outcome] += 1
+
+    threads = [threading.Thread(target=borrower) for _ in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    with Session() as db:
+        loans = db.scalar(select(func.count()).select_from(models.Loan).where(models.Loan.book_id == book_id))
+        available = db.scalar(select(models.Book.quantity_available).where(models.Book.book_id == book_id))
+
+    attempts = args.threads * args.attempts
+    print(f"database        {engine.dialect.name}")
+    print(f"attempts        {attempts} from {args.threads} threads")
+    print(f"granted         {counts['granted']}  refused {counts['refused']}  errors {counts['errors']}")
+    print(f"loans recorded  {loans}  copies left {available} of {args.copies}")
+    print(f"throughput      {attempts / elapsed:.0f} attempts/s, {counts['granted'] / elapsed:.0f} checkouts/s")
+
+    oversold = loans > args.copies or available < 0 or loans + available != args.copies or loans != counts["granted"]
+    print("result          " + ("OVERSOLD" if oversold else "ok, no overselling"))
+    return 1 if oversold else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
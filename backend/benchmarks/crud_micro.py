@@ -0,0 +1,173 @@
+"""Micro-benchmarks for every crud function, plus the auth helpers.
+
+Seeds a synthetic library (benchmarks.generator), then times each function on its
+own: every sample runs in a fresh session, the way a request would, with arguments
+drawn from the same skewed distributions as the data. Reads run before writes so
+writes do not change what the reads see; checkouts feed the return benchmarks.
+
+    python -m benchmarks.crud_micro --scale small --repeat 200
+    python -m benchmarks.crud_micro --only "get_books|loan" --json > crud.json
+    python -m benchmarks.crud_micro --url postgresql://folio@localhost/folio_bench --scale medium
+"""
+import argparse
+import os
+import random
+import re
+import tempfile
+import time
+
+from benchmarks import generator, results
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--url", help="Database URL to seed (default: temporary SQLite file)")
+parser.add_argument("--scale", choices=generator.SCALES, default="small")
+parser.add_argument("--repeat", type=int, default=100, help="Timed calls per function")
+parser.add_argument("--warmup", type=int, default=5, help="Untimed calls per function first")
+parser.add_argument("--only", help="Regular expression selecting benchmarks by name")
+parser.add_argument("--json", action="store_true", help="Print results as JSON")
+parser.add_argument("--seed", type=int, default=42)
+args = parser.parse_args()
+
+url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'crud_bench.db')}"
+os.environ["DATABASE_URL"] = url
+os.environ.setdefault("DB_PROFILE", "test")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from sqlalchemy import select
+from app.database import Base, engine, SessionLocal
+from app import models, schemas, crud, auth, pagination, facets
+
+# bcrypt is slow by design, a few samples are enough
+SLOW = {"authenticate_user": 10, "create_user": 10}
+
+def build_cases(db, rng: random.Random) -> list:
+    """(name, call) pairs; call(db) runs the function once with fresh arguments"""
+    scale = generator.SCALES[args.scale]
+    words = generator.vocabulary(args.seed)
+    word_weights = generator.zipf(len(words), 1.1)
+    user_ids = list(db.scalars(select(models.User.user_id)))
+    author_ids = list(db.scalars(select(models.Author.author_id)))
+    category_ids = list(db.scalars(select(models.Category.category_id)))
+    book_ids = list(db.scalars(select(models.Book.book_id)))
+    loan_ids = list(db.scalars(select(models.Loan.loan_id)))
+    members = generator.members(scale)
+    member_ids = list(db.scalars(select(models.User.user_id).where(models.User.role == "member")))
+    # Deep pages: the cursor after the first few pages of each list
+    deep = {}
+    for name, list_fn in (("books", crud.get_books), ("loans", crud.get_active_loans), ("users", crud.get_users)):
+        cursor = None
+        for _ in range(5):
+            cursor = list_fn(db, cursor=cursor, limit=20).next_cursor or cursor
+        deep[name] = cursor
+    token = auth.create_access_token({"sub": members[0]})
+    checked_out, batches = [], []
+    counter = iter(range(10 ** 9))
+
+    def checkout(db):
+        loan = crud.create_loan(db, rng.choice(member_ids), schemas.LoanCreate(book_id=rng.choice(book_ids)))
+        if loan is not None:
+            checked_out.append(loan.loan_id)
+
+    def checkout_batch(db):
+        outcomes = crud.create_loans(db, rng.choice(member_ids), rng.sample(book_ids, 5))
+        batches.append([outcome.loan_id for _, outcome in outcomes if isinstance(outcome, models.Loan)])
+
+    def books_with_total(db):
+        # Row counts are cached between pages; time the count, not the cache
+        pagination.count_cache.clear()
+        return crud.get_books(db, limit=20, include_total=True)
+
+    def adjust_quantity(db):
+        book_id = rng.choice(book_ids)
+        crud.update_book_quantity(db, book_id, 1)
+        crud.update_book_quantity(db, book_id, -1)
+        db.commit()
+
+    return [
+        ("create_access_token", lambda db: auth.create_access_token({"sub": rng.choice(members)})),
+        ("decode_access_token", lambda db: auth.jwt.decode(token, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])),
+        ("authenticate_user", lambda db: auth.authenticate_user(db, rng.choice(members), generator.PASSWORD)),
+        ("get_user_by_username", lambda db: crud.get_user_by_username(db, rng.choice(members))),
+        ("get_user_by_email", lambda db: crud.get_user_by_email(db, f"{rng.choice(members)}@example.com")),
+        ("get_user_by_id", lambda db: crud.get_user_by_id(db, rng.choice(user_ids))),
+        ("get_users", lambda db: crud.get_users(db, limit=20)),
+        ("get_users:deep", lambda db: crud.get_users(db, cursor=deep["users"], limit=20)),
+        ("get_users_by_ids:20", lambda db: crud.get_users_by_ids(db, rng.sample(user_ids, 20))),
+        ("get_author", lambda db: crud.get_author(db, rng.choice(author_ids))),
+        ("get_authors", lambda db: crud.get_authors(db, limit=20)),
+        ("get_authors_by_ids:20", lambda db: crud.get_authors_by_ids(db, rng.sample(author_ids, 20))),
+        ("get_category", lambda db: crud.get_category(db, rng.choice(category_ids))),
+        ("get_categories", lambda db: crud.get_categories(db, limit=20)),
+        ("get_book", lambda db: crud.get_book(db, rng.choice(book_ids))),
+        ("get_books", lambda db: crud.get_books(db, limit=20)),
+        ("get_books:deep", lambda db: crud.get_books(db, cursor=deep["books"], limit=20)),
+        ("get_books:total", books_with_total),
+        ("get_books:search", lambda db: crud.get_books(db, limit=20, search=words[generator.draw(rng, word_weights)])),
+        ("get_books:search_rare", lambda db: crud.get_books(db, limit=20, search=rng.choice(words))),
+        ("get_books:filtered", lambda db: crud.get_books(db, limit=20, filters=facets.BookFilters(category_id=rng.choice(category_ids), available=True))),
+        # Facet counts for a search result and for the whole catalog, one grouped query each
+        ("get_book_facets:search", lambda db: crud.get_book_facets(db, search=words[generator.draw(rng, word_weights)])),
+        ("get_book_facets:all", lambda db: crud.get_book_facets(db)),
+        # A shelf of 50 titles: one multi-get against 50 single lookups
+        ("get_books_by_ids:50", lambda db: crud.get_books_by_ids(db, rng.sample(book_ids, 50))),
+        ("get_book:x50", lambda db: [crud.get_book(db, book_id) for book_id in rng.sample(book_ids, 50)]),
+        ("get_book_availability:50", lambda db: crud.get_book_availability(db, rng.sample(book_ids, 50))),
+        ("get_loan", lambda db: crud.get_loan(db, rng.choice(loan_ids))),
+        ("get_user_loans", lambda db: crud.get_user_loans(db, rng.choice(user_ids), limit=20)),
+        ("get_active_loans", lambda db: crud.get_active_loans(db, limit=20)),
+        ("get_active_loans:deep", lambda db: crud.get_active_loans(db, cursor=deep["loans"], limit=20)),
+        ("get_active_loans:overdue", lambda db: crud.get_active_loans(db, limit=20, status="overdue")),
+        ("create_user", lambda db: crud.create_user(db, schemas.UserCreate(
+            username=f"bench{next(counter)}", email=f"bench{next(counter)}@example.com", full_name="Bench", password=generator.PASSWORD,
+        ))),
+        ("create_author", lambda db: crud.create_author(db, schemas.AuthorCreate(name=f"Bench Author {next(counter)}"))),
+        ("create_category", lambda db: crud.create_category(db, schemas.CategoryCreate(name=f"Bench {next(counter)}"))),
+        ("create_book", lambda db: crud.create_book(db, schemas.BookCreate(
+            title=f"Bench Book {next(counter)}", author_id=rng.choice(author_ids), category_id=rng.choice(category_ids),
+        ))),
+        ("update_book_quantity", adjust_quantity),
+        ("create_loan", checkout),
+        ("return_book", lambda db: crud.return_book(db, checked_out.pop() if checked_out else rng.choice(loan_ids))),
+        ("create_loans:5", checkout_batch),
+        ("return_books:5", lambda db: crud.return_books(db, batches.pop() if batches else rng.sample(loan_ids, 5))),
+    ]
+
+def run_case(call, repeat: int) -> list:
+    """Latency samples in milliseconds, each call in its own session"""
+    samples = []
+    for i in range(args.warmup + repeat):
+        with SessionLocal() as db:
+            start = time.perf_counter()
+            call(db)
+            elapsed = time.perf_counter() - start
+        if i >= args.warmup:
+            samples.append(elapsed * 1000)
+    return samples
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    scale = generator.SCALES[args.scale]
+    with SessionLocal() as db:
+        counts = generator.generate(db, scale, seed=args.seed)
+        cases = build_cases(db, random.Random(args.seed))
+
+    only = re.compile(args.only) if args.only else None
+    rows = []
+    for name, call in cases:
+        if only and not only.search(name):
+            continue
+        repeat = min(args.repeat, SLOW.get(name, args.repeat))
+        samples = run_case(call, repeat)
+        rows.append(results.summarize(name, samples, ops_per_sec=round(1000 * len(samples) / sum(samples))))
+
+    if args.json:
+        params = {"scale": args.scale, "repeat": args.repeat, "warmup": args.warmup, "seed": args.seed, "only": args.only}
+        results.dump(results.document("crud_micro", url, params, rows, dataset=counts))
+        return
+    print(f"{engine.dialect.name}, {args.scale} library: " + ", ".join(f"{count} {name}" for name, count in counts.items()))
+    print(f"{'function':<28}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>10}")
+    for row in rows:
+        print(f"{row['name']:<28}{row['n']:>6}{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}{row['p99_ms']:>10.3f}{row['ops_per_sec']:>10,}")
+
+if __name__ == "__main__":
+    main()
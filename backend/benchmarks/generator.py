@@ -0,0 +1,191 @@
+"""Synthetic library generator shared by the benchmarks.
+
+Builds a catalog and a circulation history with the skew a real library has: a few
+prolific authors and large categories, a handful of titles that account for most
+loans, and a minority of patrons who do most of the borrowing. Everything is drawn
+from one seeded Random, so the same seed and scale give the same rows on any database.
+
+Only generate() touches the database; the other helpers let a load test reconstruct
+usernames and search terms for a server seeded earlier with benchmarks.seed.
+"""
+import bisect
+import itertools
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+# Password of every generated user
+PASSWORD = "benchmark"
+
+@dataclass(frozen=True)
+class Scale:
+    users: int
+    authors: int
+    categories: int
+    books: int
+    loans: int
+
+SCALES = {
+    "tiny": Scale(users=50, authors=30, categories=8, books=300, loans=1000),
+    "small": Scale(users=500, authors=200, categories=20, books=5000, loans=20000),
+    "medium": Scale(users=5000, authors=2000, categories=50, books=50000, loans=250000),
+    "large": Scale(users=50000, authors=15000, categories=120, books=500000, loans=3000000),
+}
+
+# Days of loan history, and how long a loan runs
+HISTORY_DAYS = 730
+LOAN_DAYS = 14
+# Share of users with staff roles; user 0 is always the admin
+LIBRARIAN_SHARE = 0.01
+CHUNK_SIZE = 5000
+
+SYLLABLES = ["ka", "lo", "mer", "din", "sha", "vel", "tor", "rin", "qua", "bel", "os", "tri", "nar", "ul", "zem"]
+
+def vocabulary(seed: int, size: int = 5000) -> list[str]:
+    """Synthetic words, most frequent first when drawn through zipf()"""
+    rng = random.Random(f"vocabulary:{seed}")
+    words = {"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(size)}
+    return sorted(words, key=lambda word: rng.random())
+
+def zipf(n: int, exponent: float) -> list[float]:
+    """Cumulative Zipf weights over n ranks, for random.choices(cum_weights=...)"""
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, n + 1)))
+
+def draw(rng: random.Random, cum_weights: list[float]) -> int:
+    """One Zipf-distributed rank in range(len(cum_weights)), 0 being the most likely"""
+    return bisect.bisect_left(cum_weights, rng.random() * cum_weights[-1])
+
+def username(index: int) -> str:
+    return f"user{index}"
+
+def role(index: int, scale: Scale) -> str:
+    if index == 0:
+        return "admin"
+    return "librarian" if index <= max(1, int(scale.users * LIBRARIAN_SHARE)) else "member"
+
+def members(scale: Scale) -> list[str]:
+    """Usernames of the generated members"""
+    return [username(i) for i in range(scale.users) if role(i, scale) == "member"]
+
+def _chunks(rows, size: int = CHUNK_SIZE):
+    iterator = iter(rows)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+def _ids(db, column, after: int) -> list[int]:
+    from sqlalchemy import select
+    return list(db.scalars(select(column).where(column > after).order_by(column)))
+
+def generate(db, scale: Scale, seed: int = 42, now: datetime = None) -> dict:
+    """Insert a synthetic library through a sync session and commit; returns row counts"""
+    # Imported here so load tests against a remote server need no DATABASE_URL
+    from sqlalchemy import func, insert, select, update
+    from app import models, fulltext, hashing, circulation
+    from app.crud import FINE_PER_DAY, OPEN_LOAN_STATUSES
+
+    rng = random.Random(seed)
+    now = now or datetime.utcnow()
+    words = vocabulary(seed)
+    word_weights = zipf(len(words), 1.1)
+
+    def phrase(low: int, high: int) -> str:
+        return " ".join(words[draw(rng, word_weights)] for _ in range(rng.randint(low, high)))
+
+    start = {
+        column.key: db.scalar(select(func.coalesce(func.max(column), 0)))
+        for column in (models.User.user_id, models.Author.author_id, models.Category.category_id, models.Book.book_id)
+    }
+
+    # One hash for everybody: bcrypt per user would dominate seeding time
+    password_hash = hashing.hash_password(PASSWORD)
+    for chunk in _chunks(
+        {
+            "username": username(i), "email": f"{username(i)}@example.com", "password_hash": password_hash,
+            "full_name": phrase(2, 2).title(), "role": role(i, scale), "is_active": True, "created_at": now,
+        }
+        for i in range(scale.users)
+    ):
+        db.execute(insert(models.User), chunk)
+    for chunk in _chunks(
+        {"name": phrase(2, 3).title(), "bio": phrase(10, 40), "country": rng.choice(["UK", "US", "FR", "RO", "JP", "BR"])}
+        for _ in range(scale.authors)
+    ):
+        db.execute(insert(models.Author), chunk)
+    db.execute(insert(models.Category), [
+        {"name": f"{words[i].title()} {i}", "description": phrase(5, 15)} for i in range(scale.categories)
+    ])
+    user_ids = _ids(db, models.User.user_id, start["user_id"])
+    author_ids = _ids(db, models.Author.author_id, start["author_id"])
+    category_ids = _ids(db, models.Category.category_id, start["category_id"])
+
+    # Popularity rank of each new book: rank 0 is the bestseller, ranks are spread over IDs
+    ranks = list(range(scale.books))
+    rng.shuffle(ranks)
+    author_weights = zipf(len(author_ids), 1.0)
+    category_weights = zipf(len(category_ids), 0.8)
+
+    def copies(rank: int) -> int:
+        # Bestsellers are stocked deeper than the long tail
+        return 1 + rng.randint(0, 1) + (4 if rank < scale.books * 0.01 else 1 if rank < scale.books * 0.1 else 0)
+
+    for chunk in _chunks(
+        {
+            "title": phrase(1, 5).title(), "isbn": f"979{start['book_id'] + i:010d}",
+            "author_id": author_ids[draw(rng, author_weights)], "category_id": category_ids[draw(rng, category_weights)],
+            "description": phrase(20, 60), "cover_image_url": f"https://covers.example.com/{i}.jpg" if rng.random() < 0.7 else None,
+            "quantity_total": copies(ranks[i]), "quantity_available": 0, "publication_year": 2025 - int(rng.expovariate(1 / 25)),
+            "created_at": now,
+        }
+        for i in range(scale.books)
+    ):
+        db.execute(insert(models.Book), chunk)
+    book_ids = _ids(db, models.Book.book_id, start["book_id"])
+    by_rank = [0] * scale.books
+    for position, rank in enumerate(ranks):
+        by_rank[rank] = book_ids[position]
+    totals = dict(db.execute(select(models.Book.book_id, models.Book.quantity_total).where(models.Book.book_id > start["book_id"])).all())
+
+    book_weights = zipf(scale.books, 0.9)
+    user_weights = zipf(len(user_ids), 0.7)
+    borrowers = user_ids[:]
+    rng.shuffle(borrowers)
+    held = {}
+
+    def loan():
+        book_id = by_rank[draw(rng, book_weights)]
+        loan_date = now - timedelta(days=HISTORY_DAYS * rng.random())
+        due_date = loan_date + timedelta(days=LOAN_DAYS)
+        # Recent loans are often still out; a copy can only be out once
+        still_out = (now - loan_date).days < 45 and rng.random() < 0.6 and held.get(book_id, 0) < totals[book_id]
+        if still_out:
+            held[book_id] = held.get(book_id, 0) + 1
+            return_date, status, fine = None, "overdue" if due_date < now else "active", 0
+        else:
+            return_date = min(loan_date + timedelta(days=rng.expovariate(1 / 10)), now)
+            late_days = (return_date - due_date).days
+            status, fine = "returned", round(max(late_days, 0) * FINE_PER_DAY, 2)
+        return {
+            "user_id": borrowers[draw(rng, user_weights)], "book_id": book_id, "loan_date": loan_date,
+            "due_date": due_date, "return_date": return_date, "status": status, "fine_amount": fine,
+        }
+
+    for chunk in _chunks(loan() for _ in range(scale.loans)):
+        db.execute(insert(models.Loan), chunk)
+
+    open_loans = (
+        select(func.count())
+        .where(models.Loan.book_id == models.Book.book_id, models.Loan.status.in_(OPEN_LOAN_STATUSES))
+        .scalar_subquery()
+    )
+    db.execute(
+        update(models.Book)
+        .where(models.Book.book_id > start["book_id"])
+        .values(quantity_available=models.Book.quantity_total - open_loans)
+    )
+    fulltext.index_books_after(db, start["book_id"])
+    db.commit()
+    circulation.rebuild(db)
+    return {
+        "users": len(user_ids), "authors": len(author_ids), "categories": len(category_ids),
+        "books": len(book_ids), "loans": scale.loans, "open_loans": sum(held.values()),
+    }
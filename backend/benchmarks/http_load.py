@@ -0,0 +1,196 @@
+"""HTTP load scenario: simulated patrons browsing, searching, logging in and borrowing.
+
+Each virtual user logs in as its own generated member and then loops over a weighted
+mix of actions until the run ends:
+
+    browse    list a page of books, sometimes the next page, then open one title
+              (revalidating with If-None-Match like a browser cache would)
+    search    full-text search with a Zipf-distributed term
+    login     a fresh password login (bcrypt bound)
+    checkout  borrow a popular title, check my loans, return the oldest loan once
+              three are held
+
+By default the app runs in-process over ASGI against a freshly seeded temporary
+SQLite database (or --url). With --base-url the scenario targets a running server
+instead, which must have been seeded with benchmarks.seed using the same --scale and
+--seed. Samples from the first --warmup seconds are discarded.
+
+    python -m benchmarks.http_load --concurrency 20 --duration 30
+    python -m benchmarks.http_load --mix browse=70,search=25,checkout=5 --json > load.json
+    python -m benchmarks.http_load --base-url http://localhost:8000 --scale medium --duration 60
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter, defaultdict
+
+from benchmarks import generator, results
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--url", help="Database URL to seed for the in-process app (default: temporary SQLite file)")
+parser.add_argument("--base-url", help="Target a running server seeded with benchmarks.seed instead")
+parser.add_argument("--scale", choices=generator.SCALES, default="small")
+parser.add_argument("--seed", type=int, default=42)
+parser.add_argument("--concurrency", type=int, default=10, help="Virtual users")
+parser.add_argument("--duration", type=float, default=20, help="Seconds to run, warmup included")
+parser.add_argument("--warmup", type=float, default=3, help="Seconds at the start excluded from results")
+parser.add_argument("--mix", default="browse=55,search=20,login=5,checkout=20", help="Action weights")
+parser.add_argument("--json", action="store_true", help="Print results as JSON")
+args = parser.parse_args()
+
+url = None
+if not args.base_url:
+    url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load_bench.db')}"
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("DB_PROFILE", "test")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    # The database is built with create_all below, not migrated
+    os.environ.setdefault("SCHEMA_CHECK", "create")
+
+import httpx
+
+MIX = {name: float(weight) for name, weight in (part.split("=") for part in args.mix.split(","))}
+
+class Recorder:
+    """Latency samples and status codes per operation, kept once the warmup is over"""
+
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+
+    async def request(self, client: httpx.AsyncClient, name: str, method: str, path: str, **kwargs) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError:
+            response, status = None, "error"
+        if start >= self.measure_from:
+            self.samples[name].append((time.perf_counter() - start) * 1000)
+            self.statuses[name][str(status)] += 1
+        return response
+
+class Patron:
+    """One virtual user and the state a real client would keep"""
+
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, username: str, rng: random.Random):
+        self.client, self.recorder, self.username, self.rng = client, recorder, username, rng
+        self.headers = {}
+        self.etags = {}
+        self.loans = []
+
+    async def login(self):
+        response = await self.recorder.request(
+            self.client, "login", "POST", "/token", data={"username": self.username, "password": generator.PASSWORD},
+        )
+        if response is not None and response.status_code == 200:
+            self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    async def get_cached(self, name: str, path: str, params: dict = None) -> httpx.Response:
+        """GET that revalidates with the last ETag seen for the same URL"""
+        key = (path, tuple(sorted((params or {}).items())))
+        headers = {"If-None-Match": self.etags[key]} if key in self.etags else {}
+        response = await self.recorder.request(self.client, name, "GET", path, params=params, headers=headers)
+        if response is not None and response.status_code == 200 and "etag" in response.headers:
+            self.etags[key] = response.headers["etag"]
+        return response
+
+    async def browse(self):
+        response = await self.get_cached("list_books", "/books", {"limit": 20})
+        page = response.json() if response is not None and response.status_code == 200 else None
+        if page and page["next_cursor"] and self.rng.random() < 0.4:
+            response = await self.get_cached("list_books:next", "/books", {"limit": 20, "cursor": page["next_cursor"]})
+            page = response.json() if response is not None and response.status_code == 200 else page
+        book_id = self.rng.choice(page["items"])["book_id"] if page and page["items"] else self.rng.randint(1, scale.books)
+        await self.get_cached("book_detail", f"/books/{book_id}")
+
+    async def search(self):
+        term = words[generator.draw(self.rng, word_weights)]
+        await self.recorder.request(self.client, "search", "GET", "/books", params={"search": term, "limit": 20})
+
+    async def checkout(self):
+        book_id = generator.draw(self.rng, book_weights) + 1
+        response = await self.recorder.request(
+            self.client, "checkout", "POST", "/loans", json={"book_id": book_id}, headers=self.headers,
+        )
+        if response is not None and response.status_code == 201:
+            self.loans.append(response.json()["loan_id"])
+        await self.recorder.request(self.client, "my_loans", "GET", "/loans/my-loans", params={"limit": 20}, headers=self.headers)
+        if len(self.loans) >= 3:
+            await self.recorder.request(self.client, "return", "PUT", f"/loans/{self.loans.pop(0)}/return", headers=self.headers)
+
+    async def run(self, deadline: float):
+        await self.login()
+        actions = list(MIX)
+        weights = [MIX[name] for name in actions]
+        while time.perf_counter() < deadline:
+            await getattr(self, self.rng.choices(actions, weights)[0])()
+
+scale = generator.SCALES[args.scale]
+words = generator.vocabulary(args.seed)
+word_weights = generator.zipf(len(words), 1.1)
+# Book IDs 1..N in a freshly seeded database; low IDs are borrowed most
+book_weights = generator.zipf(scale.books, 0.9)
+
+async def run_load(transport=None) -> tuple:
+    """Run the scenario; returns (recorder, measured seconds)"""
+    started = time.perf_counter()
+    recorder = Recorder(started + args.warmup)
+    members = generator.members(scale)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.base_url or "http://folio.test", transport=transport, limits=limits, timeout=60,
+    ) as client:
+        patrons = [
+            Patron(client, recorder, members[i % len(members)], random.Random(f"{args.seed}:{i}"))
+            for i in range(args.concurrency)
+        ]
+        deadline = started + args.duration
+        await asyncio.gather(*(patron.run(deadline) for patron in patrons))
+    return recorder, time.perf_counter() - recorder.measure_from
+
+async def run_in_process() -> tuple:
+    """Seed the database, then drive the app over ASGI inside its lifespan"""
+    from app.database import Base, engine, SessionLocal
+    with SessionLocal() as db:
+        Base.metadata.create_all(bind=engine)
+        generator.generate(db, scale, seed=args.seed)
+    from app.main import app
+    async with app.router.lifespan_context(app):
+        return await run_load(httpx.ASGITransport(app=app))
+
+def main():
+    recorder, seconds = asyncio.run(run_load() if args.base_url else run_in_process())
+    rows = []
+    for name in sorted(recorder.samples):
+        statuses = dict(recorder.statuses[name])
+        errors = sum(count for status, count in statuses.items() if status == "error" or status.startswith("5"))
+        rows.append(results.summarize(
+            name, recorder.samples[name], rps=round(len(recorder.samples[name]) / seconds, 1),
+            statuses=statuses, errors=errors,
+        ))
+    total = sum(row["n"] for row in rows)
+    summary = {
+        "requests": total, "seconds": round(seconds, 2), "rps": round(total / seconds, 1),
+        "errors": sum(row["errors"] for row in rows),
+    }
+
+    if args.json:
+        params = {
+            "scale": args.scale, "seed": args.seed, "concurrency": args.concurrency, "duration": args.duration,
+            "warmup": args.warmup, "mix": MIX, "target": "server" if args.base_url else "in-process",
+        }
+        results.dump(results.document("http_load", url or args.base_url, params, rows, summary=summary))
+        return
+    print(f"{args.concurrency} users, {summary['seconds']}s measured: {total} requests, {summary['rps']} req/s, {summary['errors']} errors")
+    print(f"{'operation':<18}{'n':>7}{'req/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuses")
+    for row in rows:
+        statuses = " ".join(f"{status}:{count}" for status, count in sorted(row["statuses"].items()))
+        print(f"{row['name']:<18}{row['n']:>7}{row['rps']:>9}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}  {statuses}")
+
+if __name__ == "__main__":
+    main()
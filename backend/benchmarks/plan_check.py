@@ -0,0 +1,198 @@
+"""Query plan regression check: fails if a crud query falls back to a full table scan.
+
+Seeds a dataset, runs each crud read/write path while capturing the SQL it emits,
+then EXPLAINs every captured statement. Any plan that scans a whole table (or sorts
+a keyset page instead of reading it in index order) is reported and the exit
+status is 1. Works against SQLite (default), PostgreSQL and SQL Server.
+
+    python -m benchmarks.plan_check
+    python -m benchmarks.plan_check --url postgresql://folio@localhost/folio_test --loans 200000
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--url", help="Database URL to use (default: temporary SQLite file)")
+parser.add_argument("--users", type=int, default=2000)
+parser.add_argument("--books", type=int, default=5000)
+parser.add_argument("--loans", type=int, default=50000)
+parser.add_argument("--seed", type=int, default=42)
+parser.add_argument("--min-rows", type=int, default=1000, help="Scans of smaller tables are not reported")
+args = parser.parse_args()
+
+url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'plan_check.db')}"
+os.environ["DATABASE_URL"] = url
+os.environ.setdefault("DB_PROFILE", "test")
+
+from sqlalchemy import event, func, insert, select, text
+from app.database import Base, engine, SessionLocal
+from app import models, schemas, crud, overdue, facets, fulltext
+
+# Plan lines that mean a whole table (or clustered index) is read, per dialect
+FULL_SCAN = {
+    "sqlite": re.compile(r"^SCAN (\w+)|USE TEMP B-TREE FOR ORDER BY"),
+    "postgresql": re.compile(r"Seq Scan on (\w+)"),
+    "mssql": re.compile(r"Table Scan\(OBJECT:\(\[[^\]]+\]\.\[[^\]]+\]\.\[(\w+)\]|Clustered Index Scan\(OBJECT:\(\[[^\]]+\]\.\[[^\]]+\]\.\[(\w+)\]"),
+}
+
+# Relevance is computed per search, so these sort their (index-matched) rows; scans still fail
+RANKED = {"get_books search"}
+
+def seed(db, rng: random.Random):
+    """Insert users, authors, categories, books and loans with executemany"""
+    db.execute(insert(models.User), [
+        {"username": f"user{i}", "email": f"user{i}@example.com", "password_hash": "x", "full_name": f"User {i}", "role": "member"}
+        for i in range(args.users)
+    ])
+    db.execute(insert(models.Author), [{"name": f"Author {i}"} for i in range(max(1, args.books // 10))])
+    db.execute(insert(models.Category), [{"name": f"Category {i}"} for i in range(50)])
+    db.execute(insert(models.Book), [
+        {
+            "title": f"Book {i}", "isbn": f"{i:013d}",
+            "author_id": rng.randint(1, max(1, args.books // 10)), "category_id": rng.randint(1, 50),
+            "quantity_total": 5, "quantity_available": 5,
+        }
+        for i in range(args.books)
+    ])
+    now = datetime.utcnow()
+    loans = []
+    for _ in range(args.loans):
+        loan_date = now - timedelta(days=rng.randint(0, 720))
+        # Most history is returned; only a thin slice is still out
+        status = "returned" if rng.random() < 0.95 else rng.choice(["active", "overdue"])
+        loans.append({
+            "user_id": rng.randint(1, args.users), "book_id": rng.randint(1, args.books),
+            "loan_date": loan_date, "due_date": loan_date + timedelta(days=14), "status": status,
+            "return_date": loan_date + timedelta(days=7) if status == "returned" else None,
+        })
+    db.execute(insert(models.Loan), loans)
+    # Bulk inserts skip the per-book search index update
+    fulltext.index_books_after(db, 0)
+    db.commit()
+
+def second_page(list_fn, db, **kwargs):
+    """Return a call that fetches the page after the first one, the keyset path"""
+    cursor = list_fn(db, limit=20, **kwargs).next_cursor
+    return lambda: list_fn(db, cursor=cursor, limit=20, **kwargs)
+
+def build_checks(db):
+    """(name, call) pairs covering the crud query paths"""
+    user_id = db.query(models.Loan.user_id).filter(models.Loan.status == "active").limit(1).scalar()
+    open_loans = [loan_id for (loan_id,) in db.query(models.Loan.loan_id).filter(models.Loan.status == "active").limit(6)]
+    loan_id, batch_loan_ids = open_loans[0], open_loans[1:]
+    by_category = facets.BookFilters(category_id=7, available=True)
+    by_author = facets.BookFilters(author_id=7)
+    return [
+        ("get_user_by_username", lambda: crud.get_user_by_username(db, "user7")),
+        ("get_users page 2", second_page(crud.get_users, db)),
+        ("get_authors page 2", second_page(crud.get_authors, db)),
+        ("get_categories page 2", second_page(crud.get_categories, db)),
+        ("get_book", lambda: crud.get_book(db, 7)),
+        ("get_books page 2", second_page(crud.get_books, db)),
+        ("get_books search", lambda: crud.get_books(db, limit=20, search="Book 4217")),
+        ("get_books by category", lambda: crud.get_books(db, limit=20, filters=by_category)),
+        ("get_books by author", lambda: crud.get_books(db, limit=20, filters=by_author)),
+        ("get_book_facets search", lambda: crud.get_book_facets(db, search="Book 4217")),
+        ("get_book_facets by category", lambda: crud.get_book_facets(db, filters=by_category)),
+        ("get_book_facets by author", lambda: crud.get_book_facets(db, filters=by_author)),
+        ("get_users_by_ids", lambda: crud.get_users_by_ids(db, [3, 99, 7, 1500])),
+        ("get_authors_by_ids", lambda: crud.get_authors_by_ids(db, [3, 99, 7])),
+        ("get_books_by_ids", lambda: crud.get_books_by_ids(db, [3, 99, 7, 4217])),
+        ("get_book_availability", lambda: crud.get_book_availability(db, [3, 99, 7, 4217])),
+        ("get_user_loans", lambda: crud.get_user_loans(db, user_id, limit=20)),
+        ("get_active_loans", lambda: crud.get_active_loans(db, limit=20)),
+        ("get_active_loans page 2", second_page(crud.get_active_loans, db)),
+        ("get_active_loans overdue", lambda: crud.get_active_loans(db, limit=20, status="overdue")),
+        ("create_loan", lambda: crud.create_loan(db, user_id, schemas.LoanCreate(book_id=7))),
+        ("return_book", lambda: crud.return_book(db, loan_id)),
+        ("create_loans", lambda: crud.create_loans(db, user_id, [11, 12, 13, 14, 15])),
+        ("return_books", lambda: crud.return_books(db, batch_loan_ids)),
+        ("sweep_overdue", lambda: overdue.sweep_overdue(db)),
+    ]
+
+def capture(call) -> list:
+    """Run call and return the (statement, parameters) of every query it sent"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "UPDATE", "DELETE", "WITH")):
+            # Every row of an executemany runs the same plan
+            statements.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statements
+
+def explain(statement: str, parameters) -> list:
+    """Plan lines for one statement, without running it"""
+    dialect = engine.dialect.name
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        if dialect == "sqlite":
+            cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            return [row[-1] for row in cursor.fetchall()]
+        if dialect == "postgresql":
+            cursor.execute("EXPLAIN " + statement, parameters)
+            return [row[0] for row in cursor.fetchall()]
+        if dialect == "mssql":
+            cursor.execute("SET SHOWPLAN_ALL ON")
+            try:
+                cursor.execute(statement, parameters)
+                return [row[0] for row in cursor.fetchall()]
+            finally:
+                cursor.execute("SET SHOWPLAN_ALL OFF")
+        raise SystemExit(f"No plan check for dialect '{dialect}'")
+    finally:
+        connection.close()
+
+def large_tables(db) -> set:
+    """Names of tables with at least --min-rows rows; scanning a smaller one is a fine plan"""
+    return {
+        table.name for table in Base.metadata.sorted_tables
+        if db.scalar(select(func.count()).select_from(table)) >= args.min_rows
+    }
+
+def main() -> int:
+    Base.metadata.create_all(bind=engine)
+    with SessionLocal() as db:
+        seed(db, random.Random(args.seed))
+        with engine.begin() as connection:
+            connection.execute(text("EXEC sp_updatestats" if engine.dialect.name == "mssql" else "ANALYZE"))
+        checks = build_checks(db)
+        large = large_tables(db)
+
+        pattern = FULL_SCAN[engine.dialect.name]
+        failures = 0
+        for name, call in checks:
+            problems = []
+            for statement, parameters in capture(call):
+                plan = explain(statement, parameters)
+                bad = []
+                for line in plan:
+                    match = pattern.search(line.strip())
+                    # Sorts have no table group; scans count only on large tables
+                    if match and (not any(match.groups()) and name not in RANKED or set(match.groups()) & large):
+                        bad.append(line)
+                if bad:
+                    problems.append((statement, plan))
+            print(f"{'FAIL' if problems else 'ok  '}  {name}")
+            for statement, plan in problems:
+                print("      " + " ".join(statement.split()))
+                for line in plan:
+                    print("        " + line)
+            failures += bool(problems)
+
+    print(f"\n{len(checks) - failures}/{len(checks)} query paths use indexes")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Recommendation index benchmark: build time, memory, lookups and incremental updates.
+
+Seeds a synthetic library (benchmarks.generator) unless --url points at one that is
+already seeded (--no-seed), builds the "patrons also borrowed" index from its loans,
+then times lookups of books drawn by popularity and checkouts applied to the index.
+
+    python -m benchmarks.recommend --scale medium
+    python -m benchmarks.recommend --url postgresql://folio@localhost/folio_bench --no-seed --json > rec.json
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from benchmarks import generator, results
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--url", help="Database URL (default: temporary SQLite file)")
+parser.add_argument("--no-seed", action="store_true", help="Use the data already in --url")
+parser.add_argument("--scale", choices=generator.SCALES, default="small")
+parser.add_argument("--seed", type=int, default=42)
+parser.add_argument("--repeat", type=int, default=10000, help="Timed lookups and updates")
+parser.add_argument("--json", action="store_true", help="Print results as JSON")
+args = parser.parse_args()
+
+url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'recommend_bench.db')}"
+os.environ["DATABASE_URL"] = url
+os.environ.setdefault("DB_PROFILE", "test")
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+from sqlalchemy import select
+from app.database import Base, engine, SessionLocal
+from app import models, recommendations
+
+def timed(call, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def main():
+    scale = generator.SCALES[args.scale]
+    counts = None
+    if not args.no_seed:
+        Base.metadata.create_all(bind=engine)
+        with SessionLocal() as db:
+            counts = generator.generate(db, scale, seed=args.seed)
+    with SessionLocal() as db:
+        book_ids = list(db.scalars(select(models.Book.book_id)))
+        user_ids = list(db.scalars(select(models.User.user_id)))
+
+    recommendations.rebuild()
+    build = dict(recommendations.last_build)
+    rng = random.Random(args.seed)
+    weights = generator.zipf(len(book_ids), 0.9)
+    rows = [
+        results.summarize("lookup", timed(
+            lambda: recommendations.recommend(book_ids[generator.draw(rng, weights)], 10), args.repeat
+        )),
+        results.summarize("record_borrow", timed(
+            lambda: recommendations.record_borrow(rng.choice(user_ids), book_ids[generator.draw(rng, weights)]),
+            args.repeat,
+        )),
+    ]
+
+    if args.json:
+        params = {"scale": args.scale, "seed": args.seed, "repeat": args.repeat, "top_k": recommendations.RECOMMENDATIONS_TOP_K}
+        results.dump(results.document("recommend", url, params, rows, build=build, dataset=counts))
+        return
+    print(f"Index over loans up to {build['max_loan_id']}: {build['books']} books with neighbours, "
+          f"{build['memory_bytes'] / 2 ** 20:.1f} MiB, built in {build['elapsed_ms']:.0f} ms")
+    print(f"{'operation':<16}{'n':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for row in rows:
+        print(f"{row['name']:<16}{row['n']:>7}{row['p50_ms']:>10.4f}{row['p95_ms']:>10.4f}{row['p99_ms']:>10.4f}")
+
+if __name__ == "__main__":
+    main()
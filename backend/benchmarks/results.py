@@ -0,0 +1,125 @@
+"""Machine-readable benchmark results, and a comparison of two runs.
+
+crud_micro and http_load write one JSON document per run (with --json): which
+benchmark ran, with which parameters, on which commit and database, and one row per
+operation with latency percentiles in milliseconds. Compare a run on the base branch
+with one on a feature branch:
+
+    python -m benchmarks.crud_micro --json > base.json
+    python -m benchmarks.crud_micro --json > head.json
+    python -m benchmarks.results base.json head.json --metric p95_ms --threshold 15
+
+The comparison exits with status 1 when any operation regressed by more than the
+threshold percentage.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+SCHEMA_VERSION = 1
+
+def git_revision() -> dict:
+    """Commit of the working tree, and whether it has uncommitted changes"""
+    def git(*command):
+        return subprocess.run(["git", *command], capture_output=True, text=True, cwd=os.path.dirname(__file__)).stdout.strip()
+    try:
+        return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+    except OSError:
+        return {"commit": None, "dirty": None}
+
+def environment(url: str) -> dict:
+    """Where a run happened: commit, interpreter, machine and database (password hidden)"""
+    import sqlalchemy
+    from sqlalchemy.engine import make_url
+    return {
+        **git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "database": make_url(url).get_backend_name(),
+        "url": make_url(url).render_as_string(hide_password=True),
+    }
+
+def percentile(ordered: list, q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+def summarize(name: str, samples_ms: list, **extra) -> dict:
+    """Result row for one operation from its latency samples in milliseconds"""
+    ordered = sorted(samples_ms)
+    if not ordered:
+        return {"name": name, "n": 0, **extra}
+    return {
+        "name": name,
+        "n": len(ordered),
+        "mean_ms": round(sum(ordered) / len(ordered), 3),
+        "min_ms": round(ordered[0], 3),
+        "p50_ms": round(percentile(ordered, 50), 3),
+        "p90_ms": round(percentile(ordered, 90), 3),
+        "p95_ms": round(percentile(ordered, 95), 3),
+        "p99_ms": round(percentile(ordered, 99), 3),
+        "max_ms": round(ordered[-1], 3),
+        **extra,
+    }
+
+def document(benchmark: str, url: str, params: dict, results: list, **extra) -> dict:
+    """The JSON document a benchmark run emits"""
+    return {
+        "schema": SCHEMA_VERSION, "benchmark": benchmark, "environment": environment(url),
+        "params": params, **extra, "results": results,
+    }
+
+def dump(doc: dict):
+    json.dump(doc, sys.stdout, indent=2)
+    print()
+
+def compare(base: dict, head: dict, metric: str) -> list:
+    """(name, base value, head value, change in percent) for operations present in both runs"""
+    before = {row["name"]: row for row in base["results"]}
+    rows = []
+    for row in head["results"]:
+        old = before.get(row["name"], {}).get(metric)
+        new = row.get(metric)
+        if old is None or new is None:
+            continue
+        rows.append((row["name"], old, new, (new - old) / old * 100 if old else 0.0))
+    return rows
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--metric", default="p50_ms", help="Result field to compare, lower is better")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Percent slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    with open(args.base) as base_file, open(args.head) as head_file:
+        base, head = json.load(base_file), json.load(head_file)
+    if base["benchmark"] != head["benchmark"]:
+        parser.error(f"cannot compare {base['benchmark']} results with {head['benchmark']} results")
+    for label, doc in (("base", base), ("head", head)):
+        env = doc["environment"]
+        print(f"{label}  {(env['commit'] or 'unknown')[:10]}{' (dirty)' if env['dirty'] else ''}  {env['database']}  {env['timestamp']}")
+    if base["params"] != head["params"]:
+        print("warning: runs used different parameters, numbers may not be comparable")
+
+    print(f"\n{'operation':<32}{'base':>12}{'head':>12}{'change':>10}")
+    regressions = 0
+    for name, old, new, change in compare(base, head, args.metric):
+        flag = ""
+        if change > args.threshold:
+            flag, regressions = "  REGRESSION", regressions + 1
+        elif change < -args.threshold:
+            flag = "  faster"
+        print(f"{name:<32}{old:>12.3f}{new:>12.3f}{change:>+9.1f}%{flag}")
+    print(f"\n{regressions} regression(s) above {args.threshold:g}% in {args.metric}")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+"""Compare book search latency: indexed full-text search vs the old ILIKE scan.
+
+Seeds a throwaway database and times crud.get_books for a set of queries.
+
+    python -m benchmarks.search_latency --books 100000 --repeat 20
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+parser.add_argument("--url", help="Database URL to seed (default: temporary SQLite file)")
+parser.add_argument("--books", type=int, default=20000)
+parser.add_argument("--repeat", type=int, default=20)
+parser.add_argument("--seed", type=int, default=42)
+args = parser.parse_args()
+
+url = args.url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'search_bench.db')}"
+os.environ["DATABASE_URL"] = url
+os.environ.setdefault("DB_PROFILE", "test")
+
+from sqlalchemy import create_engine, or_
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, get_engine_options
+from app import models, crud, fulltext
+
+SYLLABLES = ["ka", "lo", "mer", "din", "sha", "vel", "tor", "rin", "qua", "bel", "os", "tri", "nar", "ul", "zem"]
+
+def make_vocabulary(rng: random.Random, size: int = 20000) -> list[str]:
+    """Synthetic words, so term selectivity looks like a real catalog"""
+    return list({"".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) for _ in range(size)})
+
+def pick(rng: random.Random, words: list[str]) -> str:
+    """Zipf-like word choice: a few common words, a long tail of rare ones"""
+    return words[min(int(rng.paretovariate(1.2)) - 1, len(words) - 1)]
+
+def seed(session, count: int, rng: random.Random, words: list[str]):
+    """Insert count books spread over a few hundred authors and index them"""
+    authors = [models.Author(name=f"{rng.choice(words).title()} {rng.choice(words).title()}") for _ in range(300)]
+    category = models.Category(name="Fiction")
+    session.add_all(authors + [category])
+    session.flush()
+    for start in range(0, count, 5000):
+        session.bulk_insert_mappings(models.Book, [
+            {
+                "title": " ".join(pick(rng, words) for _ in range(rng.randint(2, 5))).title(),
+                "isbn": f"978{i:010d}",
+                "author_id": rng.choice(authors).author_id,
+                "category_id": category.category_id,
+                "description": " ".join(pick(rng, words) for _ in range(30)),
+            }
+            for i in range(start, min(start + 5000, count))
+        ])
+    session.flush()
+    for book_id, in session.query(models.Book.book_id):
+        fulltext.index_book(session, book_id)
+    session.commit()
+
+def ilike_books(session, search: str, limit: int = 100):
+    """The pre-index search path, for comparison"""
+    return session.query(models.Book).filter(
+        or_(models.Book.title.ilike(f"%{search}%"), models.Book.isbn.ilike(f"%{search}%"))
+    ).offset(0).limit(limit).all()
+
+def time_ms(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+def main():
+    engine = create_engine(url, **get_engine_options(url, profile="test"))
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine)
+    rng = random.Random(args.seed)
+    words = make_vocabulary(rng)
+
+    with Session() as session:
+        start = time.perf_counter()
+        seed(session, args.books, rng, words)
+        print(f"seeded {args.books} books in {time.perf_counter() - start:.1f}s ({url})")
+
+        # A common word, two mid-frequency words, a rare word and an ISBN prefix
+        queries = [words[0], f"{words[20]} {words[40]}", words[len(words) // 2], "9780000012"]
+        print(f"{'query':<24}{'path':<10}{'p50 ms':>10}{'p95 ms':>10}{'rows':>8}")
+        for query in queries:
+            for label, fn in (
+                ("fulltext", lambda: crud.get_books(session, search=query)),
+                ("ilike", lambda: ilike_books(session, query)),
+            ):
+                rows = len(fn())
+                samples = sorted(time_ms(fn, args.repeat))
+                p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+                print(f"{query:<24}{label:<10}{statistics.median(samples):>10.2f}{p95:>10.2f}{rows:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+import os
+import tempfile
+
+# The app reads its settings when it is imported, so point it at a throwaway SQLite
+# database before any test module imports it. The catalog and principal caches are off:
+# every request runs the queries a cache miss would.
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'folio_test.db')}"
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("DB_PROFILE", "test")
+os.environ.setdefault("SCHEMA_CHECK", "create")
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("CATALOG_CACHE_SIZE", "0")
+os.environ.setdefault("PRINCIPAL_CACHE_SIZE", "0")
+os.environ.setdefault("RECOMMENDATIONS_ENABLED", "0")
@@ -0,0 +1,101 @@
+"""Checkouts that commit while the recommendation index is rebuilt end up in the new index.
+
+build() is replaced by one that reads a list of committed (user_id, book_id) pairs, the
+way the real build reads loans, so a test controls which checkouts the build sees.
+"""
+import threading
+import numpy as np
+import pytest
+from app import recommendations
+
+def index_of(pairs) -> recommendations.CooccurrenceIndex:
+    """An index over pairs, as build() would return it for those loans"""
+    top_k = recommendations.RECOMMENDATIONS_TOP_K
+    index = recommendations.CooccurrenceIndex(
+        np.zeros((0, top_k), dtype=np.int32), np.zeros((0, top_k), dtype=np.int32),
+        np.full(0, -1, dtype=np.int32), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32), set(), 0,
+    )
+    for user_id, book_id in pairs:
+        index.add_borrow(user_id, book_id)
+    index.updates = 0
+    return index
+
+@pytest.fixture(autouse=True)
+def enabled(monkeypatch):
+    monkeypatch.setattr(recommendations, "RECOMMENDATIONS_ENABLED", True)
+    monkeypatch.setattr(recommendations, "index", None)
+    yield
+    recommendations._during_build.clear()
+    recommendations._building = False
+
+def test_checkout_during_build_is_replayed(monkeypatch):
+    committed = [(1, 10)]
+
+    def build():
+        seen = list(committed)
+        # Commits after the build read the loans
+        committed.append((1, 7))
+        recommendations.record_borrow(1, 7)
+        return index_of(seen)
+
+    monkeypatch.setattr(recommendations, "build", build)
+    recommendations.rebuild()
+    assert recommendations.index.history(1) == {10, 7}
+    assert recommendations.index.updates == 1
+    assert recommendations.recommend(10) == [(7, 1)]
+
+def test_checkout_read_by_build_is_not_counted_twice(monkeypatch):
+    committed = [(1, 10)]
+
+    def build():
+        # Queued while the build runs, but committed in time for it to read (a lower
+        # sequence value committing late looks the same)
+        committed.append((1, 7))
+        recommendations.record_borrow(1, 7)
+        return index_of(committed)
+
+    monkeypatch.setattr(recommendations, "build", build)
+    recommendations.rebuild()
+    assert recommendations.index.updates == 0
+    assert recommendations.recommend(10) == [(7, 1)]
+
+def test_failed_build_keeps_index(monkeypatch):
+    old = recommendations.index = index_of([(1, 10)])
+
+    def build():
+        recommendations.record_borrow(2, 11)
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(recommendations, "build", build)
+    with pytest.raises(RuntimeError):
+        recommendations.rebuild()
+    assert recommendations.index is old
+    assert not recommendations._building and not recommendations._during_build
+    assert old.history(2) == {11}
+
+def test_no_checkout_lost_to_concurrent_rebuilds(monkeypatch):
+    committed = []
+    commit_lock = threading.Lock()
+
+    def build():
+        with commit_lock:
+            seen = list(committed)
+        return index_of(seen)
+
+    def checkouts(user_id):
+        for book_id in range(200):
+            with commit_lock:
+                committed.append((user_id, book_id))
+            recommendations.record_borrow(user_id, book_id)
+
+    monkeypatch.setattr(recommendations, "build", build)
+    recommendations.rebuild()
+    patrons = [threading.Thread(target=checkouts, args=(user_id,)) for user_id in range(1, 5)]
+    for thread in patrons:
+        thread.start()
+    while any(thread.is_alive() for thread in patrons):
+        recommendations.rebuild()
+    for thread in patrons:
+        thread.join()
+    for user_id in range(1, 5):
+        assert recommendations.index.history(user_id) == set(range(200))
@@ -0,0 +1,71 @@
+"""List endpoints run a fixed number of statements whatever the page size.
+
+Relationships the response schemas nest are loaded by the strategies in app.loading
+(one extra statement per relationship, or a join); a lazy load or a per-row query
+would make the count grow with the page.
+"""
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from app import auth, hashing, models
+from app.database import SessionLocal, async_engine, engine
+from app.main import app
+
+ROWS = 60
+PAGE_SIZES = (5, 50)
+# Statements per request, validators and authentication included
+MAX_STATEMENTS = {"/books": 4, "/authors": 2, "/loans": 2, "/users": 2}
+
+@pytest.fixture(scope="module")
+def client():
+    with TestClient(app) as client:
+        with SessionLocal() as db:
+            admin = models.User(
+                username="admin", email="admin@example.com", full_name="Admin",
+                password_hash=hashing.hash_password("secret1"), role="admin",
+            )
+            authors = [models.Author(name=f"Author {i}") for i in range(ROWS)]
+            categories = [models.Category(name=f"Category {i}") for i in range(ROWS)]
+            db.add_all([admin, *authors, *categories])
+            db.flush()
+            books = [
+                models.Book(title=f"Book {i}", isbn=f"{i:013d}", author=authors[i], category=categories[i], quantity_total=2, quantity_available=1)
+                for i in range(ROWS)
+            ]
+            db.add_all(books)
+            db.flush()
+            due = datetime.utcnow() + timedelta(days=14)
+            db.add_all([models.Loan(user=admin, book=book, due_date=due, status="active") for book in books])
+            db.add_all([
+                models.User(username=f"member{i}", email=f"member{i}@example.com", full_name=f"Member {i}", password_hash="x")
+                for i in range(ROWS)
+            ])
+            db.commit()
+        client.headers["Authorization"] = f"Bearer {auth.create_access_token({'sub': 'admin'})}"
+        yield client
+
+def count_statements(client, path: str, limit: int) -> int:
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    for target in (engine, async_engine.sync_engine):
+        event.listen(target, "before_cursor_execute", record)
+    try:
+        response = client.get(path, params={"limit": limit})
+    finally:
+        for target in (engine, async_engine.sync_engine):
+            event.remove(target, "before_cursor_execute", record)
+    assert response.status_code == 200, response.text
+    assert len(response.json()["items"]) == limit
+    return len(statements)
+
+@pytest.mark.parametrize("path", sorted(MAX_STATEMENTS))
+def test_statement_count_does_not_grow_with_page_size(client, path):
+    # Once first, so one-off work (connection setup, version rows) is not counted
+    client.get(path, params={"limit": 1})
+    counts = [count_statements(client, path, limit) for limit in PAGE_SIZES]
+    assert counts[0] == counts[1], f"{path}: {counts[0]} statements for {PAGE_SIZES[0]} rows, {counts[1]} for {PAGE_SIZES[1]}"
+    assert counts[0] <= MAX_STATEMENTS[path], f"{path}: {counts[0]} statements, expected at most {MAX_STATEMENTS[path]}"